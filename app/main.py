@@ -1,13 +1,15 @@
 import os
+import atexit
 import logging
 from datetime import datetime
 from flask import Flask, jsonify, request, redirect, render_template
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from authlib.integrations.flask_client import OAuth
 from werkzeug.exceptions import HTTPException
-import sqlite3
-import threading
 import requests
+from db import get_connection, transaction
+from visitor_log import VisitorLogWriter
+from visitor_retention import init_visitor_retention
 
 
 # Configure logging
@@ -16,13 +18,9 @@ logger = logging.getLogger(__name__)
 
 app = Flask(__name__, template_folder='../templates')
 
-# Thread lock for database access
-db_lock = threading.Lock()
-
 def init_db():
     """Initialize the database and create the visitors table if it doesn't exist."""
-    with db_lock:
-        conn = sqlite3.connect('visitors.db')
+    with transaction('visitors.db') as conn:
         cursor = conn.cursor()
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS visitors (
@@ -31,19 +29,25 @@ def init_db():
                 timestamp TEXT NOT NULL,
                 user_agent TEXT,
                 user_id INTEGER,
+                path TEXT,
                 FOREIGN KEY (user_id) REFERENCES users (id)
             )
         ''')
-        conn.commit()
-        conn.close()
+        # Databases created before visits recorded their route
+        columns = {row[1] for row in cursor.execute("PRAGMA table_info(visitors)")}
+        if 'path' not in columns:
+            cursor.execute("ALTER TABLE visitors ADD COLUMN path TEXT")
+    init_visitor_retention('visitors.db')
 
 def save_visitor(ip_address, user_agent=None):
-    """Save visitor information to the database."""
+    """Queue visitor information to be saved to the database."""
     user_id = None
+    path = None
     try:
         # Check if we're in a request context and current_user is available
         from flask import has_request_context
         if has_request_context():
+            path = request.path
             from flask_login import current_user
             if current_user and current_user.is_authenticated:
                 user_id = current_user.id
@@ -51,31 +55,23 @@ def save_visitor(ip_address, user_agent=None):
         # Not in a Flask request context or current_user not available, treat as guest
         pass
 
-    with db_lock:
-        conn = sqlite3.connect('visitors.db')
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO visitors (ip_address, timestamp, user_agent, user_id)
-            VALUES (?, ?, ?, ?)
-        ''', (ip_address, datetime.now().isoformat(), user_agent, user_id))
-        conn.commit()
-        conn.close()
+    # Written in batches by the background writer; the request doesn't wait for the commit
+    visitor_log.log(ip_address, datetime.now().isoformat(), user_agent, user_id, path)
 
 def get_visitors(limit=100):
     """Get the list of visitors from the database."""
-    with db_lock:
-        conn = sqlite3.connect('visitors.db')
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT v.ip_address, v.timestamp, v.user_agent, u.name
-            FROM visitors v
-            LEFT JOIN users u ON v.user_id = u.id
-            ORDER BY v.timestamp DESC
-            LIMIT ?
-        ''', (limit,))
-        visitors = cursor.fetchall()
-        conn.close()
-        return visitors
+    # Only committed visits; ones still queued in the writer appear on a later request
+    conn = get_connection('visitors.db')
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT v.ip_address, v.timestamp, v.user_agent, u.name
+        FROM visitors v
+        LEFT JOIN users u ON v.user_id = u.id
+        ORDER BY v.timestamp DESC
+        LIMIT ?
+    ''', (limit,))
+    visitors = cursor.fetchall()
+    return visitors
 
 def get_ip_location(ip_address):
     """Get location information for an IP address."""
@@ -143,6 +139,10 @@ def get_weather_info(lat, lon):
 # Initialize database on startup
 init_db()
 
+# Background writer for visitor events, flushed when the process exits
+visitor_log = VisitorLogWriter('visitors.db')
+atexit.register(visitor_log.stop)
+
 # Initialize Flask-Login
 login_manager = LoginManager()
 login_manager.init_app(app)
@@ -350,15 +350,12 @@ def google_callback():
                 )
             else:
                 # Update user info if it exists
-                import sqlite3
-                conn = sqlite3.connect('visitors.db')
-                cursor = conn.cursor()
-                cursor.execute("UPDATE users SET name=?, profile_pic=? WHERE email=?",
-                              (user_info.get("name", user_info.get("email", "Unknown")),
-                               user_info.get("picture"),
-                               user_info["email"]))
-                conn.commit()
-                conn.close()
+                with transaction('visitors.db') as conn:
+                    cursor = conn.cursor()
+                    cursor.execute("UPDATE users SET name=?, profile_pic=? WHERE email=?",
+                                  (user_info.get("name", user_info.get("email", "Unknown")),
+                                   user_info.get("picture"),
+                                   user_info["email"]))
                 # Update the user object with new info
                 user.name = user_info.get("name", user_info.get("email", "Unknown"))
                 user.profile_pic = user_info.get("picture")
@@ -446,16 +443,13 @@ def wechat_callback():
             )
         else:
             # Update existing user info
-            import sqlite3
-            conn = sqlite3.connect('visitors.db')
-            cursor = conn.cursor()
-            cursor.execute("UPDATE users SET name=?, profile_pic=? WHERE provider=? AND provider_user_id=?",
-                          (user_info.get('nickname', 'WeChat User'),
-                           user_info.get('headimgurl', ''),
-                           'wechat',
-                           openid))
-            conn.commit()
-            conn.close()
+            with transaction('visitors.db') as conn:
+                cursor = conn.cursor()
+                cursor.execute("UPDATE users SET name=?, profile_pic=? WHERE provider=? AND provider_user_id=?",
+                              (user_info.get('nickname', 'WeChat User'),
+                               user_info.get('headimgurl', ''),
+                               'wechat',
+                               openid))
             # Update the user object with new info
             user.name = user_info.get('nickname', 'WeChat User')
             user.profile_pic = user_info.get('headimgurl', '')
@@ -21,3 +21,13 @@ WECHAT_USER_INFO_URL = "https://api.weixin.qq.com/sns/userinfo"
 
 # Database configuration
 DATABASE_PATH = os.getenv("DATABASE_PATH", "visitors.db")
+
+# Visitor logging (write-behind)
+VISITOR_LOG_QUEUE_SIZE = int(os.getenv("VISITOR_LOG_QUEUE_SIZE", "10000"))  # events held in memory before new ones are dropped
+VISITOR_LOG_BATCH_SIZE = int(os.getenv("VISITOR_LOG_BATCH_SIZE", "500"))  # most events written per transaction
+
+# Visitor log retention
+VISITOR_RAW_RETENTION_DAYS = int(os.getenv("VISITOR_RAW_RETENTION_DAYS", "30"))  # raw visits older than this are rolled up
+VISITOR_HOURLY_RETENTION_DAYS = int(os.getenv("VISITOR_HOURLY_RETENTION_DAYS", "90"))  # daily rollups are kept
+VISITOR_RETENTION_INTERVAL = float(os.getenv("VISITOR_RETENTION_INTERVAL", "3600"))  # seconds between runs, 0 disables
+VISITOR_VACUUM_PAGES = int(os.getenv("VISITOR_VACUUM_PAGES", "1000"))  # free pages returned per run
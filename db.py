@@ -0,0 +1,295 @@
+"""
+Shared SQLite Connection Layer
+
+Every thread keeps one open connection per database file instead of opening
+and closing a connection in each function. Reusing the connection keeps the
+page cache warm and lets sqlite3's per-connection statement cache reuse
+prepared statements across calls.
+
+Connections are configured on first use:
+    journal_mode=WAL      readers no longer block behind a writer (and vice versa)
+    synchronous=NORMAL    safe with WAL; fsync at checkpoints instead of every commit
+    cache_size / mmap_size larger page cache and memory-mapped reads
+    busy_timeout          writers wait for each other instead of failing immediately
+
+Reads use `get_connection()` directly; writes go through `transaction()`, which
+commits on success and rolls back on error so a failed write never leaves a
+transaction (and the write lock) open on the shared connection.
+
+Query profiling is opt-in (SQLITE_PROFILE=true). Connections are then created
+with a profiling factory that times every statement (execute plus fetch*
+calls), aggregates the timings by normalized SQL and records the
+EXPLAIN QUERY PLAN of statements slower than SQLITE_PROFILE_SLOW_MS, flagging
+plans that scan a whole table. `query_profile()` returns the live numbers; with
+SQLITE_PROFILE_PATH set they are merged into that JSON file at exit, and
+`python db.py report [path]` prints it.
+
+Settings are read from the environment. rag_app loads this same module (its
+db.py is a stub, see rag_app/shared.py), so both apps share one implementation.
+"""
+
+import atexit
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", str(16 * 1024)))  # page cache per connection
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(128 * 1024 * 1024)))
+SQLITE_STATEMENT_CACHE = int(os.getenv("SQLITE_STATEMENT_CACHE", "256"))  # prepared statements kept per connection
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "false").lower() == "true"
+SQLITE_PROFILE_SLOW_MS = float(os.getenv("SQLITE_PROFILE_SLOW_MS", "50"))  # statements slower than this get a query plan
+SQLITE_PROFILE_PATH = os.getenv("SQLITE_PROFILE_PATH") or None
+
+_local = threading.local()
+
+
+def _configure(conn: sqlite3.Connection):
+    conn.execute(f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute(f"PRAGMA cache_size = -{SQLITE_CACHE_SIZE_KB}")
+    conn.execute(f"PRAGMA mmap_size = {SQLITE_MMAP_SIZE}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    # Rows removed by INSERT OR REPLACE fire delete triggers (keeps trigger-maintained indexes in sync)
+    conn.execute("PRAGMA recursive_triggers = ON")
+
+
+def _thread_connections() -> Dict[str, sqlite3.Connection]:
+    connections = getattr(_local, "connections", None)
+    # A forked child must not reuse the parent's connections
+    if connections is None or _local.pid != os.getpid():
+        connections = _local.connections = {}
+        _local.pid = os.getpid()
+    return connections
+
+
+def get_connection(db_path: str = "jobs.db") -> sqlite3.Connection:
+    """Returns this thread's connection to the database, opening and configuring it on first use."""
+    connections = _thread_connections()
+    key = os.path.abspath(db_path)
+    conn = connections.get(key)
+    if conn is None:
+        conn = sqlite3.connect(db_path, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000,
+                               cached_statements=SQLITE_STATEMENT_CACHE,
+                               factory=ProfilingConnection if SQLITE_PROFILE else sqlite3.Connection)
+        _configure(conn)
+        connections[key] = conn
+    return conn
+
+
+@contextmanager
+def transaction(db_path: str = "jobs.db") -> Iterator[sqlite3.Connection]:
+    """Yields the thread's connection and commits when the block succeeds, rolling back otherwise."""
+    conn = get_connection(db_path)
+    try:
+        yield conn
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+
+def close_connections():
+    """Closes this thread's connections, e.g. at shutdown or before deleting a database file."""
+    connections = _thread_connections()
+    for conn in connections.values():
+        conn.close()
+    connections.clear()
+
+
+# Literals and IN lists are folded so one query shape is one profile entry
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+_EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "REPLACE", "WITH")
+
+_profile: Dict[str, Dict[str, Any]] = {}
+_profile_lock = threading.Lock()
+
+
+def normalize_sql(sql: str) -> str:
+    """Collapses whitespace and replaces literals and placeholder lists, so calls of one query shape group together."""
+    sql = _STRING_LITERAL.sub("?", sql)
+    sql = _NUMBER_LITERAL.sub("?", sql)
+    sql = _PLACEHOLDER_LIST.sub("(?, ...)", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+def _is_full_scan(plan: List[str]) -> bool:
+    # "SCAN t" without an index; "SCAN t USING [COVERING] INDEX" and virtual tables are not full scans
+    return any(step.startswith("SCAN ") and "USING" not in step and "VIRTUAL TABLE" not in step
+               and "CONSTANT ROW" not in step for step in plan)
+
+
+def _record(key: str, elapsed_ms: float, execution_ms: float, calls: int):
+    with _profile_lock:
+        stats = _profile.get(key)
+        if stats is None:
+            stats = _profile[key] = {'sql': key, 'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'slow_calls': 0,
+                                     'plan': None, 'full_scan': False}
+        stats['calls'] += calls
+        stats['total_ms'] += elapsed_ms
+        stats['max_ms'] = max(stats['max_ms'], execution_ms)
+
+
+def _record_slow(conn: sqlite3.Connection, key: str, sql: str, parameters: Any):
+    """Counts a slow execution and captures the statement's query plan the first time."""
+    with _profile_lock:
+        stats = _profile[key]
+        stats['slow_calls'] += 1
+        needs_plan = stats['plan'] is None
+    # Batches and scripts have no single parameter set to explain
+    if not needs_plan or parameters is None or not sql.lstrip().upper().startswith(_EXPLAINABLE):
+        return
+    try:
+        # Called on the base class so the EXPLAIN itself isn't profiled
+        rows = sqlite3.Connection.execute(conn, "EXPLAIN QUERY PLAN " + sql, parameters).fetchall()
+        plan = [row[3] for row in rows]
+    except sqlite3.Error:
+        plan = []
+    with _profile_lock:
+        stats['plan'] = plan
+        stats['full_scan'] = _is_full_scan(plan)
+
+
+class ProfilingCursor(sqlite3.Cursor):
+    """Cursor that adds statement and fetch times to the query profile."""
+
+    _profile_key = None
+
+    def _add_time(self, elapsed_ms: float, calls: int):
+        # One execution's time is its execute() plus every fetch from it
+        self._profile_elapsed += elapsed_ms
+        _record(self._profile_key, elapsed_ms, self._profile_elapsed, calls)
+        if not self._profile_slow and self._profile_elapsed >= SQLITE_PROFILE_SLOW_MS:
+            self._profile_slow = True
+            _record_slow(self.connection, self._profile_key, self._profile_sql, self._profile_params)
+
+    def _timed_execute(self, sql: str, parameters: Any, run):
+        self._profile_key, self._profile_sql, self._profile_params = normalize_sql(sql), sql, parameters
+        self._profile_elapsed, self._profile_slow = 0.0, False
+        start = time.perf_counter()
+        try:
+            return run()
+        finally:
+            self._add_time((time.perf_counter() - start) * 1000, 1)
+
+    def _timed_fetch(self, fetch):
+        start = time.perf_counter()
+        try:
+            return fetch()
+        finally:
+            if self._profile_key:
+                self._add_time((time.perf_counter() - start) * 1000, 0)
+
+    def execute(self, sql, parameters=()):
+        return self._timed_execute(sql, parameters, lambda: super(ProfilingCursor, self).execute(sql, parameters))
+
+    def executemany(self, sql, seq_of_parameters):
+        return self._timed_execute(sql, None,
+                                   lambda: super(ProfilingCursor, self).executemany(sql, seq_of_parameters))
+
+    def executescript(self, sql_script):
+        return self._timed_execute(sql_script, None,
+                                   lambda: super(ProfilingCursor, self).executescript(sql_script))
+
+    def fetchone(self):
+        return self._timed_fetch(lambda: super(ProfilingCursor, self).fetchone())
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        return self._timed_fetch(lambda: super(ProfilingCursor, self).fetchmany(size))
+
+    def fetchall(self):
+        return self._timed_fetch(lambda: super(ProfilingCursor, self).fetchall())
+
+
+class ProfilingConnection(sqlite3.Connection):
+    """Connection whose cursors (including the ones behind conn.execute) are profiled."""
+
+    def cursor(self, factory=ProfilingCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+
+def query_profile() -> List[Dict[str, Any]]:
+    """Returns this process's profile entries, most total time first."""
+    with _profile_lock:
+        entries = [dict(stats) for stats in _profile.values()]
+    return sorted(entries, key=lambda stats: stats['total_ms'], reverse=True)
+
+
+def reset_query_profile():
+    """Discards the collected profile."""
+    with _profile_lock:
+        _profile.clear()
+
+
+def save_query_profile(path: str):
+    """Merges this process's profile into the JSON file at `path`."""
+    merged = {stats['sql']: stats for stats in load_query_profile(path)}
+    for stats in query_profile():
+        previous = merged.get(stats['sql'])
+        if previous:
+            stats['calls'] += previous['calls']
+            stats['total_ms'] += previous['total_ms']
+            stats['slow_calls'] += previous['slow_calls']
+            stats['max_ms'] = max(stats['max_ms'], previous['max_ms'])
+            if stats['plan'] is None:
+                stats['plan'], stats['full_scan'] = previous['plan'], previous['full_scan']
+        merged[stats['sql']] = stats
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(sorted(merged.values(), key=lambda stats: stats['total_ms'], reverse=True), f, indent=1)
+
+
+def load_query_profile(path: str) -> List[Dict[str, Any]]:
+    """Reads a profile written by save_query_profile (empty if the file doesn't exist)."""
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def format_query_profile(entries: List[Dict[str, Any]], limit: Optional[int] = None) -> str:
+    """Formats profile entries as a plain-text report, slowest total first."""
+    lines = []
+    for stats in entries[:limit]:
+        flags = " FULL SCAN" if stats['full_scan'] else ""
+        lines.append(f"{stats['total_ms']:10.1f} ms total  {stats['calls']:7d} calls  "
+                     f"{stats['total_ms'] / max(stats['calls'], 1):8.2f} ms avg  {stats['max_ms']:8.1f} ms max  "
+                     f"{stats['slow_calls']:5d} slow{flags}")
+        lines.append(f"    {stats['sql'][:300]}")
+        for step in stats['plan'] or []:
+            lines.append(f"      plan: {step}")
+    return "\n".join(lines) if lines else "No queries profiled."
+
+
+if SQLITE_PROFILE and SQLITE_PROFILE_PATH:
+    atexit.register(save_query_profile, SQLITE_PROFILE_PATH)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "report":
+        print("Usage: python db.py report [profile.json]")
+        sys.exit(1)
+    path = sys.argv[2] if len(sys.argv) > 2 else SQLITE_PROFILE_PATH
+    if not path:
+        print("No profile file given and SQLITE_PROFILE_PATH is not set")
+        sys.exit(1)
+    print(format_query_profile(load_query_profile(path)))
@@ -0,0 +1,464 @@
+"""
+Approximate Nearest-Neighbour Index (IVF / IVF-PQ)
+
+An inverted-file index for large embedding collections. Vectors are assigned
+to the nearest of `nlist` k-means centroids and only the `nprobe` closest
+lists are scanned at query time. With `pq_m > 0` the residual of each vector
+to its centroid is product-quantized into `pq_m` one-byte codes, cutting the
+memory per vector from `4 * dim` bytes to `pq_m` bytes.
+
+Scores are inner products, which equal cosine similarity for the normalized
+embeddings produced by `rag.embed_chunk`. PQ scores are approximate; passing
+the original vectors to `search` re-ranks the best PQ candidates exactly.
+
+`PersistentIVFIndex` wraps an IVFIndex for a collection that grows over time:
+vectors are appended to files on disk, the index is trained from a sample and
+retrained as the collection outgrows its number of lists.
+
+Usage:
+    index = IVFIndex(dim=768, nlist=1024, pq_m=32)
+    index.train(sample_vectors)
+    index.add(vectors)
+    scores, ids = index.search(queries, k=10, nprobe=16)
+    index.save("chunks.ivf.npz")
+    index = IVFIndex.load("chunks.ivf.npz")
+
+    collection = PersistentIVFIndex("chunks.ivf.npz", max_nlist=1024, pq_m=32)
+    collection.add(vectors)  # appends, trains or retrains when needed
+    scores, ids = collection.search(queries, k=10)
+
+Rebuild a stored collection from a fresh training sample with
+`python ann_index.py build chunks.ivf.npz`.
+"""
+
+import os
+import sys
+from typing import Optional, Tuple
+
+import numpy as np
+
+# Number of rows assigned per matrix product, bounds temporary memory
+ASSIGN_BATCH_SIZE = 65536
+PQ_CENTROIDS = 256  # one byte per sub-quantizer code
+# k-means needs a few dozen points per list to produce useful centroids
+MIN_POINTS_PER_LIST = 39
+
+
+def _nearest_centroids(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Returns the index of the nearest centroid (L2) for each vector."""
+    half_norms = 0.5 * np.einsum('ij,ij->i', centroids, centroids)
+    assignments = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), ASSIGN_BATCH_SIZE):
+        batch = vectors[start:start + ASSIGN_BATCH_SIZE]
+        # argmin ||x - c||^2 == argmax (x.c - ||c||^2 / 2)
+        assignments[start:start + len(batch)] = np.argmax(batch @ centroids.T - half_norms, axis=1)
+    return assignments
+
+
+def kmeans(vectors: np.ndarray, k: int, iterations: int = 20, seed: int = 0) -> np.ndarray:
+    """Lloyd's k-means; empty clusters are re-seeded from random points."""
+    rng = np.random.default_rng(seed)
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if len(vectors) < k:
+        raise ValueError(f"Need at least {k} training vectors, got {len(vectors)}")
+
+    centroids = vectors[rng.choice(len(vectors), k, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = _nearest_centroids(vectors, centroids)
+        counts = np.bincount(assignments, minlength=k)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        empty = counts == 0
+        centroids[~empty] = sums[~empty] / counts[~empty, None]
+        if empty.any():
+            centroids[empty] = vectors[rng.choice(len(vectors), int(empty.sum()), replace=False)]
+    return centroids
+
+
+class _InvertedList:
+    """Growable (ids, payload) storage for one list, doubling capacity on demand."""
+
+    def __init__(self, width: int, dtype):
+        self.size = 0
+        self.ids = np.empty(0, dtype=np.int64)
+        self.data = np.empty((0, width), dtype=dtype)
+
+    def append(self, ids: np.ndarray, data: np.ndarray):
+        needed = self.size + len(ids)
+        if needed > len(self.ids):
+            capacity = max(needed, 2 * len(self.ids), 16)
+            new_ids = np.empty(capacity, dtype=self.ids.dtype)
+            new_data = np.empty((capacity, self.data.shape[1]), dtype=self.data.dtype)
+            new_ids[:self.size] = self.ids[:self.size]
+            new_data[:self.size] = self.data[:self.size]
+            self.ids, self.data = new_ids, new_data
+        self.ids[self.size:needed] = ids
+        self.data[self.size:needed] = data
+        self.size = needed
+
+    def view(self) -> Tuple[np.ndarray, np.ndarray]:
+        return self.ids[:self.size], self.data[:self.size]
+
+    @property
+    def nbytes(self) -> int:
+        return self.ids.nbytes + self.data.nbytes
+
+
+class IVFIndex:
+    """Inverted-file index with optional product quantization of residuals."""
+
+    def __init__(self, dim: int, nlist: int = 1024, pq_m: int = 0, nprobe: int = 8):
+        if pq_m and dim % pq_m:
+            raise ValueError(f"dim ({dim}) must be divisible by pq_m ({pq_m})")
+        self.dim = dim
+        self.nlist = nlist
+        self.pq_m = pq_m
+        self.nprobe = nprobe
+        self.centroids: Optional[np.ndarray] = None
+        self.codebooks: Optional[np.ndarray] = None  # (pq_m, 256, dim // pq_m)
+        self.lists = []
+        self.ntotal = 0
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def _new_lists(self):
+        if self.pq_m:
+            self.lists = [_InvertedList(self.pq_m, np.uint8) for _ in range(self.nlist)]
+        else:
+            self.lists = [_InvertedList(self.dim, np.float32) for _ in range(self.nlist)]
+
+    def train(self, vectors: np.ndarray, iterations: int = 20, seed: int = 0):
+        """
+        Learns the coarse centroids (and PQ codebooks) from a sample of vectors.
+
+        With fewer training vectors than lists (or than PQ centroids) the index
+        is trained with fewer of them instead of failing; retrain it once more
+        vectors are available.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        if not len(vectors):
+            raise ValueError("Need at least one training vector")
+        self.nlist = min(self.nlist, len(vectors))
+        self.centroids = kmeans(vectors, self.nlist, iterations, seed)
+        if self.pq_m:
+            residuals = vectors - self.centroids[_nearest_centroids(vectors, self.centroids)]
+            sub_dim = self.dim // self.pq_m
+            ksub = min(PQ_CENTROIDS, len(vectors))
+            self.codebooks = np.stack([
+                kmeans(residuals[:, j * sub_dim:(j + 1) * sub_dim], ksub, iterations, seed + j)
+                for j in range(self.pq_m)
+            ])
+        self._new_lists()
+        self.ntotal = 0
+
+    def _encode(self, residuals: np.ndarray) -> np.ndarray:
+        sub_dim = self.dim // self.pq_m
+        codes = np.empty((len(residuals), self.pq_m), dtype=np.uint8)
+        for j in range(self.pq_m):
+            codes[:, j] = _nearest_centroids(residuals[:, j * sub_dim:(j + 1) * sub_dim], self.codebooks[j])
+        return codes
+
+    def encode(self, vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns (list numbers, stored payload) for vectors: the vectors themselves, or their PQ codes."""
+        if not self.is_trained:
+            raise ValueError("Index must be trained before adding vectors")
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        assignments = _nearest_centroids(vectors, self.centroids)
+        payload = self._encode(vectors - self.centroids[assignments]) if self.pq_m else vectors
+        return assignments, payload
+
+    def add_encoded(self, ids: np.ndarray, assignments: np.ndarray, payload: np.ndarray):
+        """Appends already encoded vectors (see `encode`) to their lists."""
+        ids = np.asarray(ids, dtype=np.int64)
+        order = np.argsort(assignments, kind='stable')
+        boundaries = np.searchsorted(assignments[order], np.arange(self.nlist + 1))
+        for list_no in range(self.nlist):
+            members = order[boundaries[list_no]:boundaries[list_no + 1]]
+            if len(members):
+                self.lists[list_no].append(ids[members], payload[members])
+        self.ntotal += len(ids)
+
+    def add(self, vectors: np.ndarray, ids: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Adds vectors to the index; can be called repeatedly after training.
+
+        Args:
+            vectors: Array of shape (n, dim)
+            ids: Optional int64 ids, defaults to consecutive ids after the last insert
+
+        Returns:
+            The ids assigned to the added vectors
+        """
+        assignments, payload = self.encode(vectors)
+        if ids is None:
+            ids = np.arange(self.ntotal, self.ntotal + len(assignments), dtype=np.int64)
+        ids = np.asarray(ids, dtype=np.int64)
+        self.add_encoded(ids, assignments, payload)
+        return ids
+
+    def search(self, queries: np.ndarray, k: int, nprobe: Optional[int] = None,
+               rerank_vectors: Optional[np.ndarray] = None, rerank_factor: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns (scores, ids) of shape (n_queries, k), best first.
+
+        With PQ, `rerank_vectors` (the original vectors, indexable by id, e.g.
+        a memmap) makes the best `k * rerank_factor` approximate candidates be
+        rescored exactly, so only that many full vectors are read per query.
+
+        Missing results (fewer than k candidates in the probed lists) are
+        padded with score -inf and id -1.
+        """
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.dim)
+        all_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        all_ids = np.full((len(queries), k), -1, dtype=np.int64)
+
+        coarse = queries @ self.centroids.T
+        probes = np.argpartition(-coarse, nprobe - 1, axis=1)[:, :nprobe]
+        sub_dim = self.dim // self.pq_m if self.pq_m else 0
+        lut_offsets = np.arange(self.pq_m, dtype=np.intp) * self.codebooks.shape[1] if self.pq_m else None
+        rerank = self.pq_m and rerank_vectors is not None
+
+        for qi, query in enumerate(queries):
+            if self.pq_m:
+                # q.x ~= q.c + sum_j q_j . codebook_j[code_j], table is list independent
+                lut = np.einsum('jcd,jd->jc', self.codebooks, query.reshape(self.pq_m, sub_dim)).ravel()
+            candidate_ids, candidate_scores = [], []
+            for list_no in probes[qi]:
+                ids, data = self.lists[list_no].view()
+                if not len(ids):
+                    continue
+                if self.pq_m:
+                    scores = coarse[qi, list_no] + lut[data + lut_offsets].sum(axis=1)
+                else:
+                    scores = data @ query
+                candidate_ids.append(ids)
+                candidate_scores.append(scores)
+            if not candidate_ids:
+                continue
+
+            ids = np.concatenate(candidate_ids)
+            scores = np.concatenate(candidate_scores)
+            if rerank:
+                n = min(k * rerank_factor, len(ids))
+                top = np.argpartition(-scores, n - 1)[:n]
+                # Sorted ids read a memmap front to back
+                ids = np.sort(ids[top])
+                scores = np.asarray(rerank_vectors[ids], dtype=np.float32) @ query
+            n = min(k, len(ids))
+            top = np.argpartition(-scores, n - 1)[:n]
+            top = top[np.argsort(-scores[top])]
+            all_scores[qi, :n] = scores[top]
+            all_ids[qi, :n] = ids[top]
+        return all_scores, all_ids
+
+    @property
+    def memory_bytes(self) -> int:
+        """Approximate memory used by centroids, codebooks and inverted lists."""
+        total = sum(inverted.nbytes for inverted in self.lists)
+        if self.centroids is not None:
+            total += self.centroids.nbytes
+        if self.codebooks is not None:
+            total += self.codebooks.nbytes
+        return total
+
+    def save(self, path: str, contents: bool = True):
+        """Writes the trained index to a single .npz file, with its inverted lists unless `contents` is False."""
+        if not self.is_trained:
+            raise ValueError("Cannot save an untrained index")
+        arrays = {}
+        if contents:
+            arrays['sizes'] = np.array([inverted.size for inverted in self.lists], dtype=np.int64)
+            arrays['ids'] = np.concatenate([inverted.view()[0] for inverted in self.lists])
+            arrays['data'] = np.concatenate([inverted.view()[1] for inverted in self.lists])
+        with open(path, 'wb') as file:  # file handle keeps np.savez from appending ".npz"
+            np.savez(
+                file,
+                config=np.array([self.dim, self.nlist, self.pq_m, self.nprobe], dtype=np.int64),
+                centroids=self.centroids,
+                codebooks=self.codebooks if self.codebooks is not None else np.empty(0, dtype=np.float32),
+                **arrays,
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "IVFIndex":
+        """Loads an index written by `save`."""
+        with np.load(path) as archive:
+            dim, nlist, pq_m, nprobe = (int(value) for value in archive['config'])
+            index = cls(dim, nlist=nlist, pq_m=pq_m, nprobe=nprobe)
+            index.centroids = archive['centroids']
+            index.codebooks = archive['codebooks'] if pq_m else None
+            index._new_lists()
+            if 'sizes' not in archive:
+                return index
+            offsets = np.concatenate([[0], np.cumsum(archive['sizes'])])
+            ids, data = archive['ids'], archive['data']
+            for list_no in range(nlist):
+                start, end = offsets[list_no], offsets[list_no + 1]
+                if end > start:
+                    index.lists[list_no].append(ids[start:end], data[start:end])
+            index.ntotal = int(offsets[-1])
+        return index
+
+
+class PersistentIVFIndex:
+    """
+    An IVFIndex over a growing collection, stored as append-only files.
+
+    Files next to `path`:
+        path           trained centroids and codebooks, rewritten only by `build`
+        path.vectors   original float32 vectors in id order (training samples, exact PQ re-ranking)
+        path.lists     int32 list number of each vector
+        path.codes     uint8 PQ codes of each vector (PQ indexes only)
+
+    `add` appends the new vectors to these files and to their inverted lists,
+    so an insert costs time proportional to the batch, not the collection.
+    The index is (re)built from a sample of at most `train_size` vectors
+    whenever the collection has grown enough to use twice as many lists, or
+    to use PQ at all (which needs PQ_CENTROIDS training vectors); until then a
+    small collection is simply indexed with fewer lists.
+    """
+
+    def __init__(self, path: str, max_nlist: int = 1024, pq_m: int = 0, nprobe: int = 16,
+                 train_size: int = 100000, rerank_factor: int = 10):
+        self.path = path
+        self.max_nlist = max_nlist
+        self.pq_m = pq_m
+        self.nprobe = nprobe
+        self.train_size = train_size
+        self.rerank_factor = rerank_factor
+        self.dim: Optional[int] = None
+        self.index: Optional[IVFIndex] = None
+        self.ntotal = 0
+        self._vectors: Optional[np.ndarray] = None
+        if os.path.exists(path):
+            self._load()
+
+    def _target(self, n: int) -> Tuple[int, int]:
+        """(nlist, pq_m) the collection should be indexed with at `n` vectors."""
+        nlist = max(1, min(self.max_nlist, n // MIN_POINTS_PER_LIST))
+        pq_m = self.pq_m if n >= PQ_CENTROIDS else 0
+        return nlist, pq_m
+
+    def _needs_build(self) -> bool:
+        if self.index is None:
+            return True
+        nlist, pq_m = self._target(self.ntotal)
+        # Doubling the lists before retraining keeps the total retraining cost linear
+        return pq_m != self.index.pq_m or nlist >= min(2 * self.index.nlist, self.max_nlist) > self.index.nlist
+
+    def _raw_vectors(self) -> np.ndarray:
+        if self._vectors is None or len(self._vectors) != self.ntotal:
+            self._vectors = np.memmap(self.path + ".vectors", dtype=np.float32, mode='r', shape=(self.ntotal, self.dim))
+        return self._vectors
+
+    def _append_encoded(self, assignments: np.ndarray, payload: np.ndarray, suffix: str = ""):
+        with open(self.path + ".lists" + suffix, 'ab') as file:
+            file.write(assignments.astype(np.int32).tobytes())
+        if self.index.pq_m:
+            with open(self.path + ".codes" + suffix, 'ab') as file:
+                file.write(payload.tobytes())
+
+    def add(self, vectors: np.ndarray) -> np.ndarray:
+        """Appends vectors to the collection and returns their ids (consecutive, starting at the previous size)."""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+        vectors = vectors.reshape(-1, self.dim)
+        ids = np.arange(self.ntotal, self.ntotal + len(vectors), dtype=np.int64)
+        with open(self.path + ".vectors", 'ab') as file:
+            file.write(vectors.tobytes())
+        self.ntotal += len(vectors)
+
+        if self._needs_build():
+            self.build()
+        else:
+            assignments, payload = self.index.encode(vectors)
+            self._append_encoded(assignments, payload)
+            self.index.add_encoded(ids, assignments, payload)
+        return ids
+
+    def build(self, seed: int = 0):
+        """Trains a new index on a random sample of the stored vectors and re-assigns all of them."""
+        if not self.ntotal:
+            return
+        vectors = self._raw_vectors()
+        nlist, pq_m = self._target(self.ntotal)
+        rng = np.random.default_rng(seed)
+        sample = np.sort(rng.choice(self.ntotal, min(self.train_size, self.ntotal), replace=False))
+
+        index = IVFIndex(self.dim, nlist=nlist, pq_m=pq_m, nprobe=self.nprobe)
+        index.train(np.asarray(vectors[sample]), seed=seed)
+        # Written to temporary files and swapped in at the end, so a failed build leaves the old index usable
+        for name in (".lists.tmp", ".codes.tmp"):
+            if os.path.exists(self.path + name):
+                os.remove(self.path + name)
+        previous, self.index = self.index, index
+        try:
+            for start in range(0, self.ntotal, ASSIGN_BATCH_SIZE):
+                batch = np.asarray(vectors[start:start + ASSIGN_BATCH_SIZE])
+                assignments, payload = index.encode(batch)
+                self._append_encoded(assignments, payload, suffix=".tmp")
+                index.add_encoded(np.arange(start, start + len(batch)), assignments, payload)
+            index.save(self.path + ".tmp", contents=False)
+        except BaseException:
+            self.index = previous
+            raise
+        os.replace(self.path + ".lists.tmp", self.path + ".lists")
+        if pq_m:
+            os.replace(self.path + ".codes.tmp", self.path + ".codes")
+        elif os.path.exists(self.path + ".codes"):
+            os.remove(self.path + ".codes")
+        os.replace(self.path + ".tmp", self.path)
+        print(f"Built IVF index: {self.ntotal} vectors, {index.nlist} lists, "
+              f"{'PQ' + str(index.pq_m) if index.pq_m else 'flat'}, trained on {len(sample)}")
+
+    def _load(self):
+        self.index = IVFIndex.load(self.path)
+        self.dim = self.index.dim
+        stored = os.path.getsize(self.path + ".vectors") // (4 * self.dim) if os.path.exists(self.path + ".vectors") else 0
+        assignments = np.fromfile(self.path + ".lists", dtype=np.int32) if os.path.exists(self.path + ".lists") else np.empty(0, np.int32)
+        n = min(stored, len(assignments))
+        if self.index.pq_m:
+            codes = np.fromfile(self.path + ".codes", dtype=np.uint8) if os.path.exists(self.path + ".codes") else np.empty(0, np.uint8)
+            n = min(n, len(codes) // self.index.pq_m)
+
+        # Drop the tail of an interrupted write, then encode any vectors stored but not yet assigned
+        with open(self.path + ".vectors", 'ab') as file:
+            file.truncate(stored * 4 * self.dim)
+        with open(self.path + ".lists", 'ab') as file:
+            file.truncate(n * 4)
+        self.ntotal = stored
+        if not stored:
+            return
+        vectors = self._raw_vectors()
+        if self.index.pq_m:
+            with open(self.path + ".codes", 'ab') as file:
+                file.truncate(n * self.index.pq_m)
+            payload = codes[:n * self.index.pq_m].reshape(n, self.index.pq_m)
+        else:
+            payload = np.asarray(vectors[:n])
+        self.index.add_encoded(np.arange(n), assignments[:n].astype(np.int64), payload)
+        if stored > n:
+            assignments, payload = self.index.encode(np.asarray(vectors[n:]))
+            self._append_encoded(assignments, payload)
+            self.index.add_encoded(np.arange(n, stored), assignments, payload)
+
+    def search(self, queries: np.ndarray, k: int, nprobe: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Same as IVFIndex.search; PQ candidates are re-ranked exactly against the stored vectors."""
+        if self.index is None:
+            n = len(np.atleast_2d(queries))
+            return np.full((n, k), -np.inf, dtype=np.float32), np.full((n, k), -1, dtype=np.int64)
+        rerank_vectors = self._raw_vectors() if self.index.pq_m else None
+        return self.index.search(queries, k, nprobe, rerank_vectors=rerank_vectors, rerank_factor=self.rerank_factor)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3 or sys.argv[1] != 'build':
+        print("Usage: python ann_index.py build <index_path>")
+        sys.exit(1)
+    from config import IVF_NLIST, IVF_NPROBE, IVF_PQ_M, IVF_TRAIN_SIZE
+    PersistentIVFIndex(sys.argv[2], max_nlist=IVF_NLIST, pq_m=IVF_PQ_M, nprobe=IVF_NPROBE,
+                       train_size=IVF_TRAIN_SIZE).build()
@@ -1,15 +1,22 @@
-from flask import Flask, render_template, request, redirect, url_for, flash
+import atexit
+from flask import Flask, render_template, request, redirect, url_for, flash, abort, jsonify
+from markupsafe import Markup, escape
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
-from database import get_all_jobs
+from database import (create_job_database, get_jobs_by_salary, get_jobs_in_bbox, get_jobs_page, search_jobs,
+                      SNIPPET_START, SNIPPET_END)
+from job_snapshot import snapshot_job, snapshot_jobs_page
+from cv_matcher import init_cv_match_tables, get_user_matches, schedule_refresh, invalidate_user_matches
 from auth import User, get_user, get_user_by_email, create_user, init_users_table
 import os
 import requests
 from datetime import datetime, timedelta
 from authlib.integrations.flask_client import OAuth
+from config import JOBS_PAGE_SIZE, MAP_PAGE_SIZE, ADMIN_EMAILS
 from config import GOOGLE_CLIENT_ID, GOOGLE_CLIENT_SECRET, GOOGLE_DISCOVERY_URL, WECHAT_CLIENT_ID, WECHAT_CLIENT_SECRET, WECHAT_AUTHORIZE_URL, WECHAT_TOKEN_URL, WECHAT_USER_INFO_URL
-import sqlite3
+from db import get_connection, transaction, query_profile, reset_query_profile, SQLITE_PROFILE
+from visitor_log import VisitorLogWriter
+from visitor_retention import init_visitor_retention
 import socket
-import threading
 
 app = Flask(__name__)
 app.secret_key = os.environ.get("SECRET_KEY") or "dev_secret_key"  # Change this for production
@@ -19,9 +26,6 @@ login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = "login"
 
-# Thread lock for database access
-db_lock = threading.Lock()
-
 # Initialize OAuth
 oauth = OAuth(app)
 google = oauth.register(
@@ -48,12 +52,14 @@ wechat = oauth.register(
 )
 
 def save_visitor(ip_address, user_agent=None):
-    """Save visitor information to the database."""
+    """Queue visitor information to be saved to the database."""
     user_id = None
+    path = None
     try:
         # Check if we're in a request context and current_user is available
         from flask import has_request_context
         if has_request_context():
+            path = request.path
             from flask_login import current_user
             if current_user and current_user.is_authenticated:
                 user_id = current_user.id
@@ -61,31 +67,22 @@ def save_visitor(ip_address, user_agent=None):
         # Not in a Flask request context or current_user not available, treat as guest
         pass
 
-    with db_lock:
-        conn = sqlite3.connect('jobs.db')
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO visitors (ip_address, timestamp, user_agent, user_id)
-            VALUES (?, ?, ?, ?)
-        ''', (ip_address, datetime.now().isoformat(), user_agent, user_id))
-        conn.commit()
-        conn.close()
+    # Written in batches by the background writer; the request doesn't wait for the commit
+    visitor_log.log(ip_address, datetime.now().isoformat(), user_agent, user_id, path)
 
 def get_visitors(limit=100):
     """Get the list of visitors from the database."""
-    with db_lock:
-        conn = sqlite3.connect('jobs.db')
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT v.ip_address, v.timestamp, v.user_agent, u.name
-            FROM visitors v
-            LEFT JOIN users u ON v.user_id = u.id
-            ORDER BY v.timestamp DESC
-            LIMIT ?
-        ''', (limit,))
-        visitors = cursor.fetchall()
-        conn.close()
-        return visitors
+    conn = get_connection('jobs.db')
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT v.ip_address, v.timestamp, v.user_agent, u.name
+        FROM visitors v
+        LEFT JOIN users u ON v.user_id = u.id
+        ORDER BY v.timestamp DESC
+        LIMIT ?
+    ''', (limit,))
+    visitors = cursor.fetchall()
+    return visitors
 
 def get_ip_location(ip_address):
     """Get location and coordinates for an IP address."""
@@ -149,43 +146,51 @@ init_users_table()
 
 def init_cv_uploads_table():
     """Initialize the CV uploads table if it doesn't exist."""
-    conn = sqlite3.connect("jobs.db")
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS cv_uploads (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            filename TEXT NOT NULL,
-            filepath TEXT NOT NULL,
-            upload_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users (id)
-        )
-    """)
-    conn.commit()
-    conn.close()
+    with transaction("jobs.db") as conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS cv_uploads (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                filename TEXT NOT NULL,
+                filepath TEXT NOT NULL,
+                upload_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (user_id) REFERENCES users (id)
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_cv_uploads_user ON cv_uploads (user_id, upload_date)")
 
 def init_job_applications_table():
     """Initialize the job applications table if it doesn't exist."""
-    conn = sqlite3.connect("jobs.db")
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS job_applications (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            job_id INTEGER NOT NULL,
-            job_title TEXT,
-            job_organization TEXT,
-            job_location TEXT,
-            application_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            status TEXT DEFAULT 'Applied',
-            FOREIGN KEY (user_id) REFERENCES users (id),
-            FOREIGN KEY (job_id) REFERENCES job_postings (id)
-        )
-    """)
-    conn.commit()
-    conn.close()
-
-# Initialize CV uploads and job applications tables
+    with transaction("jobs.db") as conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS job_applications (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                job_id INTEGER NOT NULL,
+                job_title TEXT,
+                job_organization TEXT,
+                job_location TEXT,
+                application_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                status TEXT DEFAULT 'Applied',
+                FOREIGN KEY (user_id) REFERENCES users (id),
+                FOREIGN KEY (job_id) REFERENCES job_postings (id)
+            )
+        """)
+        # Per-job and per-user lookups are index range scans instead of table scans
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_job_applications_job ON job_applications (job_id, user_id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_job_applications_user ON job_applications (user_id, application_date)")
+
+# Initialize job tables (and the search index), CV uploads and job applications tables
+create_job_database()
 init_cv_uploads_table()
 init_job_applications_table()
+init_cv_match_tables()
+# Timestamp index for the visitor list, rollup table for visits past retention
+init_visitor_retention('jobs.db')
+
+# Background writer for visitor events (and their retention), flushed when the process exits
+visitor_log = VisitorLogWriter('jobs.db')
+atexit.register(visitor_log.stop)
 
 # Make current_user available in all templates
 @app.template_filter('truncate_words')
@@ -204,141 +209,60 @@ def truncate_words(text, num_words=50):
 def inject_user():
     return dict(current_user=current_user)
 
-# Cache for geocoding results
-geocode_cache = {}
-
-def parse_date(date_str):
-    """Parse date string from database format"""
-    if not date_str or date_str == "None":
+def days_to_since(days):
+    """Converts a ?days=N filter into the ISO date N days ago (None if absent or invalid)."""
+    try:
+        return (datetime.now() - timedelta(days=int(days))).date().isoformat() if days else None
+    except (ValueError, TypeError, OverflowError):
         return None
 
-    # Clean up the date string by removing field labels
-    date_str = date_str.replace("Placed On:", "").replace("Closes:", "").strip()
-
-    # Try different date formats
-    formats = [
-        "%dth %B %Y",  # 22nd December 2025
-        "%dst %B %Y",  # 1st January 2026
-        "%dnd %B %Y",  # 2nd January 2026
-        "%drd %B %Y",  # 3rd January 2026
-        "%d %B %Y",    # 1 January 2026 (fallback)
-    ]
+SALARY_SORTS = {"salary_desc": True, "salary_asc": False}
 
-    for fmt in formats:
+def salary_args():
+    """Reads ?min_salary=, ?max_salary= (annual amounts) and ?sort= from the request, ignoring invalid values."""
+    bounds = []
+    for name in ("min_salary", "max_salary"):
         try:
-            return datetime.strptime(date_str, fmt)
+            bounds.append(float(request.args[name]) if request.args.get(name) else None)
         except ValueError:
-            continue
-
-    return None
-
-def filter_jobs_by_date(jobs, days=None):
-    """Filter jobs by date range (last N days)"""
-    if not days:
-        return jobs
-
+            bounds.append(None)
+    sort = request.args.get("sort")
+    return bounds[0], bounds[1], (sort if sort in SALARY_SORTS else None)
+
+def paginated_jobs(page_size, query=None, days=None):
+    """Returns (jobs, next_cursor) for the page after the request's ?after= cursor; a query uses full-text search."""
+    after = request.args.get("after")
+    since = days_to_since(days)
+    min_salary, max_salary, sort = salary_args()
+    if query:
+        return search_jobs(query, page_size, after, since=since, min_salary=min_salary, max_salary=max_salary)
+    if sort:
+        return get_jobs_by_salary(page_size, after, SALARY_SORTS[sort], since=since,
+                                  min_salary=min_salary, max_salary=max_salary)
+    after_id = int(after) if after and after.isdigit() else None
+    if min_salary is not None or max_salary is not None:
+        # Salary ranges are index range scans in SQL
+        return get_jobs_page(page_size, after_id, since=since, min_salary=min_salary, max_salary=max_salary)
+    # Listings are served from the in-memory snapshot; ranked search needs the FTS index
+    return snapshot_jobs_page(page_size, after_id, since=since)
+
+WORLD_BBOX = (-180.0, -90.0, 180.0, 90.0)
+
+def viewport_jobs(days=None):
+    """Returns (jobs, truncated) inside the request's ?bbox=west,south,east,north (the whole world if absent)."""
     try:
-        days = int(days)
-        cutoff_date = datetime.now() - timedelta(days=days)
-        filtered_jobs = []
-
-        for job in jobs:
-            # Try placed_on date first, then closes date
-            job_date = parse_date(job.get("placed_on")) or parse_date(job.get("closes"))
-
-            if job_date and job_date >= cutoff_date:
-                filtered_jobs.append(job)
-
-        return filtered_jobs
-    except (ValueError, TypeError):
-        return jobs
-
-def geocode_location(location):
-    """Convert location name to coordinates using Nominatim API"""
-    if not location:
-        return None
-
-    # Check cache first
-    if location in geocode_cache:
-        return geocode_cache[location]
-
-    try:
-        # Clean up location string
-        clean_location = location.replace(", Hybrid", "").strip()
-
-        # Determine if this is likely a UK location or international
-        # If it contains obvious international indicators, don't append ", UK"
-        is_international = any(indicator in clean_location.lower() for indicator in
-                              ['cn', 'china', 'guangzhou', 'beijing', 'shanghai', 'hk', 'hong kong',
-                               'usa', 'us', 'united states', 'canada', 'australia', 'germany',
-                               'france', 'italy', 'spain', 'japan', 'korea', 'india', 'brazil'])
-
-        # Use Nominatim API (OpenStreetMap)
-        url = "https://nominatim.openstreetmap.org/search"
-        if is_international:
-            params = {
-                "q": clean_location,
-                "format": "json",
-                "limit": 1
-            }
-        else:
-            params = {
-                "q": f"{clean_location}, UK",  # Assume UK locations for jobs.ac.uk
-                "format": "json",
-                "limit": 1
-            }
-        headers = {"User-Agent": "RAG-Job-Search/1.0"}
-
-        response = requests.get(url, params=params, headers=headers)
-        data = response.json()
-
-        if data:
-            lat = float(data[0]["lat"])
-            lon = float(data[0]["lon"])
-            result = {"lat": lat, "lon": lon, "display_name": data[0]["display_name"]}
-            geocode_cache[location] = result
-            return result
-
-    except Exception as e:
-        print(f"Geocoding error for {location}: {e}")
-
-    # Fallback coordinates for common UK cities
-    fallbacks = {
-        "London": {"lat": 51.5074, "lon": -0.1278, "display_name": "London, UK"},
-        "Cambridge": {"lat": 52.2053, "lon": 0.1218, "display_name": "Cambridge, UK"},
-        "Edinburgh": {"lat": 55.9533, "lon": -3.1883, "display_name": "Edinburgh, UK"},
-        "Southampton": {"lat": 50.9097, "lon": -1.4044, "display_name": "Southampton, UK"},
-        "Plymouth": {"lat": 50.3755, "lon": -4.1427, "display_name": "Plymouth, UK"}
-    }
-
-    # Also add some international fallbacks
-    international_fallbacks = {
-        "Guangzhou": {"lat": 23.1291, "lon": 113.2644, "display_name": "Guangzhou, China"},
-        "Beijing": {"lat": 39.9042, "lon": 116.4074, "display_name": "Beijing, China"},
-        "Shanghai": {"lat": 31.2304, "lon": 121.4737, "display_name": "Shanghai, China"},
-        "Hong Kong": {"lat": 22.3193, "lon": 114.1694, "display_name": "Hong Kong, China"},
-        "New York": {"lat": 40.7128, "lon": -74.0060, "display_name": "New York, USA"},
-        "Los Angeles": {"lat": 34.0522, "lon": -118.2437, "display_name": "Los Angeles, USA"},
-        "Tokyo": {"lat": 35.6762, "lon": 139.6503, "display_name": "Tokyo, Japan"},
-        "Paris": {"lat": 48.8566, "lon": 2.3522, "display_name": "Paris, France"},
-        "Berlin": {"lat": 52.5200, "lon": 13.4050, "display_name": "Berlin, Germany"},
-        "Sydney": {"lat": -33.8688, "lon": 151.2093, "display_name": "Sydney, Australia"}
-    }
-
-    # Try to match against both UK and international fallbacks
-    result = fallbacks.get(clean_location)
-    if result:
-        geocode_cache[location] = result
-        return result
-
-    # Try to find a match in the international fallbacks
-    # Look for partial matches in the location string
-    for city, coords in international_fallbacks.items():
-        if city.lower() in clean_location.lower():
-            geocode_cache[location] = coords
-            return coords
-
-    return result
+        west, south, east, north = (float(value) for value in request.args["bbox"].split(","))
+    except (KeyError, ValueError):
+        west, south, east, north = WORLD_BBOX
+    min_salary, max_salary, _ = salary_args()
+    return get_jobs_in_bbox(south, west, north, east, MAP_PAGE_SIZE, since=days_to_since(days),
+                            min_salary=min_salary, max_salary=max_salary)
+
+def highlight_snippet(snippet):
+    """HTML-escapes a search snippet and wraps the matched text in <mark>."""
+    if not snippet:
+        return ""
+    return Markup(str(escape(snippet)).replace(SNIPPET_START, "<mark>").replace(SNIPPET_END, "</mark>"))
 
 @app.route("/")
 def index():
@@ -352,42 +276,34 @@ def index():
     print(f"Home page accessed by IP: {ip_address}")
     save_visitor(ip_address, user_agent)
 
-    jobs = get_all_jobs()
     days_filter = request.args.get("days")
+    jobs, next_cursor = paginated_jobs(JOBS_PAGE_SIZE, days=days_filter)
 
-    if days_filter:
-        jobs = filter_jobs_by_date(jobs, days_filter)
-
-    return render_template("index.html", jobs=jobs, days_filter=days_filter)
+    return render_template("index.html", jobs=jobs, days_filter=days_filter, next_cursor=next_cursor,
+                           min_salary=request.args.get("min_salary"),
+                           max_salary=request.args.get("max_salary"), sort=request.args.get("sort"))
 
 @app.route("/job/<int:job_id>")
 def job_detail(job_id):
     """Display detailed view of a specific job"""
-    jobs = get_all_jobs()
-    job = next((job for job in jobs if job["id"] == job_id), None)
+    job = snapshot_job(job_id)
     if job is None:
         return "Job not found", 404
-    return render_template("job_detail.html", job=job)
+    user_id = current_user.id if current_user.is_authenticated else None
+    application_count, has_applied = get_job_application_stats(job_id, user_id)
+    return render_template("job_detail.html", job=job, application_count=application_count,
+                           has_applied=has_applied)
 
 @app.route("/map")
 def map_view():
     """Display jobs on an interactive map"""
-    jobs = get_all_jobs()
     days_filter = request.args.get("days")
+    # Coordinates are stored at ingest; pans fetch the visible jobs from /api/jobs/bbox
+    jobs, truncated = viewport_jobs(days_filter)
 
-    if days_filter:
-        jobs = filter_jobs_by_date(jobs, days_filter)
-
-    # Add coordinates to jobs
-    jobs_with_coords = []
-    for job in jobs:
-        coords = geocode_location(job["location"])
-        if coords:
-            job_with_coords = dict(job)
-            job_with_coords.update(coords)
-            jobs_with_coords.append(job_with_coords)
-
-    return render_template("map.html", jobs=jobs_with_coords, days_filter=days_filter)
+    return render_template("map.html", jobs=jobs, truncated=truncated, days_filter=days_filter,
+                           bbox_url=url_for("api_jobs_bbox"), min_salary=request.args.get("min_salary"),
+                           max_salary=request.args.get("max_salary"))
 
 @app.route("/search")
 def search():
@@ -398,21 +314,28 @@ def search():
     if not query:
         return redirect(url_for("index", days=days_filter))
 
-    jobs = get_all_jobs()
+    # Ranked full-text search over title, organization, location, and description
+    jobs, next_cursor = paginated_jobs(JOBS_PAGE_SIZE, query=query, days=days_filter)
+    for job in jobs:
+        job["snippet"] = highlight_snippet(job.get("snippet"))
 
-    # Apply date filter first
-    if days_filter:
-        jobs = filter_jobs_by_date(jobs, days_filter)
+    return render_template("index.html", jobs=jobs, search_query=query, days_filter=days_filter,
+                           next_cursor=next_cursor, min_salary=request.args.get("min_salary"),
+                           max_salary=request.args.get("max_salary"), sort=request.args.get("sort"))
 
-    # Then apply search filter
-    filtered_jobs = []
-    for job in jobs:
-        # Search in title, organization, location, and description
-        searchable_text = f"{job.get("title", "")} {job.get("organization", "")} {job.get("location", "")} {job.get("description", "")}".lower()
-        if query in searchable_text:
-            filtered_jobs.append(job)
+@app.route("/api/jobs")
+def api_jobs():
+    """JSON job listing with the same ?q=, ?days=, salary and ?after= parameters as the pages."""
+    query = request.args.get("q", "").lower()
+    page_size = max(1, min(request.args.get("limit", JOBS_PAGE_SIZE, type=int), MAP_PAGE_SIZE))
+    jobs, next_cursor = paginated_jobs(page_size, query=query or None, days=request.args.get("days"))
+    return jsonify({"jobs": jobs, "next_cursor": next_cursor})
 
-    return render_template("index.html", jobs=filtered_jobs, search_query=query, days_filter=days_filter)
+@app.route("/api/jobs/bbox")
+def api_jobs_bbox():
+    """JSON map markers for the jobs inside ?bbox=west,south,east,north, with the ?days= and salary filters."""
+    jobs, truncated = viewport_jobs(request.args.get("days"))
+    return jsonify({"jobs": jobs, "truncated": truncated})
 
 @app.route("/login")
 def login():
@@ -482,15 +405,12 @@ def callback():
             else:
                 print("Updating existing user...")
                 # Update user info if it exists
-                import sqlite3
-                conn = sqlite3.connect("jobs.db")
-                cursor = conn.cursor()
-                cursor.execute("UPDATE users SET name=?, profile_pic=? WHERE email=?",
-                              (user_info.get("name", user_info.get("email", "Unknown")),
-                               user_info.get("picture"),
-                               user_info["email"]))
-                conn.commit()
-                conn.close()
+                with transaction("jobs.db") as conn:
+                    cursor = conn.cursor()
+                    cursor.execute("UPDATE users SET name=?, profile_pic=? WHERE email=?",
+                                  (user_info.get("name", user_info.get("email", "Unknown")),
+                                   user_info.get("picture"),
+                                   user_info["email"]))
                 # Update the user object with new info
                 user.name = user_info.get("name", user_info.get("email", "Unknown"))
                 user.profile_pic = user_info.get("picture")
@@ -561,16 +481,13 @@ def wechat_callback():
             )
         else:
             # Update existing user info
-            import sqlite3
-            conn = sqlite3.connect("jobs.db")
-            cursor = conn.cursor()
-            cursor.execute("UPDATE users SET name=?, profile_pic=? WHERE provider=? AND provider_user_id=?",
-                          (user_info.get('nickname', 'WeChat User'),
-                           user_info.get('headimgurl', ''),
-                           'wechat',
-                           openid))
-            conn.commit()
-            conn.close()
+            with transaction("jobs.db") as conn:
+                cursor = conn.cursor()
+                cursor.execute("UPDATE users SET name=?, profile_pic=? WHERE provider=? AND provider_user_id=?",
+                              (user_info.get('nickname', 'WeChat User'),
+                               user_info.get('headimgurl', ''),
+                               'wechat',
+                               openid))
             # Update the user object with new info
             user.name = user_info.get('nickname', 'WeChat User')
             user.profile_pic = user_info.get('headimgurl', '')
@@ -586,14 +503,13 @@ def wechat_callback():
 
 def get_user_cvs(user_id):
     """Get all CVs uploaded by a specific user."""
-    conn = sqlite3.connect("jobs.db")
+    conn = get_connection("jobs.db")
     cursor = conn.cursor()
     cursor.execute(
         "SELECT id, filename, filepath, upload_date FROM cv_uploads WHERE user_id = ? ORDER BY upload_date DESC",
         (user_id,)
     )
     cv_records = cursor.fetchall()
-    conn.close()
 
     # Convert to list of dictionaries for easier template use
     cvs = []
@@ -609,7 +525,7 @@ def get_user_cvs(user_id):
 
 def get_user_applications(user_id):
     """Get all job applications for a specific user."""
-    conn = sqlite3.connect("jobs.db")
+    conn = get_connection("jobs.db")
     cursor = conn.cursor()
     cursor.execute("""
         SELECT ja.id, ja.job_id, ja.job_title, ja.job_organization,
@@ -622,7 +538,6 @@ def get_user_applications(user_id):
         ORDER BY ja.application_date DESC
     """, (user_id,))
     application_records = cursor.fetchall()
-    conn.close()
 
     # Convert to list of dictionaries for easier template use
     applications = []
@@ -644,6 +559,15 @@ def get_user_applications(user_id):
 
     return applications
 
+def get_job_application_stats(job_id, user_id=None):
+    """Get (number of applications, whether the user has applied) for a job via the job_id index."""
+    conn = get_connection("jobs.db")
+    count, user_applied = conn.execute(
+        "SELECT COUNT(*), COALESCE(SUM(user_id = ?), 0) FROM job_applications WHERE job_id = ?",
+        (user_id, job_id)
+    ).fetchone()
+    return count, bool(user_applied)
+
 def allowed_file(filename):
     """Check if the uploaded file is allowed."""
     allowed_extensions = {'.pdf', '.doc', '.docx', '.txt', '.rtf'}
@@ -662,7 +586,14 @@ def profile():
     """Display user's profile with CVs and job applications."""
     user_cvs = get_user_cvs(current_user.id)
     user_applications = get_user_applications(current_user.id)
-    return render_template("profile.html", user=current_user, cvs=user_cvs, applications=user_applications)
+    try:
+        # Served from the per-user cache; stale matches are shown while a background refresh runs
+        job_matches = get_user_matches(current_user.id) if user_cvs else []
+    except Exception as e:
+        print(f"Error loading CV matches: {e}")
+        job_matches = []
+    return render_template("profile.html", user=current_user, cvs=user_cvs, applications=user_applications,
+                           job_matches=job_matches)
 
 @app.route("/upload_cv", methods=["GET", "POST"])
 @login_required
@@ -701,14 +632,16 @@ def upload_cv():
             file.save(filepath)
 
             # Store file info in the database
-            conn = sqlite3.connect("jobs.db")
-            cursor = conn.cursor()
-            cursor.execute(
-                "INSERT INTO cv_uploads (user_id, filename, filepath) VALUES (?, ?, ?)",
-                (current_user.id, secure_filename(file.filename), filepath)
-            )
-            conn.commit()
-            conn.close()
+            with transaction("jobs.db") as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "INSERT INTO cv_uploads (user_id, filename, filepath) VALUES (?, ?, ?)",
+                    (current_user.id, secure_filename(file.filename), filepath)
+                )
+
+            # Drop stale matches and compute the new ones off the request thread
+            invalidate_user_matches(current_user.id)
+            schedule_refresh(current_user.id)
 
             flash("CV uploaded successfully!", "success")
             return redirect(url_for("upload_cv"))  # Redirect back to upload page to see the new CV
@@ -790,6 +723,17 @@ def visitor_history():
 
     return html
 
+@app.route("/admin/query_profile", methods=["GET", "POST"])
+@login_required
+def admin_query_profile():
+    """Shows this process's SQL profile (SQLITE_PROFILE=true); POST resets it."""
+    if current_user.email.lower() not in ADMIN_EMAILS:
+        abort(403)
+    if request.method == "POST":
+        reset_query_profile()
+    limit = request.args.get("limit", 50, type=int)
+    return jsonify({"enabled": SQLITE_PROFILE, "queries": query_profile()[:limit]})
+
 if __name__ == "__main__":
     # Run with SSL context for HTTPS
     import ssl
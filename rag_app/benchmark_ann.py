@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+ANN Index Benchmark
+
+Compares IVFIndex (flat and PQ variants) against exact inner-product search on
+a synthetic clustered collection of normalized vectors, reporting recall@k,
+query latency, build time and index memory. PQ variants are measured with
+and without exact re-ranking of their candidates against the original vectors.
+
+Usage:
+    python benchmark_ann.py                          # 1M x 128, default settings
+    python benchmark_ann.py --n 2000000 --dim 256 --nlist 2048 --pq-m 0,16,32
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from ann_index import IVFIndex
+
+
+def make_dataset(n: int, dim: int, clusters: int = 4096, seed: int = 0) -> np.ndarray:
+    """Generates normalized vectors drawn around random cluster centres."""
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = np.empty((n, dim), dtype=np.float32)
+    for start in range(0, n, 100000):
+        end = min(start + 100000, n)
+        vectors[start:end] = centres[rng.integers(0, clusters, end - start)]
+        vectors[start:end] += 0.6 * rng.standard_normal((end - start, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def exact_search(vectors: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    """Brute-force top-k ids by inner product."""
+    result = np.empty((len(queries), k), dtype=np.int64)
+    for qi, query in enumerate(queries):
+        scores = vectors @ query
+        top = np.argpartition(-scores, k - 1)[:k]
+        result[qi] = top[np.argsort(-scores[top])]
+    return result
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark IVF/PQ against exact search")
+    parser.add_argument("--n", type=int, default=1000000, help="Number of indexed vectors")
+    parser.add_argument("--dim", type=int, default=128, help="Vector dimension")
+    parser.add_argument("--queries", type=int, default=200, help="Number of queries")
+    parser.add_argument("--k", type=int, default=10, help="Neighbours per query")
+    parser.add_argument("--nlist", type=int, default=1024, help="Number of inverted lists")
+    parser.add_argument("--train-size", type=int, default=100000, help="Training sample size")
+    parser.add_argument("--pq-m", default="0,16", help="Comma-separated PQ sub-quantizer counts (0 = flat)")
+    parser.add_argument("--nprobe", default="1,4,8,16,32,64", help="Comma-separated probe counts")
+    args = parser.parse_args()
+
+    print(f"Generating {args.n:,} x {args.dim} vectors...")
+    # Queries are held-out points from the same distribution as the collection
+    vectors = make_dataset(args.n + args.queries, args.dim)
+    vectors, queries = vectors[:args.n], vectors[args.n:]
+
+    start = time.perf_counter()
+    truth = exact_search(vectors, queries, args.k)
+    exact_ms = (time.perf_counter() - start) * 1000 / args.queries
+    print(f"\nExact search: {exact_ms:.2f} ms/query, {vectors.nbytes / 2**20:.1f} MB")
+
+    rng = np.random.default_rng(2)
+    sample = vectors[rng.choice(args.n, min(args.train_size, args.n), replace=False)]
+
+    for pq_m in (int(value) for value in args.pq_m.split(",")):
+        label = f"IVF{args.nlist}" + (f",PQ{pq_m}" if pq_m else ",Flat")
+        index = IVFIndex(args.dim, nlist=args.nlist, pq_m=pq_m)
+
+        start = time.perf_counter()
+        index.train(sample)
+        train_s = time.perf_counter() - start
+        start = time.perf_counter()
+        index.add(vectors)
+        add_s = time.perf_counter() - start
+
+        print(f"\n{label}: train {train_s:.1f}s, add {add_s:.1f}s, {index.memory_bytes / 2**20:.1f} MB")
+        for rerank_vectors in ((None, vectors) if pq_m else (None,)):
+            if pq_m:
+                print("  exact re-rank of PQ candidates" if rerank_vectors is not None else "  PQ scores only")
+            print(f"{'nprobe':>8} {'recall@' + str(args.k):>10} {'ms/query':>10} {'speedup':>8}")
+            for nprobe in (int(value) for value in args.nprobe.split(",")):
+                start = time.perf_counter()
+                _, ids = index.search(queries, args.k, nprobe=nprobe, rerank_vectors=rerank_vectors)
+                ms = (time.perf_counter() - start) * 1000 / args.queries
+                print(f"{nprobe:>8} {recall_at_k(ids, truth):>10.3f} {ms:>10.2f} {exact_ms / ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+HTML Extraction Benchmark
+
+Measures per-page parse time and peak memory of `scraper.extract_text_from_html`
+(targeted SoupStrainer parsing with the fastest available parser) against the
+previous approach of building a full `html.parser` tree and searching it.
+
+The corpus is a directory of saved job pages (*.html). The site-specific
+selectors are chosen from the file name, so name files after their source,
+e.g. `jobs.ac.uk_DFG123.html` or `careers.hsbc_0001.html`.
+
+Usage:
+    python benchmark_extraction.py --save job_urls.txt pages/   # download a corpus
+    python benchmark_extraction.py pages/                       # run the benchmark
+"""
+
+import argparse
+import os
+import re
+import statistics
+import sys
+import time
+import tracemalloc
+from urllib.parse import urlsplit
+
+from bs4 import BeautifulSoup
+
+from scraper import extract_text_from_html, HTML_PARSER
+
+
+def extract_text_full_tree(url: str, content: str) -> str:
+    """The pre-optimization extraction: full html.parser tree plus find() passes."""
+    soup = BeautifulSoup(content, 'html.parser')
+    if "jobs.ac.uk" in url:
+        main_content = soup.find('main') or soup.find('div', class_='main-content') or soup.find('article')
+    elif "careers.hsbc" in url:
+        main_content = (soup.find('div', class_='jobDescription') or
+                        soup.find('div', class_='job-detail') or
+                        soup.find('div', class_='job-content') or
+                        soup.find('div', attrs={'data-testid': 'job-description'}) or
+                        soup.find('div', id='jobDescription') or
+                        soup.find('section', class_='job') or
+                        soup.find('main') or
+                        soup.find('article'))
+        if main_content:
+            for element in main_content.find_all(['div', 'section'], class_=lambda x: x and ('cookie' in x.lower() or 'consent' in x.lower() or 'banner' in x.lower())):
+                element.decompose()
+    else:
+        main_content = soup.find('main') or soup.find('article') or soup.find('div', class_='content')
+    return main_content.get_text() if main_content else soup.get_text()
+
+
+def measure(extract, url: str, content: str, repeat: int):
+    """Returns (median seconds, peak traced bytes, extracted text) for one page."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        text = extract(url, content)
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    extract(url, content)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(timings), peak, text
+
+
+def save_corpus(urls_file: str, directory: str):
+    """Downloads each URL in the file into the corpus directory."""
+    from http_client import fetch_text
+    os.makedirs(directory, exist_ok=True)
+    with open(urls_file, 'r', encoding='utf-8') as file:
+        urls = [line.strip() for line in file if line.strip() and not line.startswith('#')]
+    for i, url in enumerate(urls, 1):
+        name = f"{urlsplit(url).netloc}_{i:04d}.html"
+        try:
+            with open(os.path.join(directory, name), 'w', encoding='utf-8') as out:
+                out.write(fetch_text(url))
+            print(f"Saved {url} -> {name}")
+        except Exception as e:
+            print(f"Failed to save {url}: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark HTML text extraction")
+    parser.add_argument("directory", help="Directory of saved *.html job pages")
+    parser.add_argument("--save", metavar="URLS_FILE", help="Download the URLs in this file into the directory first")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing repetitions per page")
+    args = parser.parse_args()
+
+    if args.save:
+        save_corpus(args.save, args.directory)
+
+    pages = sorted(name for name in os.listdir(args.directory) if name.endswith('.html'))
+    if not pages:
+        print(f"No .html files found in {args.directory}")
+        sys.exit(1)
+
+    print(f"Parser backend: {HTML_PARSER}")
+    print(f"{'page':<40} {'KB':>6} {'old ms':>8} {'new ms':>8} {'old MB':>7} {'new MB':>7} {'same':>5}")
+    old_total = new_total = 0.0
+    old_peaks, new_peaks = [], []
+    for name in pages:
+        with open(os.path.join(args.directory, name), 'r', encoding='utf-8', errors='replace') as file:
+            content = file.read()
+        # The file name prefix stands in for the host when picking site selectors
+        url = f"https://{name.split('_')[0]}/{name}"
+        old_s, old_peak, old_text = measure(extract_text_full_tree, url, content, args.repeat)
+        new_s, new_peak, new_text = measure(extract_text_from_html, url, content, args.repeat)
+        same = re.sub(r'\s+', ' ', old_text).strip() == re.sub(r'\s+', ' ', new_text).strip()
+        old_total += old_s
+        new_total += new_s
+        old_peaks.append(old_peak)
+        new_peaks.append(new_peak)
+        print(f"{name[:40]:<40} {len(content) / 1024:>6.0f} {old_s * 1000:>8.2f} {new_s * 1000:>8.2f} "
+              f"{old_peak / 2**20:>7.2f} {new_peak / 2**20:>7.2f} {'yes' if same else 'NO':>5}")
+
+    print(f"\n{len(pages)} page(s): mean {old_total / len(pages) * 1000:.2f} ms -> {new_total / len(pages) * 1000:.2f} ms "
+          f"({old_total / new_total:.1f}x), mean peak {statistics.mean(old_peaks) / 2**20:.2f} MB -> "
+          f"{statistics.mean(new_peaks) / 2**20:.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -21,4 +21,84 @@ WECHAT_CLIENT_ID = os.getenv("WECHAT_CLIENT_ID")
 WECHAT_CLIENT_SECRET = os.getenv("WECHAT_CLIENT_SECRET")
 WECHAT_AUTHORIZE_URL = "https://open.weixin.qq.com/connect/qrconnect"
 WECHAT_TOKEN_URL = "https://api.weixin.qq.com/sns/oauth2/access_token"
-WECHAT_USER_INFO_URL = "https://api.weixin.qq.com/sns/userinfo"
\ No newline at end of file
+WECHAT_USER_INFO_URL = "https://api.weixin.qq.com/sns/userinfo"
+
+# CV-to-job matching configuration
+CV_MATCH_TOP_K = int(os.getenv("CV_MATCH_TOP_K", "10"))
+CV_MATCH_RERANK = os.getenv("CV_MATCH_RERANK", "false").lower() == "true"  # Reorder top candidates with the cross-encoder
+CV_MATCH_RERANK_CANDIDATES = int(os.getenv("CV_MATCH_RERANK_CANDIDATES", "50"))
+CV_MATCH_WORKERS = int(os.getenv("CV_MATCH_WORKERS", "2"))  # background threads recomputing matches
+
+# Vector index configuration: "chroma" (default) or "ivf" for the approximate IVF/PQ index
+VECTOR_INDEX = os.getenv("VECTOR_INDEX", "chroma").lower()
+IVF_NLIST = int(os.getenv("IVF_NLIST", "1024"))  # upper bound, small collections use fewer lists
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", "16"))
+IVF_PQ_M = int(os.getenv("IVF_PQ_M", "0"))  # 0 keeps full vectors, otherwise bytes per vector
+IVF_INDEX_PATH = os.getenv("IVF_INDEX_PATH", "chunks.ivf.npz")
+IVF_TRAIN_SIZE = int(os.getenv("IVF_TRAIN_SIZE", "100000"))  # vectors sampled to (re)train the index
+IVF_RERANK_FACTOR = int(os.getenv("IVF_RERANK_FACTOR", "10"))  # PQ candidates per result rescored exactly
+
+# Query embedding cache: entries kept in memory, optional SQLite file to persist them across restarts
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "10000"))
+QUERY_CACHE_PATH = os.getenv("QUERY_CACHE_PATH") or None
+QUERY_CACHE_FLUSH_SECONDS = float(os.getenv("QUERY_CACHE_FLUSH_SECONDS", "30"))  # how often new entries and hits are written
+
+# Scraper HTTP configuration (per-host pooled sessions)
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "30"))
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "10"))  # host pools cached per adapter
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "10"))  # keep-alive connections per host
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+HTTP_BACKOFF_FACTOR = float(os.getenv("HTTP_BACKOFF_FACTOR", "0.5"))  # sleeps 0.5s, 1s, 2s, ...
+HTTP_USER_AGENT = os.getenv("HTTP_USER_AGENT", "RAG-Job-Search/1.0")
+HTTP_MAX_BODY_BYTES = int(os.getenv("HTTP_MAX_BODY_BYTES", str(5 * 1024 * 1024)))  # decoded body size cap per fetch
+HTTP_CHUNK_SIZE = int(os.getenv("HTTP_CHUNK_SIZE", str(64 * 1024)))
+HTTP_ALLOWED_CONTENT_TYPES = [t.strip().lower() for t in os.getenv(
+    "HTTP_ALLOWED_CONTENT_TYPES", "text/html,application/xhtml+xml,text/plain").split(",") if t.strip()]
+
+# Conditional-GET response cache for re-crawls (set HTTP_CACHE_PATH to "" to disable)
+HTTP_CACHE_PATH = os.getenv("HTTP_CACHE_PATH", "http_cache.db")
+HTTP_CACHE_MAX_BYTES = int(os.getenv("HTTP_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+HTTP_CACHE_MAX_AGE_DAYS = float(os.getenv("HTTP_CACHE_MAX_AGE_DAYS", "30"))
+
+# Crawler concurrency and politeness
+CRAWL_MAX_CONCURRENCY = int(os.getenv("CRAWL_MAX_CONCURRENCY", "16"))
+CRAWL_PER_HOST_CONCURRENCY = int(os.getenv("CRAWL_PER_HOST_CONCURRENCY", "2"))
+CRAWL_PER_HOST_RATE = float(os.getenv("CRAWL_PER_HOST_RATE", "1.0"))  # requests per second per host
+CRAWL_PER_HOST_BURST = float(os.getenv("CRAWL_PER_HOST_BURST", "1"))
+
+# Crawl frontier retries
+CRAWL_MAX_ATTEMPTS = int(os.getenv("CRAWL_MAX_ATTEMPTS", "5"))
+CRAWL_BACKOFF_BASE = float(os.getenv("CRAWL_BACKOFF_BASE", "60"))  # seconds before the first retry, doubled each attempt
+CRAWL_BACKOFF_MAX = float(os.getenv("CRAWL_BACKOFF_MAX", str(6 * 3600)))
+CRAWL_LEASE_SECONDS = float(os.getenv("CRAWL_LEASE_SECONDS", "900"))
+CRAWL_LEASE_PER_HOST = int(os.getenv("CRAWL_LEASE_PER_HOST", "4"))  # URLs one host may have leased at once
+CRAWL_HOSTS_REFRESH_SECONDS = float(os.getenv("CRAWL_HOSTS_REFRESH_SECONDS", "30"))  # how often leasing re-reads which hosts have work
+CRAWL_MAX_IDLE_WAIT = float(os.getenv("CRAWL_MAX_IDLE_WAIT", "300"))  # wait for backed-off retries up to this long
+
+# Job URL discovery from listing pages
+LISTING_URLS_FILE = os.getenv("LISTING_URLS_FILE", "listing_urls.txt")
+DISCOVERY_MAX_PAGES = int(os.getenv("DISCOVERY_MAX_PAGES", "50"))  # safety cap for a first full walk
+DISCOVERY_PAGE_DELAY = float(os.getenv("DISCOVERY_PAGE_DELAY", "1.0"))  # seconds between pages of one listing
+
+# Job listing pagination
+JOBS_PAGE_SIZE = int(os.getenv("JOBS_PAGE_SIZE", "50"))
+MAP_PAGE_SIZE = int(os.getenv("MAP_PAGE_SIZE", "200"))
+JOB_SNAPSHOT_CHECK_SECONDS = float(os.getenv("JOB_SNAPSHOT_CHECK_SECONDS", "1.0"))  # how often the job list's data version is checked
+JOB_SNAPSHOT_REBUILD_SECONDS = float(os.getenv("JOB_SNAPSHOT_REBUILD_SECONDS", "60"))  # most time between reloads while jobs keep changing
+
+# Admin pages (comma-separated account emails)
+ADMIN_EMAILS = {e.strip().lower() for e in os.getenv("ADMIN_EMAILS", "").split(",") if e.strip()}
+
+# Bulk export/import
+TRANSFER_CHUNK_SIZE = int(os.getenv("TRANSFER_CHUNK_SIZE", "1000"))  # rows per fetch, transaction and Parquet row group
+
+# Geocoding (Nominatim)
+GEOCODE_MIN_INTERVAL = float(os.getenv("GEOCODE_MIN_INTERVAL", "1.0"))  # seconds between Nominatim requests
+
+# Visitor logging (write-behind) and retention, see the root visitor_log.py and visitor_retention.py
+VISITOR_LOG_QUEUE_SIZE = int(os.getenv("VISITOR_LOG_QUEUE_SIZE", "10000"))  # events held in memory before new ones are dropped
+VISITOR_LOG_BATCH_SIZE = int(os.getenv("VISITOR_LOG_BATCH_SIZE", "500"))  # most events written per transaction
+VISITOR_RAW_RETENTION_DAYS = int(os.getenv("VISITOR_RAW_RETENTION_DAYS", "30"))  # raw visits older than this are rolled up
+VISITOR_HOURLY_RETENTION_DAYS = int(os.getenv("VISITOR_HOURLY_RETENTION_DAYS", "90"))  # daily rollups are kept
+VISITOR_RETENTION_INTERVAL = float(os.getenv("VISITOR_RETENTION_INTERVAL", "3600"))  # seconds between runs, 0 disables
+VISITOR_VACUUM_PAGES = int(os.getenv("VISITOR_VACUUM_PAGES", "1000"))  # free pages returned per run
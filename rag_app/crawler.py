@@ -0,0 +1,180 @@
+"""
+Concurrent Crawl Engine with Per-host Rate Limiting
+
+Runs a per-URL handler (fetch, extract, store) for many URLs concurrently.
+asyncio schedules the work and enforces the limits; each handler call runs in
+a bounded thread pool so the existing blocking pipeline (pooled `requests`
+sessions, LLM calls, SQLite writes) is reused unchanged.
+
+Limits:
+    - a global cap on in-flight URLs
+    - a per-host cap on in-flight URLs
+    - a per-host token bucket (requests per second with a small burst), which
+      replaces the old global sleep between every request so different hosts
+      no longer wait on each other
+
+`run_feed` keeps one crawler (and its per-host buckets) running for a whole
+crawl, pulling more URLs from a source such as the frontier whenever a URL
+finishes, so a slow host never holds back the others the way a fixed batch
+that has to finish before the next one starts would.
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+from config import CRAWL_MAX_CONCURRENCY, CRAWL_PER_HOST_CONCURRENCY, CRAWL_PER_HOST_RATE, CRAWL_PER_HOST_BURST
+
+
+class TokenBucket:
+    """Async token bucket: `rate` tokens per second, holding at most `capacity`."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Waits until a token is available and takes it."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class _HostLimits:
+    def __init__(self, concurrency: int, rate: float, burst: float):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.bucket = TokenBucket(rate, burst) if rate > 0 else None
+
+
+class AsyncCrawler:
+    """Runs a blocking handler over URLs with global and per-host limits."""
+
+    def __init__(self, max_concurrency: int = CRAWL_MAX_CONCURRENCY,
+                 per_host_concurrency: int = CRAWL_PER_HOST_CONCURRENCY,
+                 per_host_rate: float = CRAWL_PER_HOST_RATE,
+                 per_host_burst: float = CRAWL_PER_HOST_BURST):
+        """
+        Args:
+            max_concurrency: URLs processed at once across all hosts
+            per_host_concurrency: URLs processed at once for a single host
+            per_host_rate: Requests per second allowed per host (0 disables rate limiting)
+            per_host_burst: Requests a host may receive back-to-back before the rate applies
+        """
+        self.max_concurrency = max_concurrency
+        self.per_host_concurrency = per_host_concurrency
+        self.per_host_rate = per_host_rate
+        self.per_host_burst = per_host_burst
+        self._hosts: Dict[str, _HostLimits] = {}
+
+    def _limits(self, url: str) -> _HostLimits:
+        host = urlsplit(url).netloc.lower()
+        limits = self._hosts.get(host)
+        if limits is None:
+            limits = self._hosts[host] = _HostLimits(self.per_host_concurrency, self.per_host_rate,
+                                                     self.per_host_burst)
+        return limits
+
+    async def _process(self, url: str, handler: Callable[[str], bool], executor: ThreadPoolExecutor,
+                       global_slots: asyncio.Semaphore) -> Tuple[bool, Optional[Exception]]:
+        limits = self._limits(url)
+        async with limits.semaphore:
+            if limits.bucket:
+                await limits.bucket.acquire()
+            async with global_slots:
+                try:
+                    return bool(await asyncio.get_running_loop().run_in_executor(executor, handler, url)), None
+                except Exception as e:
+                    return False, e
+
+    async def run(self, urls: List[str], handler: Callable[[str], bool],
+                  on_result: Optional[Callable[[str, bool, Optional[Exception]], None]] = None) -> Dict[str, bool]:
+        """
+        Calls `handler(url)` for every URL and returns {url: success}.
+
+        Exceptions raised by the handler count as failures; `on_result` is
+        called after each URL with (url, success, exception). It runs on the
+        worker pool, so it may block (e.g. on SQLite) without stalling the
+        event loop, and must be thread-safe.
+        """
+        loop = asyncio.get_running_loop()
+        global_slots = asyncio.Semaphore(self.max_concurrency)
+        results: Dict[str, bool] = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            async def process(url: str):
+                success, error = await self._process(url, handler, executor, global_slots)
+                results[url] = success
+                if on_result:
+                    await loop.run_in_executor(executor, on_result, url, success, error)
+
+            await asyncio.gather(*(process(url) for url in urls))
+        return results
+
+    async def run_feed(self, source: Callable[[int], List[str]], handler: Callable[[str], bool],
+                       on_result: Optional[Callable[[str, bool, Optional[Exception]], None]] = None,
+                       when_idle: Optional[Callable[[], Optional[float]]] = None,
+                       backlog: Optional[int] = None) -> int:
+        """
+        Calls `handler(url)` for URLs taken from `source(n)` until it runs dry.
+
+        `source` is asked for up to `n` more URLs whenever fewer than `backlog`
+        (default 4 x max_concurrency) are queued or running. When it returns
+        nothing and no URL is in flight, `when_idle()` gives the seconds to
+        wait before asking again, or None to stop. `source`, `when_idle` and
+        `on_result` run on the worker pool, so they may block (e.g. on
+        SQLite); `on_result` must be thread-safe.
+
+        Returns:
+            Number of URLs processed
+        """
+        loop = asyncio.get_running_loop()
+        backlog = backlog or 4 * self.max_concurrency
+        global_slots = asyncio.Semaphore(self.max_concurrency)
+        tasks: Set[asyncio.Future] = set()
+        processed = 0
+
+        async def process(url: str):
+            success, error = await self._process(url, handler, executor, global_slots)
+            if on_result:
+                await loop.run_in_executor(executor, on_result, url, success, error)
+
+        # One spare worker so `source` never waits behind busy handlers
+        with ThreadPoolExecutor(max_workers=self.max_concurrency + 1) as executor:
+            while True:
+                if len(tasks) < backlog:
+                    for url in await loop.run_in_executor(executor, source, backlog - len(tasks)):
+                        tasks.add(asyncio.ensure_future(process(url)))
+                if not tasks:
+                    wait = await loop.run_in_executor(executor, when_idle) if when_idle else None
+                    if wait is None:
+                        break
+                    await asyncio.sleep(wait)
+                    continue
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                processed += len(done)
+        return processed
+
+
+def crawl(urls: List[str], handler: Callable[[str], bool],
+          on_result: Optional[Callable[[str, bool, Optional[Exception]], None]] = None,
+          **limits) -> Dict[str, bool]:
+    """Synchronous entry point: runs `AsyncCrawler(**limits).run(urls, handler, on_result)`."""
+    return asyncio.run(AsyncCrawler(**limits).run(urls, handler, on_result))
+
+
+def crawl_feed(source: Callable[[int], List[str]], handler: Callable[[str], bool],
+               on_result: Optional[Callable[[str, bool, Optional[Exception]], None]] = None,
+               when_idle: Optional[Callable[[], Optional[float]]] = None, **limits) -> int:
+    """Synchronous entry point: runs `AsyncCrawler(**limits).run_feed(source, handler, on_result, when_idle)`."""
+    return asyncio.run(AsyncCrawler(**limits).run_feed(source, handler, on_result, when_idle))
@@ -0,0 +1,317 @@
+"""
+CV-to-Job Matching
+
+Extracts text from uploaded CVs, embeds it with the same model used for RAG
+retrieval and scores it against every job posting in a single matrix product.
+Results are cached per user in the `cv_job_matches` table together with the
+jobs data version they were computed against, so the profile page only has to
+read one row per view. The cache is invalidated when the user uploads a new CV
+and goes stale when the jobs table changes (see `database.bump_data_version`).
+Recomputing is always done in the background (`schedule_refresh`) by a small
+shared pool of CV_MATCH_WORKERS threads, so however many users ask at once
+only that many full scoring passes run in parallel; a page view that finds
+stale matches shows them and schedules one refresh.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Set, Tuple
+
+import numpy as np
+
+from config import EMBEDDING_MODEL_NAME, CV_MATCH_TOP_K, CV_MATCH_RERANK, CV_MATCH_RERANK_CANDIDATES, CV_MATCH_WORKERS
+from database import get_all_jobs, get_data_version
+from db import get_connection, transaction
+
+CV_MATCH_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cv_job_matches (
+    user_id INTEGER PRIMARY KEY,
+    cv_id INTEGER,
+    jobs_version INTEGER NOT NULL,
+    matches TEXT NOT NULL,
+    computed_at TEXT NOT NULL
+);
+"""
+
+JOB_EMBEDDING_SCHEMA = """
+CREATE TABLE IF NOT EXISTS job_embeddings (
+    job_id INTEGER PRIMARY KEY,
+    model TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    embedding BLOB NOT NULL
+);
+"""
+
+# Max characters of CV text handed to the cross-encoder (it truncates anyway)
+RERANK_CV_CHARS = 2000
+
+# In-process job embedding matrix, rebuilt only when the jobs version changes
+_job_matrix_cache: Dict[str, Any] = {"version": None, "jobs": [], "matrix": None}
+_job_matrix_lock = threading.Lock()
+
+# (db_path, user_id) of background match refreshes that are running / need to run again
+_refreshing: Set[Tuple[str, int]] = set()
+_refresh_again: Set[Tuple[str, int]] = set()
+_refresh_lock = threading.Lock()
+_refresh_pool: Optional[ThreadPoolExecutor] = None
+_refresh_pool_pid = None
+
+
+def init_cv_match_tables(db_path: str = "jobs.db"):
+    """Creates the match cache and job embedding tables if they don't exist."""
+    with transaction(db_path) as conn:
+        conn.execute(CV_MATCH_SCHEMA)
+        conn.execute(JOB_EMBEDDING_SCHEMA)
+
+
+def extract_cv_text(filepath: str) -> str:
+    """
+    Extracts plain text from an uploaded CV file.
+
+    PDF and DOCX support depend on the optional `pypdf` and `python-docx`
+    packages; unsupported formats return an empty string.
+    """
+    ext = os.path.splitext(filepath)[1].lower()
+    try:
+        if ext == '.txt':
+            with open(filepath, 'r', encoding='utf-8', errors='ignore') as file:
+                return file.read()
+        if ext == '.rtf':
+            with open(filepath, 'r', encoding='utf-8', errors='ignore') as file:
+                content = file.read()
+            # Drop control words and groups, keep the visible text
+            content = re.sub(r'\\[a-z]+-?\d* ?|[{}]', '', content)
+            return content
+        if ext == '.pdf':
+            from pypdf import PdfReader
+            reader = PdfReader(filepath)
+            return "\n".join(page.extract_text() or "" for page in reader.pages)
+        if ext == '.docx':
+            import docx
+            document = docx.Document(filepath)
+            return "\n".join(paragraph.text for paragraph in document.paragraphs)
+    except ImportError as e:
+        print(f"CV text extraction for {ext} files is unavailable: {e}")
+    except Exception as e:
+        print(f"Error extracting text from {filepath}: {e}")
+    return ""
+
+
+def job_text(job: Dict[str, Any]) -> str:
+    """Builds the text representation of a job that gets embedded."""
+    parts = [job.get('title'), job.get('organization'), job.get('location'), job.get('description')]
+    return "\n".join(str(part) for part in parts if part)
+
+
+def _encode(texts: List[str]) -> np.ndarray:
+    """Encodes a batch of texts into normalized float32 embeddings."""
+    from rag import embedding_model
+    embeddings = embedding_model.encode(texts, normalize_embeddings=True, batch_size=32)
+    return np.asarray(embeddings, dtype=np.float32)
+
+
+def _load_job_matrix(db_path: str = "jobs.db"):
+    """
+    Returns (jobs, matrix) with one normalized embedding row per job.
+
+    Embeddings are persisted in `job_embeddings` keyed by a hash of the job
+    text, so only new or edited jobs are re-encoded when the version changes.
+    """
+    version = get_data_version("jobs", db_path)
+    with _job_matrix_lock:
+        if _job_matrix_cache["version"] == version and _job_matrix_cache["matrix"] is not None:
+            return _job_matrix_cache["jobs"], _job_matrix_cache["matrix"]
+
+        jobs = get_all_jobs(db_path)
+        conn = get_connection(db_path)
+        stored = {
+            row[0]: (row[1], row[2])
+            for row in conn.execute(
+                "SELECT job_id, content_hash, embedding FROM job_embeddings WHERE model = ?",
+                (EMBEDDING_MODEL_NAME,)
+            )
+        }
+
+        texts = [job_text(job) for job in jobs]
+        hashes = [hashlib.sha1(text.encode('utf-8')).hexdigest() for text in texts]
+        vectors: List[Optional[np.ndarray]] = [None] * len(jobs)
+        missing = []
+        for i, job in enumerate(jobs):
+            cached = stored.get(job['id'])
+            if cached and cached[0] == hashes[i]:
+                vectors[i] = np.frombuffer(cached[1], dtype=np.float32)
+            else:
+                missing.append(i)
+
+        if missing:
+            print(f"Embedding {len(missing)} new or changed job(s) for CV matching...")
+            encoded = _encode([texts[i] for i in missing])
+            for row, i in enumerate(missing):
+                vectors[i] = encoded[row]
+            with transaction(db_path) as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO job_embeddings (job_id, model, content_hash, embedding) VALUES (?, ?, ?, ?)",
+                    [(jobs[i]['id'], EMBEDDING_MODEL_NAME, hashes[i], encoded[row].tobytes())
+                     for row, i in enumerate(missing)]
+                )
+
+        matrix = np.vstack(vectors) if vectors else np.zeros((0, 0), dtype=np.float32)
+        _job_matrix_cache.update(version=version, jobs=jobs, matrix=matrix)
+        return jobs, matrix
+
+
+def match_cv_text(cv_text: str, top_k: int = CV_MATCH_TOP_K, rerank: bool = CV_MATCH_RERANK,
+                  db_path: str = "jobs.db") -> List[Dict[str, Any]]:
+    """
+    Scores CV text against all jobs and returns the best matches.
+
+    Args:
+        cv_text: Plain text of the CV
+        top_k: Number of matches to return
+        rerank: Whether to reorder the top candidates with the cross-encoder
+
+    Returns:
+        List of dicts with job_id, title, organization, location and score
+    """
+    if not cv_text.strip():
+        return []
+
+    jobs, matrix = _load_job_matrix(db_path)
+    if not jobs:
+        return []
+
+    cv_vector = _encode([cv_text])[0]
+    scores = matrix @ cv_vector  # cosine similarity, embeddings are normalized
+
+    candidates = CV_MATCH_RERANK_CANDIDATES if rerank else top_k
+    candidates = min(max(candidates, top_k), len(jobs))
+    top = np.argpartition(-scores, candidates - 1)[:candidates]
+    top = top[np.argsort(-scores[top])]
+
+    ranked = [(int(i), float(scores[i])) for i in top]
+    if rerank:
+        from rag import cross_encoder
+        pairs = [(cv_text[:RERANK_CV_CHARS], job_text(jobs[i])) for i, _ in ranked]
+        rerank_scores = cross_encoder.predict(pairs)
+        ranked = sorted(zip([i for i, _ in ranked], map(float, rerank_scores)), key=lambda x: x[1], reverse=True)
+
+    return [
+        {
+            'job_id': jobs[i]['id'],
+            'title': jobs[i].get('title'),
+            'organization': jobs[i].get('organization'),
+            'location': jobs[i].get('location'),
+            'score': round(score, 4)
+        }
+        for i, score in ranked[:top_k]
+    ]
+
+
+def refresh_user_matches(user_id: int, db_path: str = "jobs.db") -> List[Dict[str, Any]]:
+    """Recomputes and caches the matches for the user's most recent CV."""
+    conn = get_connection(db_path)
+    row = conn.execute(
+        "SELECT id, filepath FROM cv_uploads WHERE user_id = ? ORDER BY upload_date DESC, id DESC LIMIT 1",
+        (user_id,)
+    ).fetchone()
+    if not row:
+        invalidate_user_matches(user_id, db_path)
+        return []
+
+    cv_id, filepath = row
+    jobs_version = get_data_version("jobs", db_path)
+    matches = match_cv_text(extract_cv_text(filepath), db_path=db_path)
+
+    with transaction(db_path) as conn:
+        conn.execute("""
+            INSERT OR REPLACE INTO cv_job_matches (user_id, cv_id, jobs_version, matches, computed_at)
+            VALUES (?, ?, ?, ?, ?)
+        """, (user_id, cv_id, jobs_version, json.dumps(matches), datetime.now().isoformat()))
+    return matches
+
+
+def get_cached_matches(user_id: int, db_path: str = "jobs.db") -> Tuple[Optional[List[Dict[str, Any]]], bool]:
+    """
+    Returns (matches, fresh) from the cache; matches is None when nothing is cached,
+    fresh is False when they were computed against an older jobs version.
+
+    This is a primary-key lookup plus the jobs version check, so it costs the
+    same regardless of how many jobs exist.
+    """
+    conn = get_connection(db_path)
+    row = conn.execute(
+        "SELECT jobs_version, matches FROM cv_job_matches WHERE user_id = ?", (user_id,)
+    ).fetchone()
+    if not row:
+        return None, False
+    return json.loads(row[1]), row[0] == get_data_version("jobs", db_path)
+
+
+def _refresh_worker(user_id: int, db_path: str):
+    key = (db_path, user_id)
+    while True:
+        try:
+            refresh_user_matches(user_id, db_path)
+        except Exception as e:
+            print(f"Error computing CV matches for user {user_id}: {e}")
+        with _refresh_lock:
+            # Another refresh was requested while this one ran (e.g. a new upload): run once more
+            if key not in _refresh_again:
+                _refreshing.discard(key)
+                return
+            _refresh_again.discard(key)
+
+
+def _pool() -> ThreadPoolExecutor:
+    # Called with _refresh_lock held. A forked worker inherits the pool object but not its threads
+    global _refresh_pool, _refresh_pool_pid
+    if _refresh_pool is None or _refresh_pool_pid != os.getpid():
+        _refresh_pool = ThreadPoolExecutor(max_workers=CV_MATCH_WORKERS, thread_name_prefix="cv-match")
+        _refresh_pool_pid = os.getpid()
+        _refreshing.clear()
+        _refresh_again.clear()
+    return _refresh_pool
+
+
+def schedule_refresh(user_id: int, db_path: str = "jobs.db", rerun: bool = True) -> bool:
+    """
+    Recomputes the user's matches on the shared background pool.
+
+    At most one refresh runs per user. If one is already running, `rerun`
+    queues a single extra run after it (needed when its input changed, e.g. a
+    new CV); otherwise the request is dropped. Returns False if one was running.
+    """
+    key = (db_path, user_id)
+    with _refresh_lock:
+        pool = _pool()
+        if key in _refreshing:
+            if rerun:
+                _refresh_again.add(key)
+            return False
+        _refreshing.add(key)
+    pool.submit(_refresh_worker, user_id, db_path)
+    return True
+
+
+def get_user_matches(user_id: int, db_path: str = "jobs.db") -> List[Dict[str, Any]]:
+    """
+    Returns the cached matches for a user without computing anything on the calling thread.
+
+    Stale matches are returned as they are (an empty list if there are none yet)
+    and a background refresh is scheduled, so the next view gets fresh ones.
+    """
+    matches, fresh = get_cached_matches(user_id, db_path)
+    if not fresh:
+        schedule_refresh(user_id, db_path, rerun=False)
+    return matches or []
+
+
+def invalidate_user_matches(user_id: int, db_path: str = "jobs.db"):
+    """Drops the cached matches for a user, e.g. after a new CV upload."""
+    with transaction(db_path) as conn:
+        conn.execute("DELETE FROM cv_job_matches WHERE user_id = ?", (user_id,))
@@ -1,5 +1,12 @@
+import hashlib
+import re
 import sqlite3
-from typing import Dict, Any
+import time
+import unicodedata
+from datetime import datetime
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+
+from db import get_connection, transaction
 
 # SQLite Database Schema for Job Postings
 JOB_DB_SCHEMA = """
@@ -17,40 +24,351 @@ CREATE TABLE IF NOT EXISTS job_postings (
     closes TEXT,
     job_ref TEXT,
     description TEXT,
-    benefits TEXT
+    benefits TEXT,
+    placed_on_date TEXT,
+    closes_date TEXT,
+    salary_text TEXT,
+    salary_currency TEXT,
+    salary_period TEXT,
+    salary_annual_min REAL,
+    salary_annual_max REAL,
+    lat REAL,
+    lon REAL
 );
 """
 
+# ISO (YYYY-MM-DD) copies of the free-text placed_on/closes dates, filled at ingest.
+# The expression index serves the "posted in the last N days" filter, which uses
+# the placed date and falls back to the closing date.
+JOB_DATE_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_job_postings_placed_on_date ON job_postings (placed_on_date);
+CREATE INDEX IF NOT EXISTS idx_job_postings_closes_date ON job_postings (closes_date);
+CREATE INDEX IF NOT EXISTS idx_job_postings_posted_date ON job_postings (COALESCE(placed_on_date, closes_date));
+"""
+JOB_POSTED_DATE = "COALESCE(placed_on_date, closes_date)"
+
+# Salaries annualized at ingest (see normalize_salary) so range filters and
+# salary ordering are index scans; the rowid in each index breaks ties.
+JOB_SALARY_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_job_postings_salary_annual_min ON job_postings (salary_annual_min);
+CREATE INDEX IF NOT EXISTS idx_job_postings_salary_annual_max ON job_postings (salary_annual_max);
+"""
+
+# R*Tree over each job's coordinates (a degenerate box per point), kept in sync
+# by triggers so map viewport queries only visit jobs inside the box.
+JOB_GEO_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS job_postings_geo USING rtree(id, min_lat, max_lat, min_lon, max_lon);
+CREATE TRIGGER IF NOT EXISTS job_postings_geo_insert AFTER INSERT ON job_postings
+WHEN new.lat IS NOT NULL AND new.lon IS NOT NULL BEGIN
+    INSERT INTO job_postings_geo VALUES (new.id, new.lat, new.lat, new.lon, new.lon);
+END;
+CREATE TRIGGER IF NOT EXISTS job_postings_geo_delete AFTER DELETE ON job_postings BEGIN
+    DELETE FROM job_postings_geo WHERE id = old.id;
+END;
+CREATE TRIGGER IF NOT EXISTS job_postings_geo_update AFTER UPDATE OF lat, lon ON job_postings BEGIN
+    DELETE FROM job_postings_geo WHERE id = old.id;
+    INSERT INTO job_postings_geo SELECT new.id, new.lat, new.lat, new.lon, new.lon
+    WHERE new.lat IS NOT NULL AND new.lon IS NOT NULL;
+END;
+"""
+
+# Single-row-per-key counters bumped whenever a dataset changes, so caches
+# built on top of the database can tell cheaply whether they are stale.
+DATA_VERSIONS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS data_versions (
+    name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+# Normalized fingerprint of the page text each stored job was extracted from,
+# so re-crawls of unchanged postings can skip LLM extraction and the write.
+PAGE_FINGERPRINTS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS page_fingerprints (
+    url TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    last_changed_at REAL NOT NULL,
+    last_seen_at REAL NOT NULL
+);
+"""
+
+# Full-text index over job_postings (external content, so the text is stored once).
+# The trigram tokenizer indexes every 3-character sequence, which gives substring
+# matching that works the same for English and for unsegmented Chinese text.
+# The triggers keep it in sync with every write to job_postings.
+JOB_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS job_postings_fts USING fts5(
+    title, organization, location, description,
+    content='job_postings', content_rowid='id',
+    tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS job_postings_fts_insert AFTER INSERT ON job_postings BEGIN
+    INSERT INTO job_postings_fts (rowid, title, organization, location, description)
+    VALUES (new.id, new.title, new.organization, new.location, new.description);
+END;
+CREATE TRIGGER IF NOT EXISTS job_postings_fts_delete AFTER DELETE ON job_postings BEGIN
+    INSERT INTO job_postings_fts (job_postings_fts, rowid, title, organization, location, description)
+    VALUES ('delete', old.id, old.title, old.organization, old.location, old.description);
+END;
+CREATE TRIGGER IF NOT EXISTS job_postings_fts_update
+AFTER UPDATE OF title, organization, location, description ON job_postings BEGIN
+    INSERT INTO job_postings_fts (job_postings_fts, rowid, title, organization, location, description)
+    VALUES ('delete', old.id, old.title, old.organization, old.location, old.description);
+    INSERT INTO job_postings_fts (rowid, title, organization, location, description)
+    VALUES (new.id, new.title, new.organization, new.location, new.description);
+END;
+"""
+
+# Search terms shorter than a trigram can't use the index
+FTS_MIN_TERM_LENGTH = 3
+# Column weights for bm25 ranking: title, organization, location, description
+FTS_WEIGHTS = (10.0, 5.0, 3.0, 1.0)
+# Snippet highlight markers; callers replace them after HTML-escaping the text
+SNIPPET_START, SNIPPET_END = "\x02", "\x03"
+
+def create_job_search_index(db_path: str = "jobs.db"):
+    """Creates the full-text index and its triggers, indexing existing jobs the first time."""
+    conn = get_connection(db_path)
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'job_postings_fts'"
+    ).fetchone()
+    update_trigger = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = 'job_postings_fts_update'"
+    ).fetchone()
+    if update_trigger and "UPDATE OF" not in update_trigger[0]:
+        # Early versions re-indexed on every update, including ones that touch no indexed column
+        conn.execute("DROP TRIGGER job_postings_fts_update")
+    conn.executescript(JOB_FTS_SCHEMA)
+    if not exists:
+        with transaction(db_path) as conn:
+            conn.execute("INSERT INTO job_postings_fts (job_postings_fts) VALUES ('rebuild')")
+
+# Stored in PRAGMA user_version once create_job_database has brought a database
+# up to date. Bump it whenever the schema or a migration below changes.
+JOB_SCHEMA_VERSION = 1
+
 def create_job_database(db_path: str = "jobs.db"):
-    """Creates the SQLite database and job_postings table."""
-    conn = sqlite3.connect(db_path)
-    conn.execute(JOB_DB_SCHEMA)
-    # Also create the users table if it doesn't exist
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            email TEXT UNIQUE,
-            name TEXT NOT NULL,
-            profile_pic TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            provider TEXT DEFAULT 'local',  -- 'local', 'google', 'wechat'
-            provider_user_id TEXT,          -- Store provider-specific user ID
-            UNIQUE(provider, provider_user_id) -- Ensure unique users per provider
-        )
-    """)
-    # Create the visitors table for tracking visitor history
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS visitors (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            ip_address TEXT NOT NULL,
-            timestamp TEXT NOT NULL,
-            user_agent TEXT,
-            user_id INTEGER,
-            FOREIGN KEY (user_id) REFERENCES users (id)
-        )
-    """)
-    conn.commit()
-    conn.close()
+    """
+    Creates the SQLite database and job_postings table and runs the migrations.
+
+    A database already at JOB_SCHEMA_VERSION is left alone, so calling this on
+    every start costs one PRAGMA read instead of schema statements that take
+    the write lock and invalidate every connection's prepared statements.
+    """
+    conn = get_connection(db_path)
+    if conn.execute("PRAGMA user_version").fetchone()[0] >= JOB_SCHEMA_VERSION:
+        return
+    with transaction(db_path) as conn:
+        conn.execute(JOB_DB_SCHEMA)
+        conn.execute(DATA_VERSIONS_SCHEMA)
+        conn.execute(PAGE_FINGERPRINTS_SCHEMA)
+        # Also create the users table if it doesn't exist
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS users (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                email TEXT UNIQUE,
+                name TEXT NOT NULL,
+                profile_pic TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                provider TEXT DEFAULT 'local',  -- 'local', 'google', 'wechat'
+                provider_user_id TEXT,          -- Store provider-specific user ID
+                UNIQUE(provider, provider_user_id) -- Ensure unique users per provider
+            )
+        """)
+        # Create the visitors table for tracking visitor history
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS visitors (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ip_address TEXT NOT NULL,
+                timestamp TEXT NOT NULL,
+                user_agent TEXT,
+                user_id INTEGER,
+                path TEXT,
+                FOREIGN KEY (user_id) REFERENCES users (id)
+            )
+        """)
+    migrate_visitors(db_path)
+    migrate_job_dates(db_path)
+    migrate_job_salaries(db_path)
+    migrate_job_locations(db_path)
+    create_job_search_index(db_path)
+    get_connection(db_path).execute(f"PRAGMA user_version = {JOB_SCHEMA_VERSION}")
+
+def migrate_visitors(db_path: str = "jobs.db"):
+    """Adds the request path column, written by the shared visitor log writer, to older databases."""
+    conn = get_connection(db_path)
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(visitors)")}
+    if 'path' not in columns:
+        with transaction(db_path) as conn:
+            conn.execute("ALTER TABLE visitors ADD COLUMN path TEXT")
+
+_ORDINAL_SUFFIX = re.compile(r"\b(\d{1,2})(st|nd|rd|th)\b", re.IGNORECASE)
+_DATE_FORMATS = ("%d %B %Y", "%d %b %Y", "%Y-%m-%d", "%d/%m/%Y")
+
+def normalize_date(date_str: Optional[str]) -> Optional[str]:
+    """Converts a free-text date such as "22nd December 2025" to ISO "2025-12-22" (None if unparseable)."""
+    if not date_str or date_str == "None":
+        return None
+    # Clean up the date string by removing field labels and ordinal suffixes
+    text = date_str.replace("Placed On:", "").replace("Closes:", "").strip()
+    text = _ORDINAL_SUFFIX.sub(r"\1", " ".join(text.split()))
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+def migrate_job_dates(db_path: str = "jobs.db"):
+    """Adds the ISO date columns to older databases and fills them from the free-text dates once."""
+    conn = get_connection(db_path)
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(job_postings)")}
+    missing = [column for column in ("placed_on_date", "closes_date") if column not in columns]
+    if missing:
+        with transaction(db_path) as conn:
+            for column in missing:
+                conn.execute(f"ALTER TABLE job_postings ADD COLUMN {column} TEXT")
+            rows = conn.execute("SELECT id, placed_on, closes FROM job_postings").fetchall()
+            conn.executemany(
+                "UPDATE job_postings SET placed_on_date = ?, closes_date = ? WHERE id = ?",
+                [(normalize_date(placed_on), normalize_date(closes), job_id) for job_id, placed_on, closes in rows]
+            )
+            bump_data_version(conn, "jobs")
+        print(f"Normalized dates for {len(rows)} existing job(s)")
+    conn.executescript(JOB_DATE_INDEXES)
+
+_SALARY_AMOUNT = re.compile(r"(?P<symbol>HK\$|[£€$¥])?\s*(?P<number>\d[\d,]*(?:\.\d+)?)\s*(?P<thousands>k\b)?",
+                            re.IGNORECASE)
+_CURRENCY_SYMBOLS = {'£': 'GBP', '€': 'EUR', '$': 'USD', '¥': 'CNY', 'HK$': 'HKD'}
+_CURRENCY_CODE = re.compile(r"\b(GBP|EUR|USD|CNY|RMB|HKD|AUD|CAD|CHF|JPY|SGD)\b", re.IGNORECASE)
+_SALARY_PERIODS = (
+    ('hour', re.compile(r"per hour|an hour|hourly|/\s*h(ou)?r\b|\bp/?h\b", re.IGNORECASE)),
+    ('day', re.compile(r"per day|a day|daily|/\s*day\b|\bp/d\b", re.IGNORECASE)),
+    ('week', re.compile(r"per week|a week|weekly|/\s*week\b|\bp/?w\b", re.IGNORECASE)),
+    ('month', re.compile(r"per month|a month|monthly|/\s*month\b|\bpcm\b|\bp/m\b", re.IGNORECASE)),
+    ('year', re.compile(r"per annum|per year|a year|annual|yearly|/\s*year\b|\bp\.?a\b", re.IGNORECASE)),
+)
+# Multipliers to a yearly figure: 37.5 hours x 52 weeks, 5 days x 52 weeks
+SALARY_PERIOD_FACTORS = {'hour': 1950, 'day': 260, 'week': 52, 'month': 12, 'year': 1}
+
+def _salary_amounts(text: str) -> Tuple[List[float], Optional[str]]:
+    """Returns the amounts in a salary text (only those with a currency symbol if any have one) and the currency."""
+    found = []
+    for match in _SALARY_AMOUNT.finditer(text):
+        number = match.group('number').replace(',', '')
+        value = float(number) * (1000 if match.group('thousands') else 1)
+        found.append((match.group('symbol'), value, '.' in number or bool(match.group('thousands'))))
+    with_symbol = [(symbol, value) for symbol, value, _ in found if symbol]
+    if with_symbol:
+        return [value for _, value in with_symbol], _CURRENCY_SYMBOLS[with_symbol[0][0].upper()]
+    # Without symbols, small bare integers are usually grades or spine points, not pay
+    amounts = [value for _, value, precise in found if precise or value >= 100]
+    code = _CURRENCY_CODE.search(text)
+    currency = code.group(1).upper() if code else None
+    return amounts, ('CNY' if currency == 'RMB' else currency)
+
+def normalize_salary(salary_text: Optional[str], salary_min: Any = None, salary_max: Any = None) -> Dict[str, Any]:
+    """
+    Turns a salary into annualized numbers with a currency and pay period.
+
+    The free text ("£35,000 to £45,000 per annum", "£15.50 per hour", "30k-40k")
+    is preferred; the numeric salary_min/salary_max are used when it has no
+    amounts. Without a stated period, large amounts are taken as yearly and
+    small ones as hourly; anything in between is left unannualized.
+
+    Returns:
+        {'salary_currency', 'salary_period', 'salary_annual_min', 'salary_annual_max'}, values None if unknown
+    """
+    text = salary_text or ""
+    amounts, currency = _salary_amounts(text)
+    amounts = [value for value in amounts if value > 0][:2]
+    if not amounts:
+        for value in (salary_min, salary_max):
+            try:
+                if value not in (None, "") and float(value) > 0:
+                    amounts.append(float(value))
+            except (TypeError, ValueError):
+                pass
+    result = {'salary_currency': currency, 'salary_period': None, 'salary_annual_min': None, 'salary_annual_max': None}
+    if not amounts:
+        return result
+
+    low, high = min(amounts), max(amounts)
+    period = next((name for name, pattern in _SALARY_PERIODS if pattern.search(text)), None)
+    if period is None:
+        period = 'year' if high >= 5000 else 'hour' if high <= 200 else None
+    result['salary_period'] = period
+    if period:
+        factor = SALARY_PERIOD_FACTORS[period]
+        result['salary_annual_min'] = round(low * factor, 2)
+        result['salary_annual_max'] = round(high * factor, 2)
+    return result
+
+_SALARY_COLUMNS = ("salary_text", "salary_currency", "salary_period", "salary_annual_min", "salary_annual_max")
+
+def migrate_job_salaries(db_path: str = "jobs.db"):
+    """Adds the normalized salary columns to older databases and fills them from the stored salaries once."""
+    conn = get_connection(db_path)
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(job_postings)")}
+    missing = [column for column in _SALARY_COLUMNS if column not in columns]
+    if missing:
+        with transaction(db_path) as conn:
+            for column in missing:
+                column_type = "REAL" if column.startswith("salary_annual") else "TEXT"
+                conn.execute(f"ALTER TABLE job_postings ADD COLUMN {column} {column_type}")
+            rows = conn.execute(
+                "SELECT id, salary_text, salary_min, salary_max FROM job_postings "
+                "WHERE salary_text IS NOT NULL OR salary_min IS NOT NULL OR salary_max IS NOT NULL"
+            ).fetchall()
+            updates = []
+            for job_id, salary_text, salary_min, salary_max in rows:
+                salary = normalize_salary(salary_text, salary_min, salary_max)
+                updates.append((salary['salary_currency'], salary['salary_period'], salary['salary_annual_min'],
+                                salary['salary_annual_max'], job_id))
+            conn.executemany("""
+                UPDATE job_postings SET salary_currency = ?, salary_period = ?, salary_annual_min = ?, salary_annual_max = ?
+                WHERE id = ?
+            """, updates)
+            bump_data_version(conn, "jobs")
+        print(f"Normalized salaries for {len(rows)} existing job(s)")
+    conn.executescript(JOB_SALARY_INDEXES)
+
+def migrate_job_locations(db_path: str = "jobs.db"):
+    """Adds the coordinate columns to older databases and builds the spatial index once, indexing existing coordinates."""
+    conn = get_connection(db_path)
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(job_postings)")}
+    missing = [column for column in ("lat", "lon") if column not in columns]
+    if missing:
+        with transaction(db_path) as conn:
+            for column in missing:
+                conn.execute(f"ALTER TABLE job_postings ADD COLUMN {column} REAL")
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'job_postings_geo'"
+    ).fetchone()
+    if not exists:
+        # One script transaction, so the index never exists without the rows it should hold
+        conn.executescript("BEGIN;" + JOB_GEO_SCHEMA + """
+            INSERT INTO job_postings_geo
+            SELECT id, lat, lat, lon, lon FROM job_postings WHERE lat IS NOT NULL AND lon IS NOT NULL;
+            COMMIT;
+        """)
+
+def get_locations_without_coordinates(db_path: str = "jobs.db") -> List[str]:
+    """Returns the distinct locations of jobs that have not been geocoded yet."""
+    rows = get_connection(db_path).execute(
+        "SELECT DISTINCT location FROM job_postings WHERE lat IS NULL AND location IS NOT NULL AND location != ''"
+    ).fetchall()
+    return [row[0] for row in rows]
+
+def set_location_coordinates(location: str, lat: float, lon: float, db_path: str = "jobs.db") -> int:
+    """Stores coordinates on every not yet geocoded job at `location`; returns the number of jobs updated."""
+    with transaction(db_path) as conn:
+        updated = conn.execute(
+            "UPDATE job_postings SET lat = ?, lon = ? WHERE location = ? AND lat IS NULL", (lat, lon, location)
+        ).rowcount
+        if updated:
+            bump_data_version(conn, "jobs")
+    return updated
 
 def parse_job_chunks(chunks: list[str]) -> Dict[str, Any]:
     """Parses the list of chunks to extract job details into a dictionary."""
@@ -88,6 +406,7 @@ def parse_job_chunks(chunks: list[str]) -> Dict[str, Any]:
             if job_data['location'].startswith("Skip to main content"):
                 job_data['location'] = "Guangzhou, GD, CN, 510620"
         elif chunk == "Salary:" and i + 1 < len(chunks):
+            job_data['salary_text'] = chunks[i + 1].strip()
             salary_text = chunks[i + 1].replace("£", "").replace(",", "").strip()
             if " to " in salary_text:
                 min_sal, max_sal = salary_text.split(" to ")
@@ -121,15 +440,36 @@ def parse_job_chunks(chunks: list[str]) -> Dict[str, Any]:
     
     return job_data
 
-def save_job_to_db(url: str, job_data: Dict[str, Any], db_path: str = "jobs.db"):
-    """Saves the parsed job data to the SQLite database."""
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute("""
-        INSERT OR REPLACE INTO job_postings
-        (url, title, organization, location, salary_min, salary_max, hours, contract_type, placed_on, closes, job_ref, description, benefits)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, (
+# Columns written from the parsed job data; the ISO dates are derived from placed_on/closes
+_UPSERT_COLUMNS = ['url', 'title', 'organization', 'location', 'salary_min', 'salary_max', 'hours', 'contract_type',
+                   'placed_on', 'closes', 'job_ref', 'description', 'benefits', 'placed_on_date', 'closes_date',
+                   'salary_text', 'salary_currency', 'salary_period', 'salary_annual_min', 'salary_annual_max',
+                   'lat', 'lon']
+_UPDATE_COLUMNS = _UPSERT_COLUMNS[1:]
+# Rows stored without coordinates (not geocoded this time) keep the ones they had,
+# unless the location itself changed; elsewhere the new value wins
+_UPDATE_VALUES = {column: f"excluded.{column}" for column in _UPDATE_COLUMNS}
+_UPDATE_VALUES.update({
+    column: f"CASE WHEN excluded.{column} IS NOT NULL THEN excluded.{column} "
+            f"WHEN location IS excluded.location THEN {column} END"
+    for column in ('lat', 'lon')
+})
+
+# ON CONFLICT ... DO UPDATE keeps the row (and its id, which job_applications
+# references) instead of deleting and re-inserting it like INSERT OR REPLACE.
+# The WHERE clause skips the write entirely when nothing changed, so re-crawls
+# of unchanged postings don't rewrite the row, its indexes or the FTS entry.
+_UPSERT_JOB_SQL = f"""
+    INSERT INTO job_postings ({', '.join(_UPSERT_COLUMNS)})
+    VALUES ({', '.join('?' * len(_UPSERT_COLUMNS))})
+    ON CONFLICT(url) DO UPDATE SET
+        {', '.join(f'{column} = {value}' for column, value in _UPDATE_VALUES.items())}
+    WHERE {' OR '.join(f'{column} IS NOT ({value})' for column, value in _UPDATE_VALUES.items())}
+"""
+
+def _job_row(url: str, job_data: Dict[str, Any]) -> Tuple:
+    salary = normalize_salary(job_data.get('salary_text'), job_data.get('salary_min'), job_data.get('salary_max'))
+    return (
         url,
         job_data.get('title'),
         job_data.get('organization'),
@@ -142,18 +482,316 @@ def save_job_to_db(url: str, job_data: Dict[str, Any], db_path: str = "jobs.db")
         job_data.get('closes'),
         job_data.get('job_ref'),
         job_data.get('description'),
-        job_data.get('benefits')
-    ))
-    conn.commit()
-    conn.close()
+        job_data.get('benefits'),
+        normalize_date(job_data.get('placed_on')),
+        normalize_date(job_data.get('closes')),
+        job_data.get('salary_text'),
+        salary['salary_currency'],
+        salary['salary_period'],
+        salary['salary_annual_min'],
+        salary['salary_annual_max'],
+        job_data.get('lat'),
+        job_data.get('lon')
+    )
+
+def upsert_jobs(jobs: Iterable[Tuple[str, Dict[str, Any], Optional[str]]], db_path: str = "jobs.db") -> Dict[str, int]:
+    """
+    Inserts or updates many job postings in a single transaction.
+
+    Args:
+        jobs: (url, job_data, fingerprint) tuples; fingerprint may be None
+        db_path: Path to the SQLite database
+
+    Returns:
+        {'written': rows inserted or changed, 'unchanged': rows skipped because their content was identical}
+    """
+    jobs = list(jobs)
+    if not jobs:
+        return {'written': 0, 'unchanged': 0}
+    now = time.time()
+    with transaction(db_path) as conn:
+        # rowcount (unlike total_changes) leaves out the FTS rows written by triggers
+        written = conn.executemany(_UPSERT_JOB_SQL, (_job_row(url, job_data) for url, job_data, _ in jobs)).rowcount
+        fingerprints = [(url, fingerprint, now, now) for url, _, fingerprint in jobs if fingerprint]
+        if fingerprints:
+            conn.executemany("""
+                INSERT INTO page_fingerprints (url, fingerprint, last_changed_at, last_seen_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET
+                    last_changed_at = CASE WHEN fingerprint IS excluded.fingerprint
+                                           THEN last_changed_at ELSE excluded.last_changed_at END,
+                    fingerprint = excluded.fingerprint, last_seen_at = excluded.last_seen_at
+            """, fingerprints)
+        if written:
+            bump_data_version(conn, "jobs")
+    return {'written': written, 'unchanged': len(jobs) - written}
+
+def save_job_to_db(url: str, job_data: Dict[str, Any], db_path: str = "jobs.db", fingerprint: Optional[str] = None):
+    """Saves the parsed job data to the SQLite database, with the page fingerprint if given."""
+    upsert_jobs([(url, job_data, fingerprint)], db_path)
+
+def content_fingerprint(chunks: List[str]) -> str:
+    """Hashes page text after Unicode, whitespace and case normalization, so formatting-only changes match."""
+    text = unicodedata.normalize("NFKC", "\n".join(chunks))
+    text = re.sub(r"\s+", " ", text).strip().casefold()
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def get_page_fingerprint(url: str, db_path: str = "jobs.db") -> Optional[str]:
+    """Returns the fingerprint of the page a stored job came from, or None if the job is not stored."""
+    conn = get_connection(db_path)
+    row = conn.execute("""
+        SELECT f.fingerprint FROM page_fingerprints f
+        JOIN job_postings j ON j.url = f.url
+        WHERE f.url = ?
+    """, (url,)).fetchone()
+    return row[0] if row else None
+
+def mark_page_seen(url: str, db_path: str = "jobs.db"):
+    """Records that an unchanged page was re-crawled."""
+    with transaction(db_path) as conn:
+        conn.execute("UPDATE page_fingerprints SET last_seen_at = ? WHERE url = ?", (time.time(), url))
+
+def bump_data_version(conn: sqlite3.Connection, name: str) -> None:
+    """Increments the version counter for a dataset inside the caller's transaction."""
+    conn.execute("""
+        INSERT INTO data_versions (name, version) VALUES (?, 1)
+        ON CONFLICT(name) DO UPDATE SET version = version + 1
+    """, (name,))
+
+def get_data_version(name: str, db_path: str = "jobs.db") -> int:
+    """Returns the current version counter for a dataset (0 if it was never written)."""
+    conn = get_connection(db_path)
+    row = conn.execute("SELECT version FROM data_versions WHERE name = ?", (name,)).fetchone()
+    return row[0] if row else 0
+
+JOB_COLUMNS = ['id', 'url', 'title', 'organization', 'location', 'salary_min', 'salary_max', 'hours', 'contract_type', 'placed_on', 'closes', 'job_ref', 'description', 'benefits', 'placed_on_date', 'closes_date',
+               'salary_text', 'salary_currency', 'salary_period', 'salary_annual_min', 'salary_annual_max', 'lat', 'lon']
+_JOB_SELECT = f"SELECT {', '.join(JOB_COLUMNS)} FROM job_postings"
 
 def get_all_jobs(db_path: str = "jobs.db") -> list[Dict[str, Any]]:
     """Retrieves all job postings from the database."""
-    conn = sqlite3.connect(db_path)
+    conn = get_connection(db_path)
     cursor = conn.cursor()
-    cursor.execute("SELECT * FROM job_postings")
+    cursor.execute(_JOB_SELECT)
     rows = cursor.fetchall()
-    conn.close()
     # Convert to dicts
-    columns = ['id', 'url', 'title', 'organization', 'location', 'salary_min', 'salary_max', 'hours', 'contract_type', 'placed_on', 'closes', 'job_ref', 'description', 'benefits']
-    return [dict(zip(columns, row)) for row in rows]
\ No newline at end of file
+    return [dict(zip(JOB_COLUMNS, row)) for row in rows]
+
+def iter_jobs(db_path: str = "jobs.db", chunk_size: int = 1000) -> Iterator[Dict[str, Any]]:
+    """Yields every job in id order, fetching `chunk_size` rows at a time so memory use doesn't grow with the table."""
+    cursor = get_connection(db_path).execute(_JOB_SELECT + " ORDER BY id")
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            return
+        for row in rows:
+            yield dict(zip(JOB_COLUMNS, row))
+
+def count_jobs(db_path: str = "jobs.db") -> int:
+    """Returns the number of stored jobs."""
+    return get_connection(db_path).execute("SELECT COUNT(*) FROM job_postings").fetchone()[0]
+
+def get_job(job_id: int, db_path: str = "jobs.db") -> Optional[Dict[str, Any]]:
+    """Returns a single job by id (a primary-key lookup), or None if it doesn't exist."""
+    row = get_connection(db_path).execute(_JOB_SELECT + " WHERE id = ?", (job_id,)).fetchone()
+    return dict(zip(JOB_COLUMNS, row)) if row else None
+
+def _salary_conditions(min_salary: Optional[float], max_salary: Optional[float], prefix: str = "") -> Tuple[List[str], list]:
+    """SQL conditions for jobs whose annual salary range overlaps [min_salary, max_salary]."""
+    conditions, params = [], []
+    if min_salary is not None:
+        conditions.append(f"{prefix}salary_annual_max >= ?")
+        params.append(min_salary)
+    if max_salary is not None:
+        conditions.append(f"{prefix}salary_annual_min <= ?")
+        params.append(max_salary)
+    return conditions, params
+
+def get_jobs_page(limit: int = 50, after_id: Optional[int] = None, query: Optional[str] = None,
+                  since: Optional[str] = None, min_salary: Optional[float] = None, max_salary: Optional[float] = None,
+                  db_path: str = "jobs.db") -> Tuple[list[Dict[str, Any]], Optional[int]]:
+    """
+    Returns one page of jobs, newest first, using keyset pagination on the primary key.
+
+    Each page is a range scan of the id index starting after the cursor, so the
+    cost depends on the page size rather than on how many jobs exist or how deep
+    the page is (unlike OFFSET).
+
+    Args:
+        limit: Maximum number of jobs to return
+        after_id: Cursor from the previous page (its last job id); None for the first page
+        query: Optional case-insensitive substring matched against title, organization, location and description
+        since: Optional ISO date; only jobs placed (or, failing that, closing) on or after it
+        min_salary, max_salary: Optional annual salary range the job's range must overlap
+
+    Returns:
+        (jobs, next_cursor); next_cursor is None on the last page
+    """
+    sql = _JOB_SELECT
+    conditions, params = _salary_conditions(min_salary, max_salary)
+    # With a date or salary filter, "+id" stops the planner from walking the whole primary
+    # key in order and makes it range-scan the filter's index, sorting only the matches
+    id_column = "+id" if since or conditions else "id"
+    if since:
+        conditions.append(f"{JOB_POSTED_DATE} >= ?")
+        params.append(since)
+    if after_id is not None:
+        conditions.append(f"{id_column} < ?")
+        params.append(after_id)
+    if query:
+        conditions.append("(title LIKE ? OR organization LIKE ? OR location LIKE ? OR description LIKE ?)")
+        params.extend([f"%{query}%"] * 4)
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    # Fetch one extra row to learn whether another page exists
+    sql += f" ORDER BY {id_column} DESC LIMIT ?"
+    params.append(limit + 1)
+
+    rows = get_connection(db_path).execute(sql, params).fetchall()
+    jobs = [dict(zip(JOB_COLUMNS, row)) for row in rows[:limit]]
+    next_cursor = jobs[-1]['id'] if len(rows) > limit else None
+    return jobs, next_cursor
+
+JOB_MAP_COLUMNS = ['id', 'url', 'title', 'organization', 'location', 'salary_min', 'salary_max', 'closes', 'lat', 'lon']
+
+def get_jobs_in_bbox(south: float, west: float, north: float, east: float, limit: int = 200,
+                     since: Optional[str] = None, min_salary: Optional[float] = None,
+                     max_salary: Optional[float] = None, db_path: str = "jobs.db") -> Tuple[list[Dict[str, Any]], bool]:
+    """
+    Returns the newest jobs whose coordinates fall inside a map viewport, using the R*Tree index.
+
+    A viewport crossing the antimeridian (west > east) is split into two boxes.
+    Only the columns a map marker needs are returned (JOB_MAP_COLUMNS).
+
+    Returns:
+        (jobs, truncated); truncated is True when more than `limit` jobs are inside the box
+    """
+    boxes = [(west, east)] if west <= east else [(west, 180.0), (-180.0, east)]
+    columns = ", ".join(f"j.{column}" for column in JOB_MAP_COLUMNS)
+    rows = []
+    for box_west, box_east in boxes:
+        sql = f"""
+            SELECT {columns} FROM job_postings_geo g JOIN job_postings j ON j.id = g.id
+            WHERE g.max_lat >= ? AND g.min_lat <= ? AND g.max_lon >= ? AND g.min_lon <= ?
+        """
+        params: list = [south, north, box_west, box_east]
+        salary_filters, salary_params = _salary_conditions(min_salary, max_salary, prefix="j.")
+        for condition in salary_filters:
+            sql += f" AND {condition}"
+        params += salary_params
+        if since:
+            sql += f" AND {JOB_POSTED_DATE} >= ?"
+            params.append(since)
+        sql += " ORDER BY j.id DESC LIMIT ?"
+        params.append(limit + 1)
+        rows += get_connection(db_path).execute(sql, params).fetchall()
+    if len(boxes) > 1:
+        rows.sort(key=lambda row: row[0], reverse=True)
+    jobs = [dict(zip(JOB_MAP_COLUMNS, row)) for row in rows[:limit]]
+    return jobs, len(rows) > limit
+
+def fts_query(query: str) -> Optional[str]:
+    """
+    Turns free text into an FTS5 query that ANDs its terms as literal phrases.
+
+    Returns None when a term is too short for the trigram index.
+    """
+    terms = query.split()
+    if not terms or any(len(term) < FTS_MIN_TERM_LENGTH for term in terms):
+        return None
+    return " ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+def get_jobs_by_salary(limit: int = 50, after: Optional[str] = None, descending: bool = True,
+                       since: Optional[str] = None, min_salary: Optional[float] = None,
+                       max_salary: Optional[float] = None, db_path: str = "jobs.db") -> Tuple[list[Dict[str, Any]], Optional[str]]:
+    """
+    Returns one page of jobs with a known salary, best paid first (or lowest first).
+
+    Descending order walks the annual maximum index, ascending order the annual
+    minimum index; pages continue from a (salary, id) keyset cursor, so deep
+    pages cost the same as the first one.
+
+    Returns:
+        (jobs, next_cursor); next_cursor is "salary:id" or None on the last page
+    """
+    column = "salary_annual_max" if descending else "salary_annual_min"
+    direction, comparison = ("DESC", "<") if descending else ("ASC", ">")
+    conditions, params = _salary_conditions(min_salary, max_salary)
+    conditions.append(f"{column} IS NOT NULL")
+    if since:
+        conditions.append(f"{JOB_POSTED_DATE} >= ?")
+        params.append(since)
+    if after and ":" in after:
+        salary, _, last_id = after.partition(":")
+        try:
+            params += [float(salary), int(last_id)]
+            conditions.append(f"({column}, id) {comparison} (?, ?)")
+        except ValueError:
+            pass
+    sql = f"{_JOB_SELECT} WHERE {' AND '.join(conditions)} ORDER BY {column} {direction}, id {direction} LIMIT ?"
+    params.append(limit + 1)
+
+    rows = get_connection(db_path).execute(sql, params).fetchall()
+    jobs = [dict(zip(JOB_COLUMNS, row)) for row in rows[:limit]]
+    next_cursor = f"{jobs[-1][column]!r}:{jobs[-1]['id']}" if len(rows) > limit else None
+    return jobs, next_cursor
+
+def search_jobs(query: str, limit: int = 50, after: Optional[str] = None, since: Optional[str] = None,
+                min_salary: Optional[float] = None, max_salary: Optional[float] = None,
+                db_path: str = "jobs.db") -> Tuple[list[Dict[str, Any]], Optional[str]]:
+    """
+    Full-text searches jobs, best matches first, with a highlighted snippet per job.
+
+    Results are ordered by (bm25 score, id) and paged with a keyset cursor over
+    that pair. Queries with terms shorter than three characters fall back to a
+    substring scan in id order, because the trigram index can't serve them.
+
+    Args:
+        query: Free-text search terms (all must match)
+        limit: Maximum number of jobs to return
+        after: Cursor from the previous page; None for the first page
+        since: Optional ISO date; only jobs placed (or, failing that, closing) on or after it
+        min_salary, max_salary: Optional annual salary range the job's range must overlap
+
+    Returns:
+        (jobs, next_cursor); each job has a 'snippet' with SNIPPET_START/SNIPPET_END
+        around the matches; next_cursor is None on the last page
+    """
+    match = fts_query(query)
+    if match is None:
+        after_id = int(after) if after and after.isdigit() else None
+        jobs, next_id = get_jobs_page(limit, after_id, query, since=since, min_salary=min_salary,
+                                      max_salary=max_salary, db_path=db_path)
+        return jobs, (str(next_id) if next_id is not None else None)
+
+    columns = ", ".join(f"j.{column}" for column in JOB_COLUMNS)
+    filters, filter_params = _salary_conditions(min_salary, max_salary, prefix="j.")
+    if since:
+        filters.append(f"{JOB_POSTED_DATE} >= ?")
+        filter_params.append(since)
+    weights = ", ".join(str(weight) for weight in FTS_WEIGHTS)
+    sql = f"""
+        SELECT * FROM (
+            SELECT {columns},
+                   snippet(job_postings_fts, -1, '{SNIPPET_START}', '{SNIPPET_END}', '…', 32) AS snippet,
+                   bm25(job_postings_fts, {weights}) AS score
+            FROM job_postings_fts JOIN job_postings j ON j.id = job_postings_fts.rowid
+            WHERE job_postings_fts MATCH ?{"".join(" AND " + condition for condition in filters)}
+        )
+    """
+    params: list = [match] + filter_params
+    if after and ":" in after:
+        score, _, last_id = after.partition(":")
+        try:
+            params += [float(score), float(score), int(last_id)]
+            sql += " WHERE score > ? OR (score = ? AND id > ?)"
+        except ValueError:
+            pass
+    sql += " ORDER BY score, id LIMIT ?"
+    params.append(limit + 1)
+
+    rows = get_connection(db_path).execute(sql, params).fetchall()
+    fields = JOB_COLUMNS + ['snippet', 'score']
+    jobs = [dict(zip(fields, row)) for row in rows[:limit]]
+    next_cursor = f"{jobs[-1]['score']!r}:{jobs[-1]['id']}" if len(rows) > limit else None
+    return jobs, next_cursor
@@ -0,0 +1,13 @@
+"""
+SQLite Connection Layer
+
+The implementation is db.py at the repository root, shared with the root web
+app (see shared.py). `python db.py report [path]` works from here as well.
+"""
+
+from shared import load_root_module, run_root_script
+
+if __name__ == "__main__":
+    run_root_script("db")
+else:
+    load_root_module("db")
@@ -0,0 +1,193 @@
+"""
+Incremental Job URL Discovery
+
+Walks configured listing/search pages (one URL per line in listing_urls.txt)
+and extracts links to individual postings using the site's extractor
+(`SiteExtractor.posting_url_pattern`). New posting URLs are pushed into the
+crawl frontier for the collector.
+
+Listings are assumed to show the newest postings first. The newest posting
+seen on each listing is remembered in `listing_state`; a later run stops
+paging on the page where it meets that marker or where every posting is
+already known, so a run fetches roughly one page more than the number of
+pages holding new postings instead of re-walking the whole listing.
+
+The marker only moves when a walk ends on it, on a fully known page or on the
+last page. A walk cut short by DISCOVERY_MAX_PAGES leaves the marker alone and
+records the next page in `resume_url`; later runs continue from there with
+the pages left in their budget, so postings past the cap are still found.
+"""
+
+import re
+import sqlite3
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urldefrag, urlsplit
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+from config import DISCOVERY_MAX_PAGES, DISCOVERY_PAGE_DELAY
+from db import get_connection, transaction
+from extractors import HTML_PARSER, get_extractor
+from frontier import FRONTIER_SCHEMA, enqueue_urls
+from http_client import fetch_text
+
+LISTING_STATE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS listing_state (
+    listing_url TEXT PRIMARY KEY,
+    newest_url TEXT,
+    last_run_at REAL,
+    last_new_count INTEGER NOT NULL DEFAULT 0,
+    last_pages INTEGER NOT NULL DEFAULT 0,
+    resume_url TEXT
+);
+"""
+
+# Only anchors and <link rel="next"> matter on a listing page
+_LINK_STRAINER = SoupStrainer(['a', 'link'])
+_NEXT_TEXT = re.compile(r'^\s*(next|next page|›|»|>)\s*$', re.IGNORECASE)
+
+
+def parse_listing_page(url: str, content: str) -> Tuple[List[str], Optional[str]]:
+    """
+    Extracts posting URLs (in page order, deduplicated) and the next page URL from a listing page.
+    """
+    extractor = get_extractor(url)
+    soup = BeautifulSoup(content, HTML_PARSER, parse_only=_LINK_STRAINER)
+    host = urlsplit(url).netloc.lower()
+
+    postings = []
+    seen = set()
+    next_url = None
+    for link in soup.find_all(['a', 'link'], href=True):
+        href, _ = urldefrag(urljoin(url, link['href']))
+        if next_url is None and ('next' in (link.get('rel') or []) or
+                                 (link.name == 'a' and _NEXT_TEXT.match(link.get_text()))):
+            next_url = href
+            continue
+        parts = urlsplit(href)
+        if link.name != 'a' or parts.netloc.lower() != host or href in seen:
+            continue
+        if extractor.posting_url_pattern.search(parts.path):
+            seen.add(href)
+            postings.append(href)
+    return postings, next_url
+
+
+def _known_urls(conn: sqlite3.Connection, urls: List[str]) -> set:
+    """Returns which of the URLs are already in the crawl frontier."""
+    placeholders = ','.join('?' * len(urls))
+    rows = conn.execute(f"SELECT url FROM crawl_frontier WHERE url IN ({placeholders})", urls).fetchall()
+    return {row[0] for row in rows}
+
+
+def init_listing_state(db_path: str = "jobs.db"):
+    """Creates the frontier and listing state tables, adding columns introduced after the first release."""
+    conn = get_connection(db_path)
+    conn.executescript(FRONTIER_SCHEMA + LISTING_STATE_SCHEMA)
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(listing_state)")}
+    if 'resume_url' not in columns:
+        with transaction(db_path) as conn:
+            conn.execute("ALTER TABLE listing_state ADD COLUMN resume_url TEXT")
+
+
+def _walk(conn: sqlite3.Connection, page_url: str, marker: Optional[str], max_pages: int,
+          db_path: str, stop_on_known: bool = True) -> Tuple[List[str], Optional[str], int, Optional[str]]:
+    """
+    Pages from `page_url` until the marker, a fully known page, the last page or `max_pages`.
+
+    Returns:
+        (new posting URLs, first posting seen, pages fetched, next page URL if stopped by the cap else None)
+    """
+    new_urls: List[str] = []
+    newest = None
+    pages = 0
+    visited = set()
+    while page_url and page_url not in visited:
+        if pages == max_pages:
+            return new_urls, newest, pages, page_url
+        if pages:
+            time.sleep(DISCOVERY_PAGE_DELAY)
+        visited.add(page_url)
+        postings, next_url = parse_listing_page(page_url, fetch_text(page_url))
+        pages += 1
+        if not postings:
+            break
+        newest = newest or postings[0]
+
+        known = _known_urls(conn, postings)
+        fresh = [url for url in postings if url not in known]
+        if fresh:
+            # Queue page by page so a failure further down keeps what was found;
+            # newly found postings go ahead of retries of old ones
+            enqueue_urls(fresh, priority=1, db_path=db_path)
+            new_urls.extend(fresh)
+        # Everything after the marker (or a fully known page) was seen on an earlier run.
+        # The rest of this page is still scanned, so pinned postings above the marker don't hide new ones.
+        if marker in postings or (stop_on_known and not fresh):
+            break
+        page_url = next_url
+    return new_urls, newest, pages, None
+
+
+def discover_listing(listing_url: str, max_pages: int = DISCOVERY_MAX_PAGES,
+                     db_path: str = "jobs.db") -> List[str]:
+    """
+    Pages through one listing until it reaches known postings and queues the new ones.
+
+    Returns:
+        Newly discovered posting URLs, newest first
+    """
+    init_listing_state(db_path)
+    conn = get_connection(db_path)
+    row = conn.execute("SELECT newest_url, resume_url FROM listing_state WHERE listing_url = ?",
+                       (listing_url,)).fetchone()
+    marker, resume_url = row if row else (None, None)
+
+    new_urls, newest, pages, stopped_at = _walk(conn, listing_url, marker, max_pages, db_path)
+    if stopped_at:
+        # Pages between the cap and the old marker are unvisited: keep the marker, come back for them
+        resume_url = stopped_at
+    else:
+        # The top of the listing is complete; the marker can move even if an older gap remains
+        marker = newest or marker
+        if resume_url and pages < max_pages:
+            # New postings shift pages down, so the resumed pages may start with known ones: only
+            # the old marker or the end of the listing closes the gap
+            older_urls, _, resumed_pages, resume_url = _walk(conn, resume_url, row[0], max_pages - pages,
+                                                             db_path, stop_on_known=False)
+            new_urls.extend(older_urls)
+            pages += resumed_pages
+
+    if newest or row:
+        with transaction(db_path) as conn:
+            conn.execute("""
+                INSERT INTO listing_state (listing_url, newest_url, last_run_at, last_new_count, last_pages, resume_url)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(listing_url) DO UPDATE SET
+                    newest_url = excluded.newest_url, last_run_at = excluded.last_run_at,
+                    last_new_count = excluded.last_new_count, last_pages = excluded.last_pages,
+                    resume_url = excluded.resume_url
+            """, (listing_url, marker, time.time(), len(new_urls), pages, resume_url))
+
+    suffix = f", more pages left (resuming at {resume_url})" if resume_url else ""
+    print(f"{listing_url}: {len(new_urls)} new posting(s) in {pages} page(s){suffix}")
+    return new_urls
+
+
+def discover_all(listing_urls: List[str], max_pages: int = DISCOVERY_MAX_PAGES,
+                 db_path: str = "jobs.db") -> Dict[str, int]:
+    """
+    Runs discovery for every listing, continuing past listings that fail.
+
+    Returns:
+        {listing_url: number of new postings}, -1 for listings that failed
+    """
+    results = {}
+    for listing_url in listing_urls:
+        try:
+            results[listing_url] = len(discover_listing(listing_url, max_pages, db_path))
+        except Exception as e:
+            print(f"✗ Discovery failed for {listing_url}: {e}")
+            results[listing_url] = -1
+    return results
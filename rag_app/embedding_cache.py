@@ -0,0 +1,185 @@
+"""
+Query Embedding Cache
+
+A bounded, thread-safe LRU of query embeddings keyed by (model name,
+normalized query text). Repeated queries return the cached vector without
+running the transformer. Vectors are kept as read-only float32 arrays (a
+quarter of the memory of a list of Python floats), so the cached vector can
+be handed to every caller without one of them changing it for the others.
+When a persistence path is given the entries are
+also written to a small SQLite file and the most recently used ones are
+loaded back on start.
+
+Persistence is write-behind: new entries and the last-used time of hits are
+collected in memory and written, together with the eviction of the oldest
+rows, by a background thread every `flush_interval` seconds (and at exit), so
+requests never wait on SQLite.
+"""
+
+import atexit
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+QUERY_CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS query_embeddings (
+    model TEXT NOT NULL,
+    query TEXT NOT NULL,
+    embedding BLOB NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (model, query)
+);
+CREATE INDEX IF NOT EXISTS idx_query_embeddings_last_used ON query_embeddings (last_used);
+"""
+
+
+def normalize_query(text: str) -> str:
+    """Unicode-normalizes and collapses whitespace so trivial variants share an entry."""
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+class QueryEmbeddingCache:
+    """LRU cache of query embeddings with hit/miss counters."""
+
+    def __init__(self, maxsize: int = 10000, persist_path: Optional[str] = None, flush_interval: float = 30.0):
+        self.maxsize = maxsize
+        self.persist_path = persist_path
+        self.flush_interval = flush_interval
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        # key -> (embedding of a new entry, or None for a hit on a stored one; last used time)
+        self._pending: Dict[Tuple[str, str], Tuple[Optional[np.ndarray], float]] = {}
+        self._flusher: Optional[threading.Thread] = None
+        self._flusher_pid = None
+        self._flusher_lock = threading.Lock()
+        if persist_path:
+            self._load()
+            atexit.register(self.flush)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.persist_path)
+        conn.executescript(QUERY_CACHE_SCHEMA)
+        return conn
+
+    def _load(self):
+        """Loads the most recently used persisted entries, oldest first so LRU order is kept."""
+        try:
+            conn = self._connect()
+            rows = conn.execute(
+                "SELECT model, query, embedding FROM query_embeddings ORDER BY last_used DESC LIMIT ?",
+                (self.maxsize,)
+            ).fetchall()
+            conn.close()
+        except sqlite3.Error as e:
+            print(f"Could not load query embedding cache: {e}")
+            return
+        for model, query, blob in reversed(rows):
+            # frombuffer over the bytes object is already read-only
+            self._entries[(model, query)] = np.frombuffer(blob, dtype=np.float32)
+
+    def _ensure_flusher(self):
+        # A forked worker inherits the pending entries but not the thread, so it starts its own
+        if self._flusher is not None and self._flusher_pid == os.getpid() and self._flusher.is_alive():
+            return
+        with self._flusher_lock:
+            if self._flusher is None or self._flusher_pid != os.getpid() or not self._flusher.is_alive():
+                self._flusher_pid = os.getpid()
+                self._flusher = threading.Thread(target=self._run_flusher, name="query-cache-flush", daemon=True)
+                self._flusher.start()
+
+    def _run_flusher(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def flush(self):
+        """Writes pending entries and last-used times, then trims the file to `maxsize` rows."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        try:
+            conn = self._connect()
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO query_embeddings (model, query, embedding, last_used) VALUES (?, ?, ?, ?)",
+                    [(key[0], key[1], embedding.tobytes(), last_used)
+                     for key, (embedding, last_used) in pending.items() if embedding is not None]
+                )
+                conn.executemany(
+                    "UPDATE query_embeddings SET last_used = ? WHERE model = ? AND query = ?",
+                    [(last_used, key[0], key[1]) for key, (embedding, last_used) in pending.items() if embedding is None]
+                )
+                # Keep the file bounded to the same size as the in-memory cache
+                conn.execute("""
+                    DELETE FROM query_embeddings WHERE rowid IN (
+                        SELECT rowid FROM query_embeddings ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                    )
+                """, (self.maxsize,))
+            conn.close()
+        except sqlite3.Error as e:
+            print(f"Could not persist query embeddings: {e}")
+
+    def get_or_compute(self, query: str, model_name: str,
+                       compute: Callable[[str], Sequence[float]]) -> np.ndarray:
+        """
+        Returns the cached embedding for a query, calling `compute` only on a miss.
+
+        `compute` receives the normalized text, so the cached vector is exactly
+        the one any equivalent spelling of the query would have produced. The
+        result is a shared read-only float32 array; copy it before modifying.
+        """
+        key = (model_name, normalize_query(query))
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                if self.persist_path:
+                    # Keep an unwritten new entry's embedding, only the time changes
+                    self._pending[key] = (self._pending.get(key, (None,))[0], time.time())
+            else:
+                self.misses += 1
+        if embedding is not None:
+            if self.persist_path:
+                self._ensure_flusher()
+            return embedding
+
+        # Encode outside the lock so concurrent misses don't serialize on the model
+        embedding = np.array(compute(key[1]), dtype=np.float32)
+        embedding.flags.writeable = False
+        with self._lock:
+            self._entries[key] = embedding
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+            if self.persist_path:
+                self._pending[key] = (embedding, time.time())
+        if self.persist_path:
+            self._ensure_flusher()
+        return embedding
+
+    def stats(self) -> Dict[str, float]:
+        """Returns hit/miss counters and the current hit rate."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+                'hit_rate': self.hits / total if total else 0.0
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
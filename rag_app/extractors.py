@@ -0,0 +1,169 @@
+"""
+Per-site Content Extractors
+
+Each supported job site registers a `SiteExtractor` under its hostname. An
+extractor carries its content selectors and noise filters compiled once at
+import time: the selectors become SoupStrainer attribute regexes and the
+noise phrases become a single alternation regex, so line filtering is one
+pass per line no matter how many phrases there are.
+
+Lookup walks the URL's hostname from the full name towards the registered
+suffix (www.jobs.ac.uk -> jobs.ac.uk -> ac.uk), which is a handful of dict
+lookups regardless of how many sites are registered.
+
+Extractors also know which links on a site's listing pages point at job
+postings (`posting_url_pattern`), which the discovery stage uses.
+
+Adding a site:
+    register_extractor(SiteExtractor(
+        hosts=["jobs.example.com"],
+        selectors=[('div', {'class': 'vacancy'}), ('main', {})],
+        posting_url_pattern=r'/vacancy/[0-9]+',
+    ))
+"""
+
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from bs4 import BeautifulSoup, SoupStrainer, Tag
+
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'  # C parser, several times faster than html.parser
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+# Lines containing any of these phrases are dropped from the extracted text
+DEFAULT_NOISE_PHRASES = ['cookie', 'accept', 'consent', 'preferences', 'privacy', 'terms']
+
+# Path of a link on a listing page that leads to a single job posting
+DEFAULT_POSTING_URL_PATTERN = r'/(job|jobs|vacancy|vacancies|position)/[^/?#]+'
+
+
+def compile_phrases(phrases: Iterable[str]) -> re.Pattern:
+    """Compiles phrases into one case-insensitive alternation regex."""
+    return re.compile('|'.join(re.escape(phrase) for phrase in phrases), re.IGNORECASE)
+
+
+def _attribute_matchers(attrs: Dict[str, str]) -> Dict[str, re.Pattern]:
+    """Builds regex attribute filters that behave the same across BeautifulSoup versions."""
+    matchers = {}
+    for attr, value in attrs.items():
+        if attr == 'class':
+            matchers[attr] = re.compile(r'(^|\s)' + re.escape(value) + r'(\s|$)')
+        else:
+            matchers[attr] = re.compile('^' + re.escape(value) + '$')
+    return matchers
+
+
+class _CompiledSelector:
+    """A (tag, attributes) selector with its pre-checks and strainer built once."""
+
+    def __init__(self, name: str, attrs: Dict[str, str]):
+        self.name = name
+        self.tag_pattern = re.compile(r'<' + name + r'[\s>]', re.IGNORECASE)
+        self.values = list(attrs.values())
+        self.strainer = SoupStrainer(name, attrs=_attribute_matchers(attrs))
+
+    def find(self, content: str) -> Optional[Tag]:
+        # Skip parsing entirely when the tag or attribute value is not in the raw HTML
+        if not self.tag_pattern.search(content):
+            return None
+        if any(value not in content for value in self.values):
+            return None
+        return BeautifulSoup(content, HTML_PARSER, parse_only=self.strainer).find(self.name)
+
+
+class SiteExtractor:
+    """Selectors and noise filters for one site (or the generic fallback)."""
+
+    def __init__(self, hosts: List[str], selectors: List[Tuple[str, Dict[str, str]]],
+                 noise_classes: Optional[List[str]] = None,
+                 noise_phrases: List[str] = DEFAULT_NOISE_PHRASES,
+                 posting_url_pattern: str = DEFAULT_POSTING_URL_PATTERN):
+        """
+        Args:
+            hosts: Hostnames (or parent domains) this extractor handles
+            selectors: Content selectors in priority order, (tag name, {attribute: value});
+                a class value matches when it is one of the element's classes
+            noise_classes: Class substrings of div/section elements removed from the content
+            noise_phrases: Phrases whose lines are dropped from the extracted text
+            posting_url_pattern: Regex searched in a link's path to recognise job postings on listing pages
+        """
+        self.hosts = hosts
+        self.selectors = [_CompiledSelector(name, attrs) for name, attrs in selectors]
+        self.noise_class_pattern = compile_phrases(noise_classes) if noise_classes else None
+        self.noise_line_pattern = compile_phrases(noise_phrases)
+        self.posting_url_pattern = re.compile(posting_url_pattern, re.IGNORECASE)
+
+    def find_main_content(self, content: str) -> Optional[Tag]:
+        """Returns the first element matching the selectors, parsing only that subtree."""
+        for selector in self.selectors:
+            element = selector.find(content)
+            if element:
+                return element
+        return None
+
+    def extract_text(self, content: str) -> str:
+        """Extracts the job-relevant text, falling back to the whole page."""
+        main_content = self.find_main_content(content)
+        if main_content is None:
+            return BeautifulSoup(content, HTML_PARSER).get_text()
+        if self.noise_class_pattern:
+            # Remove cookie consent banners and other non-job content
+            for element in main_content.find_all(['div', 'section'], class_=self.noise_class_pattern):
+                element.decompose()
+        return main_content.get_text()
+
+    def clean_lines(self, text: str) -> List[str]:
+        """Strips lines and drops empty or noise lines in a single pass."""
+        search = self.noise_line_pattern.search
+        return [line for line in (raw.strip() for raw in text.split('\n')) if line and not search(line)]
+
+
+_registry: Dict[str, SiteExtractor] = {}
+
+DEFAULT_EXTRACTOR = SiteExtractor(
+    hosts=[],
+    selectors=[('main', {}), ('article', {}), ('div', {'class': 'content'})],
+)
+
+
+def register_extractor(extractor: SiteExtractor):
+    """Registers an extractor for each of its hostnames."""
+    for host in extractor.hosts:
+        _registry[host.lower()] = extractor
+
+
+def get_extractor(url: str) -> SiteExtractor:
+    """Returns the extractor for a URL's hostname or its closest registered parent domain."""
+    host = (urlsplit(url).hostname or '').lower()
+    while host:
+        extractor = _registry.get(host)
+        if extractor:
+            return extractor
+        _, _, host = host.partition('.')
+    return DEFAULT_EXTRACTOR
+
+
+register_extractor(SiteExtractor(
+    hosts=["jobs.ac.uk"],
+    selectors=[('main', {}), ('div', {'class': 'main-content'}), ('article', {})],
+    posting_url_pattern=r'^/job/[A-Z0-9]+',
+))
+
+register_extractor(SiteExtractor(
+    hosts=["careers.hsbc", "careers.hsbc.com"],
+    selectors=[
+        ('div', {'class': 'jobDescription'}),
+        ('div', {'class': 'job-detail'}),
+        ('div', {'class': 'job-content'}),
+        ('div', {'data-testid': 'job-description'}),
+        ('div', {'id': 'jobDescription'}),
+        ('section', {'class': 'job'}),
+        ('main', {}),
+        ('article', {}),
+    ],
+    noise_classes=['cookie', 'consent', 'banner'],
+))
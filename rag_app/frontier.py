@@ -0,0 +1,271 @@
+"""
+Durable Crawl Frontier
+
+Persists every URL the collector should visit in the `crawl_frontier` table,
+together with its state, attempt count, last error, priority and the earliest
+time it may be retried. Workers lease batches of eligible URLs; a lease that
+is never completed (for example because the process crashed) expires and the
+URL becomes eligible again, so a restarted crawl resumes where it stopped
+without re-fetching URLs that are already done or permanently failed.
+
+Leases are spread across hosts: each host gets at most `per_host` URLs in
+progress at once, and URLs are handed out round-robin over hosts, so one host
+with a long queue can't fill a collector's queue while other hosts wait. The
+hosts with eligible URLs are read with a scan of the frontier at most every
+CRAWL_HOSTS_REFRESH_SECONDS and kept in memory (hosts enqueued by this
+process are added straight away), so a lease only runs one short index range
+query per host under the write lock, however long the backlog is.
+
+`init_frontier` creates the table once per process start; the other functions
+assume it exists.
+
+States:
+    pending     waiting to be fetched (possibly after a backoff delay)
+    in_progress leased by a worker until `leased_until`
+    done        stored successfully
+    failed      gave up after CRAWL_MAX_ATTEMPTS or a permanent error
+"""
+
+import random
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+from config import (CRAWL_MAX_ATTEMPTS, CRAWL_BACKOFF_BASE, CRAWL_BACKOFF_MAX, CRAWL_LEASE_SECONDS, CRAWL_LEASE_PER_HOST,
+                    CRAWL_HOSTS_REFRESH_SECONDS)
+from db import get_connection, transaction
+
+FRONTIER_SCHEMA = """
+CREATE TABLE IF NOT EXISTS crawl_frontier (
+    url TEXT PRIMARY KEY,
+    host TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    priority INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    next_eligible_at REAL NOT NULL DEFAULT 0,
+    leased_until REAL,
+    added_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_crawl_frontier_eligible
+    ON crawl_frontier (state, priority DESC, next_eligible_at);
+CREATE INDEX IF NOT EXISTS idx_crawl_frontier_host
+    ON crawl_frontier (host, state, priority DESC, next_eligible_at);
+"""
+
+# Largest IN (...) list per statement, below SQLite's default variable limit
+_IN_CHUNK = 500
+
+# db_path -> (monotonic time of the last scan, hosts that had eligible URLs then or were enqueued since)
+_eligible_hosts: Dict[str, Tuple[float, Set[str]]] = {}
+_hosts_lock = threading.Lock()
+
+
+def init_frontier(db_path: str = "jobs.db"):
+    """Creates the crawl frontier table if it doesn't exist."""
+    get_connection(db_path).executescript(FRONTIER_SCHEMA)
+
+
+def enqueue_urls(urls: Iterable[str], priority: int = 0, db_path: str = "jobs.db") -> int:
+    """
+    Adds URLs to the frontier, ignoring ones it already knows.
+
+    New URLs that are already stored in `job_postings` are recorded as done;
+    URLs already in the frontier keep their state (so a re-queued URL stays pending).
+
+    Returns:
+        Number of newly added URLs
+    """
+    urls = list(dict.fromkeys(urls))
+    now = time.time()
+    with transaction(db_path) as conn:
+        stored = set()
+        has_jobs = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'job_postings'"
+        ).fetchone()
+        if has_jobs:
+            for start in range(0, len(urls), _IN_CHUNK):
+                chunk = urls[start:start + _IN_CHUNK]
+                stored.update(row[0] for row in conn.execute(
+                    f"SELECT url FROM job_postings WHERE url IN ({','.join('?' * len(chunk))})", chunk
+                ))
+        before = conn.total_changes
+        conn.executemany("""
+            INSERT INTO crawl_frontier (url, host, state, priority, added_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(url) DO NOTHING
+        """, ((url, urlsplit(url).netloc.lower(), 'done' if url in stored else 'pending', priority, now, now)
+              for url in urls))
+        added = conn.total_changes - before
+    _add_hosts({urlsplit(url).netloc.lower() for url in urls if url not in stored}, db_path)
+    return added
+
+
+def _add_hosts(hosts: Set[str], db_path: str):
+    with _hosts_lock:
+        if db_path in _eligible_hosts:
+            _eligible_hosts[db_path][1].update(hosts)
+
+
+def _forget_hosts(db_path: str):
+    with _hosts_lock:
+        _eligible_hosts.pop(db_path, None)
+
+
+def _hosts_with_work(db_path: str, refresh: bool = False) -> Set[str]:
+    """Returns the cached set of hosts with eligible URLs, re-reading it when stale or asked to."""
+    with _hosts_lock:
+        cached = _eligible_hosts.get(db_path)
+        if cached and not refresh and time.monotonic() - cached[0] < CRAWL_HOSTS_REFRESH_SECONDS:
+            return set(cached[1])
+    now = time.time()
+    hosts = {row[0] for row in get_connection(db_path).execute("""
+        SELECT DISTINCT host FROM crawl_frontier
+        WHERE (state = 'pending' AND next_eligible_at <= ?)
+           OR (state = 'in_progress' AND leased_until < ?)
+    """, (now, now))}
+    with _hosts_lock:
+        _eligible_hosts[db_path] = (time.monotonic(), hosts)
+    return set(hosts)
+
+
+def lease_urls(limit: int, lease_seconds: float = CRAWL_LEASE_SECONDS, per_host: int = CRAWL_LEASE_PER_HOST,
+               db_path: str = "jobs.db") -> List[str]:
+    """
+    Atomically leases up to `limit` eligible URLs, highest priority first and round-robin over hosts.
+
+    Eligible means pending and past its backoff time, or in progress with an
+    expired lease (the worker holding it died). A host that already has
+    `per_host` URLs under a live lease gets no more until some complete.
+    """
+    urls = _lease(limit, lease_seconds, per_host, _hosts_with_work(db_path), db_path)
+    if not urls:
+        # The cached hosts may be out of date (another process enqueued, or backoffs expired)
+        urls = _lease(limit, lease_seconds, per_host, _hosts_with_work(db_path, refresh=True), db_path)
+    return urls
+
+
+def _lease(limit: int, lease_seconds: float, per_host: int, hosts: Set[str], db_path: str) -> List[str]:
+    if not hosts:
+        return []
+    now = time.time()
+    with transaction(db_path) as conn:
+        # Take the write lock before reading so two collectors can't lease the same rows
+        conn.execute("BEGIN IMMEDIATE")
+        leased = dict(conn.execute("""
+            SELECT host, COUNT(*) FROM crawl_frontier
+            WHERE state = 'in_progress' AND leased_until >= ? GROUP BY host
+        """, (now,)).fetchall())
+
+        # (-priority, rank within host, url): the i-th URL of every host comes before the (i+1)-th of any
+        candidates = []
+        for host in sorted(hosts):
+            slots = min(per_host - leased.get(host, 0), limit)
+            if slots <= 0:
+                continue
+            # Two queries rather than one with OR: each walks the host index in order and stops at the limit
+            rows = conn.execute("""
+                SELECT -priority, next_eligible_at, added_at, url FROM crawl_frontier
+                WHERE host = ? AND state = 'pending' AND next_eligible_at <= ?
+                ORDER BY priority DESC, next_eligible_at
+                LIMIT ?
+            """, (host, now, slots)).fetchall()
+            rows += conn.execute("""
+                SELECT -priority, next_eligible_at, added_at, url FROM crawl_frontier
+                WHERE host = ? AND state = 'in_progress' AND leased_until < ?
+                ORDER BY priority DESC, next_eligible_at
+                LIMIT ?
+            """, (host, now, slots)).fetchall()
+            rows = sorted(rows)[:slots]
+            candidates.extend((row[0], rank, row[3]) for rank, row in enumerate(rows))
+        urls = [url for _, _, url in sorted(candidates)[:limit]]
+
+        conn.executemany(
+            "UPDATE crawl_frontier SET state = 'in_progress', leased_until = ?, updated_at = ? WHERE url = ?",
+            [(now + lease_seconds, now, url) for url in urls]
+        )
+    return urls
+
+
+def release_leases(db_path: str = "jobs.db") -> int:
+    """
+    Returns every in-progress URL to pending, regardless of lease expiry.
+
+    Only safe when no other collector is running; used at startup to resume
+    immediately after a crash instead of waiting for the leases to expire.
+    """
+    with transaction(db_path) as conn:
+        released = conn.execute(
+            "UPDATE crawl_frontier SET state = 'pending', leased_until = NULL WHERE state = 'in_progress'"
+        ).rowcount
+    _forget_hosts(db_path)
+    return released
+
+
+def requeue_done(older_than_seconds: float, db_path: str = "jobs.db") -> int:
+    """
+    Returns done URLs last processed more than `older_than_seconds` ago to pending, for a re-crawl.
+
+    Returns:
+        Number of re-queued URLs
+    """
+    now = time.time()
+    with transaction(db_path) as conn:
+        requeued = conn.execute("""
+            UPDATE crawl_frontier SET state = 'pending', attempts = 0, next_eligible_at = 0, updated_at = ?
+            WHERE state = 'done' AND updated_at < ?
+        """, (now, now - older_than_seconds)).rowcount
+    _forget_hosts(db_path)
+    return requeued
+
+
+def mark_done(url: str, db_path: str = "jobs.db"):
+    """Marks a leased URL as successfully processed."""
+    now = time.time()
+    with transaction(db_path) as conn:
+        conn.execute("""
+            UPDATE crawl_frontier
+            SET state = 'done', attempts = attempts + 1, last_error = NULL, leased_until = NULL, updated_at = ?
+            WHERE url = ?
+        """, (now, url))
+
+
+def mark_failed(url: str, error: str, permanent: bool = False, db_path: str = "jobs.db") -> bool:
+    """
+    Records a failed attempt and schedules a retry with exponential backoff.
+
+    Returns:
+        True if the URL will be retried, False if it was given up on
+    """
+    now = time.time()
+    with transaction(db_path) as conn:
+        row = conn.execute("SELECT attempts FROM crawl_frontier WHERE url = ?", (url,)).fetchone()
+        attempts = (row[0] if row else 0) + 1
+        retry = not permanent and attempts < CRAWL_MAX_ATTEMPTS
+        # base * 2^(attempts-1) with +-20% jitter so retries of one host don't align
+        delay = min(CRAWL_BACKOFF_MAX, CRAWL_BACKOFF_BASE * 2 ** (attempts - 1)) * random.uniform(0.8, 1.2)
+        conn.execute("""
+            UPDATE crawl_frontier
+            SET state = ?, attempts = ?, last_error = ?, next_eligible_at = ?, leased_until = NULL, updated_at = ?
+            WHERE url = ?
+        """, ('pending' if retry else 'failed', attempts, error[:1000], now + delay if retry else now, now, url))
+    return retry
+
+
+def next_eligible_time(db_path: str = "jobs.db") -> Optional[float]:
+    """Returns when the next pending URL becomes eligible, or None if nothing is pending."""
+    conn = get_connection(db_path)
+    row = conn.execute("""
+        SELECT MIN(CASE WHEN state = 'pending' THEN next_eligible_at ELSE leased_until END)
+        FROM crawl_frontier WHERE state IN ('pending', 'in_progress')
+    """).fetchone()
+    return row[0] if row else None
+
+
+def frontier_stats(db_path: str = "jobs.db") -> Dict[str, int]:
+    """Returns the number of URLs in each state."""
+    conn = get_connection(db_path)
+    stats = dict(conn.execute("SELECT state, COUNT(*) FROM crawl_frontier GROUP BY state").fetchall())
+    return stats
@@ -0,0 +1,122 @@
+"""
+Location Geocoding
+
+Turns a job's free-text location into coordinates with OpenStreetMap's
+Nominatim service, falling back to a table of well-known cities. Results are
+cached per process, and requests are serialized at most one per
+GEOCODE_MIN_INTERVAL seconds as Nominatim's usage policy requires.
+
+Jobs are geocoded when they are stored (see job_collector) and the
+coordinates are kept on job_postings, so map requests never geocode.
+"""
+
+import threading
+import time
+
+from config import GEOCODE_MIN_INTERVAL, HTTP_TIMEOUT
+from http_client import get_session
+
+# Cache for geocoding results
+geocode_cache = {}
+_nominatim_lock = threading.Lock()
+_last_request = [0.0]
+
+
+def geocode_location(location):
+    """Convert location name to coordinates using Nominatim API"""
+    if not location:
+        return None
+
+    # Check cache first
+    if location in geocode_cache:
+        return geocode_cache[location]
+
+    # Nominatim's usage policy allows one request per second per client
+    with _nominatim_lock:
+        if location in geocode_cache:
+            return geocode_cache[location]
+        return _geocode_uncached(location)
+
+
+def _geocode_uncached(location):
+    try:
+        # Clean up location string
+        clean_location = location.replace(", Hybrid", "").strip()
+
+        # Determine if this is likely a UK location or international
+        # If it contains obvious international indicators, don't append ", UK"
+        is_international = any(indicator in clean_location.lower() for indicator in
+                              ['cn', 'china', 'guangzhou', 'beijing', 'shanghai', 'hk', 'hong kong',
+                               'usa', 'us', 'united states', 'canada', 'australia', 'germany',
+                               'france', 'italy', 'spain', 'japan', 'korea', 'india', 'brazil'])
+
+        # Use Nominatim API (OpenStreetMap)
+        url = "https://nominatim.openstreetmap.org/search"
+        if is_international:
+            params = {
+                "q": clean_location,
+                "format": "json",
+                "limit": 1
+            }
+        else:
+            params = {
+                "q": f"{clean_location}, UK",  # Assume UK locations for jobs.ac.uk
+                "format": "json",
+                "limit": 1
+            }
+        headers = {"User-Agent": "RAG-Job-Search/1.0"}
+
+        wait = _last_request[0] + GEOCODE_MIN_INTERVAL - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        _last_request[0] = time.monotonic()
+        response = get_session(url).get(url, params=params, headers=headers, timeout=HTTP_TIMEOUT)
+        data = response.json()
+
+        if data:
+            lat = float(data[0]["lat"])
+            lon = float(data[0]["lon"])
+            result = {"lat": lat, "lon": lon, "display_name": data[0]["display_name"]}
+            geocode_cache[location] = result
+            return result
+
+    except Exception as e:
+        print(f"Geocoding error for {location}: {e}")
+
+    # Fallback coordinates for common UK cities
+    fallbacks = {
+        "London": {"lat": 51.5074, "lon": -0.1278, "display_name": "London, UK"},
+        "Cambridge": {"lat": 52.2053, "lon": 0.1218, "display_name": "Cambridge, UK"},
+        "Edinburgh": {"lat": 55.9533, "lon": -3.1883, "display_name": "Edinburgh, UK"},
+        "Southampton": {"lat": 50.9097, "lon": -1.4044, "display_name": "Southampton, UK"},
+        "Plymouth": {"lat": 50.3755, "lon": -4.1427, "display_name": "Plymouth, UK"}
+    }
+
+    # Also add some international fallbacks
+    international_fallbacks = {
+        "Guangzhou": {"lat": 23.1291, "lon": 113.2644, "display_name": "Guangzhou, China"},
+        "Beijing": {"lat": 39.9042, "lon": 116.4074, "display_name": "Beijing, China"},
+        "Shanghai": {"lat": 31.2304, "lon": 121.4737, "display_name": "Shanghai, China"},
+        "Hong Kong": {"lat": 22.3193, "lon": 114.1694, "display_name": "Hong Kong, China"},
+        "New York": {"lat": 40.7128, "lon": -74.0060, "display_name": "New York, USA"},
+        "Los Angeles": {"lat": 34.0522, "lon": -118.2437, "display_name": "Los Angeles, USA"},
+        "Tokyo": {"lat": 35.6762, "lon": 139.6503, "display_name": "Tokyo, Japan"},
+        "Paris": {"lat": 48.8566, "lon": 2.3522, "display_name": "Paris, France"},
+        "Berlin": {"lat": 52.5200, "lon": 13.4050, "display_name": "Berlin, Germany"},
+        "Sydney": {"lat": -33.8688, "lon": 151.2093, "display_name": "Sydney, Australia"}
+    }
+
+    # Try to match against both UK and international fallbacks
+    result = fallbacks.get(clean_location)
+    if result:
+        geocode_cache[location] = result
+        return result
+
+    # Try to find a match in the international fallbacks
+    # Look for partial matches in the location string
+    for city, coords in international_fallbacks.items():
+        if city.lower() in clean_location.lower():
+            geocode_cache[location] = coords
+            return coords
+
+    return result
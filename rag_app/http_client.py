@@ -0,0 +1,176 @@
+"""
+Pooled HTTP Sessions for the Scraper
+
+Keeps one `requests.Session` per host so repeated fetches from the same site
+reuse keep-alive connections instead of paying DNS, TCP and TLS setup for
+every URL. Each session mounts an adapter with a bounded connection pool and
+retries with exponential backoff, and asks for compressed responses.
+
+`fetch_text` adds conditional requests on top: pages seen before are
+requested with `If-None-Match` / `If-Modified-Since` and served from the
+on-disk response cache when the server answers 304.
+
+Bodies are streamed and decoded incrementally. Responses whose content type is
+not in HTTP_ALLOWED_CONTENT_TYPES, or that grow past HTTP_MAX_BODY_BYTES
+(after decompression), are aborted early, so a single fetch never holds more
+than about HTTP_MAX_BODY_BYTES of page data.
+"""
+
+import codecs
+import re
+import threading
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from config import (HTTP_POOL_CONNECTIONS, HTTP_POOL_MAXSIZE, HTTP_MAX_RETRIES,
+                    HTTP_BACKOFF_FACTOR, HTTP_USER_AGENT, HTTP_TIMEOUT,
+                    HTTP_MAX_BODY_BYTES, HTTP_ALLOWED_CONTENT_TYPES, HTTP_CHUNK_SIZE,
+                    HTTP_CACHE_PATH, HTTP_CACHE_MAX_BYTES, HTTP_CACHE_MAX_AGE_DAYS)
+from response_cache import ResponseCache
+
+try:
+    import brotli  # noqa: F401  (urllib3 decodes "br" only when brotli is installed)
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# <meta charset="..."> or <meta http-equiv="Content-Type" content="...; charset=...">
+_META_CHARSET = re.compile(rb'<meta[^>]+charset=["\']?([\w.:-]+)', re.IGNORECASE)
+
+
+class ResponseTooLarge(requests.RequestException):
+    """The response body exceeded HTTP_MAX_BODY_BYTES."""
+
+
+class UnsupportedContentType(requests.RequestException):
+    """The response content type is not in HTTP_ALLOWED_CONTENT_TYPES."""
+
+_sessions: Dict[str, requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+response_cache = (ResponseCache(HTTP_CACHE_PATH, HTTP_CACHE_MAX_BYTES, HTTP_CACHE_MAX_AGE_DAYS * 86400)
+                  if HTTP_CACHE_PATH else None)
+
+
+def _create_session() -> requests.Session:
+    """Builds a session with a pooled, retrying adapter and default headers."""
+    retry = Retry(
+        total=HTTP_MAX_RETRIES,
+        backoff_factor=HTTP_BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE,
+                          max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({
+        "User-Agent": HTTP_USER_AGENT,
+        "Accept-Encoding": ACCEPT_ENCODING,
+        "Connection": "keep-alive",
+    })
+    return session
+
+
+def get_session(url: str) -> requests.Session:
+    """Returns the shared session for the URL's host, creating it on first use."""
+    host = urlsplit(url).netloc.lower()
+    with _sessions_lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = _sessions[host] = _create_session()
+        return session
+
+
+def close_sessions():
+    """Closes all pooled sessions, e.g. at the end of a crawl."""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+
+def _charset(response: requests.Response, head: bytes) -> str:
+    """Picks the body encoding: Content-Type charset, then <meta> charset, then UTF-8."""
+    content_type = response.headers.get("Content-Type", "")
+    if "charset=" in content_type.lower() and response.encoding:
+        encoding = response.encoding
+    else:
+        match = _META_CHARSET.search(head)
+        encoding = match.group(1).decode("ascii") if match else "utf-8"
+    try:
+        return codecs.lookup(encoding).name
+    except LookupError:
+        return "utf-8"
+
+
+def read_bounded_text(response: requests.Response, url: str,
+                      max_bytes: int = HTTP_MAX_BODY_BYTES) -> str:
+    """
+    Streams a response body and decodes it incrementally, enforcing the type and size limits.
+
+    Raises:
+        UnsupportedContentType: if the Content-Type is not allowed
+        ResponseTooLarge: if the declared or received body exceeds max_bytes
+    """
+    content_type = response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+    if content_type and content_type not in HTTP_ALLOWED_CONTENT_TYPES:
+        raise UnsupportedContentType(f"Unsupported content type {content_type!r} for {url}", response=response)
+
+    # Content-Length is the encoded size, a lower bound for the decoded body
+    declared = response.headers.get("Content-Length")
+    if declared and declared.isdigit() and int(declared) > max_bytes:
+        raise ResponseTooLarge(f"Response of {int(declared)} bytes exceeds the {max_bytes} byte limit for {url}",
+                               response=response)
+
+    decoder: Optional[codecs.IncrementalDecoder] = None
+    parts = []
+    received = 0
+    for chunk in response.iter_content(chunk_size=HTTP_CHUNK_SIZE):
+        received += len(chunk)
+        if received > max_bytes:
+            raise ResponseTooLarge(f"Response exceeded the {max_bytes} byte limit for {url}", response=response)
+        if decoder is None:
+            decoder = codecs.getincrementaldecoder(_charset(response, chunk))(errors="replace")
+        parts.append(decoder.decode(chunk))
+    if decoder is not None:
+        parts.append(decoder.decode(b"", final=True))
+    return "".join(parts)
+
+
+def fetch_text(url: str, timeout: float = HTTP_TIMEOUT) -> str:
+    """
+    Fetches a page as text, revalidating cached copies with a conditional GET.
+
+    Raises requests.HTTPError for error responses, like `raise_for_status`, and
+    UnsupportedContentType / ResponseTooLarge when the body is rejected.
+    """
+    cached = response_cache.get(url) if response_cache else None
+    headers = {}
+    if cached:
+        if cached.etag:
+            headers["If-None-Match"] = cached.etag
+        if cached.last_modified:
+            headers["If-Modified-Since"] = cached.last_modified
+
+    with get_session(url).get(url, headers=headers, verify=True, timeout=timeout, stream=True) as response:
+        if response.status_code == 304 and cached:
+            response_cache.mark_not_modified(url, cached)
+            return cached.text
+        response.raise_for_status()
+        text = read_bounded_text(response, url)
+
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    if response_cache and (etag or last_modified):
+        response_cache.put(url, text.encode("utf-8"), "utf-8", etag, last_modified)
+    return text
@@ -3,7 +3,8 @@
 Job Collector Script
 
 This script reads job URLs from a file (job_urls.txt) and crawls each job posting,
-extracting and storing job information in the database.
+extracting and storing job information in the database. URLs are tracked in a
+persistent crawl frontier, so an interrupted crawl can be resumed.
 
 Usage:
     python job_collector.py
@@ -14,14 +15,26 @@ with one job URL per line.
 
 import os
 import sys
+import threading
 import time
-from typing import List
+from typing import List, Optional
+
+import requests
 
 # Import existing functions
 from main import print_all_jobs
 from scraper import split_into_chunks_from_url
+from http_client import close_sessions, response_cache, ResponseTooLarge, UnsupportedContentType
+from crawler import crawl_feed
+from discovery import discover_all
+from frontier import (init_frontier, enqueue_urls, lease_urls, mark_done, mark_failed, release_leases, requeue_done,
+                      next_eligible_time, frontier_stats)
+from config import CRAWL_MAX_IDLE_WAIT, LISTING_URLS_FILE
 from rag import extract_job_info
-from database import create_job_database, save_job_to_db
+from database import (create_job_database, save_job_to_db, content_fingerprint, get_page_fingerprint, mark_page_seen,
+                      get_locations_without_coordinates, set_location_coordinates)
+from geocoding import geocode_location
+from job_transfer import export_jobs, import_jobs
 from rag import generate
 
 def summarize_job_description(description: str) -> str:
@@ -49,45 +62,65 @@ def summarize_job_description(description: str) -> str:
         # Return original description if summarization fails
         return description
 
+def process_job_url(url: str) -> bool:
+    """
+    Scrapes a job posting from URL, uses RAG to extract structured info, and stores it in the database.
+
+    Fetch and storage errors are raised so the caller can record them; returns
+    False when the page yields no job information. Pages whose normalized text
+    matches the stored fingerprint skip the LLM steps and the write.
+    """
+    print(f"Scraping job from {url}...")
+    chunks = split_into_chunks_from_url(url)
+    print(f"Extracted {len(chunks)} chunks from webpage")
+
+    fingerprint = content_fingerprint(chunks)
+    if get_page_fingerprint(url) == fingerprint:
+        mark_page_seen(url)
+        print("✓ Page unchanged since last crawl, skipping extraction")
+        return True
+
+    print("Using RAG to extract structured job information...")
+    job_data = extract_job_info(chunks)
+
+    if not job_data:
+        print("RAG extraction failed, falling back to simple parsing...")
+        from database import parse_job_chunks
+        job_data = parse_job_chunks(chunks)
+        print("Fallback parsing completed")
+
+    if job_data:
+        # Use RAG to summarize the job description if it exists
+        if 'description' in job_data and job_data['description']:
+            print("Using RAG to summarize job description...")
+            original_description = job_data['description']
+            summarized_description = summarize_job_description(original_description)
+
+            # Only update if the summary is different and valid
+            if summarized_description and summarized_description != original_description:
+                print("Job description summarized successfully!")
+                job_data['description'] = summarized_description
+            else:
+                print("Using original job description (summary not needed or failed)")
+
+        # Stored with the job so the map never geocodes at request time
+        coords = geocode_location(job_data.get('location'))
+        if coords:
+            job_data['lat'], job_data['lon'] = coords['lat'], coords['lon']
+
+        print("Storing job...")
+        save_job_to_db(url, job_data, fingerprint=fingerprint)
+        print("✓ Job stored in database successfully!")
+        return True
+    else:
+        print("✗ Failed to extract job information")
+        return False
+
 def scrape_and_store_job_with_rag(url: str):
     """Scrapes a job posting from URL, uses RAG to extract structured info, and stores it in the database."""
-    print(f"Scraping job from {url}...")
     try:
-        chunks = split_into_chunks_from_url(url)
-        print(f"Extracted {len(chunks)} chunks from webpage")
-
-        print("Using RAG to extract structured job information...")
-        job_data = extract_job_info(chunks)
-
-        if not job_data:
-            print("RAG extraction failed, falling back to simple parsing...")
-            from database import parse_job_chunks
-            job_data = parse_job_chunks(chunks)
-            print("Fallback parsing completed")
-
-        if job_data:
-            # Use RAG to summarize the job description if it exists
-            if 'description' in job_data and job_data['description']:
-                print("Using RAG to summarize job description...")
-                original_description = job_data['description']
-                summarized_description = summarize_job_description(original_description)
-
-                # Only update if the summary is different and valid
-                if summarized_description and summarized_description != original_description:
-                    print("Job description summarized successfully!")
-                    job_data['description'] = summarized_description
-                else:
-                    print("Using original job description (summary not needed or failed)")
-
-            print("Creating database and storing job...")
-            create_job_database()
-            save_job_to_db(url, job_data)
-            print("✓ Job stored in database successfully!")
-            return True
-        else:
-            print("✗ Failed to extract job information")
-            return False
-
+        create_job_database()
+        return process_job_url(url)
     except Exception as e:
         print(f"✗ Error processing job: {e}")
         return False
@@ -122,81 +155,103 @@ def read_job_urls(file_path: str = "job_urls.txt") -> List[str]:
     return urls
 
 
-def collect_jobs(urls: List[str], delay: float = 1.0) -> None:
-    """
-    Collects job information from multiple URLs, skipping already processed ones.
+def _is_permanent_error(error: Exception) -> bool:
+    """HTTP 404/410 mean the posting is gone, and rejected bodies won't change; retrying will not help."""
+    if isinstance(error, (ResponseTooLarge, UnsupportedContentType)):
+        return True
+    response = getattr(error, 'response', None)
+    return isinstance(error, requests.HTTPError) and response is not None and response.status_code in (404, 410)
 
-    Args:
-        urls: List of job URLs to process
-        delay: Delay between requests in seconds (to be respectful to servers)
-    """
-    if not urls:
-        print("No URLs to process.")
-        return
 
-    # Get already processed URLs from database
-    from database import get_all_jobs
-    try:
-        existing_jobs = get_all_jobs()
-        processed_urls = {job['url'] for job in existing_jobs}
-        print(f"Found {len(processed_urls)} already processed job(s) in database")
-    except Exception as e:
-        print(f"Warning: Could not check existing jobs in database: {e}")
-        processed_urls = set()
-
-    # Filter out already processed URLs
-    urls_to_process = []
-    skipped_urls = []
-
-    for url in urls:
-        if url in processed_urls:
-            skipped_urls.append(url)
-        else:
-            urls_to_process.append(url)
+def collect_jobs(urls: List[str], delay: float = 1.0, concurrency: Optional[int] = None) -> None:
+    """
+    Collects job information for URLs in the crawl frontier, skipping already processed ones.
 
-    if skipped_urls:
-        print(f"Skipping {len(skipped_urls)} already processed URL(s):")
-        for url in skipped_urls:
-            print(f"  ✓ {url}")
+    New URLs are added to the persistent frontier first, then one crawler runs
+    until nothing is left or only backed-off retries remain, leasing more URLs
+    whenever a worker frees up. Progress is stored per URL, so an interrupted
+    run resumes where it stopped.
 
-    if not urls_to_process:
+    Args:
+        urls: List of job URLs to add to the frontier (may be empty to resume)
+        delay: Minimum interval between requests to the same host in seconds (to be respectful to servers)
+        concurrency: Maximum URLs processed at once (defaults to CRAWL_MAX_CONCURRENCY)
+    """
+    create_job_database()
+    init_frontier()
+    if urls:
+        added = enqueue_urls(urls)
+        print(f"Added {added} new URL(s) to the crawl frontier ({len(urls) - added} already known)")
+
+    # A single collector runs at a time, so leases left by a crashed run can be reclaimed now
+    recovered = release_leases()
+    if recovered:
+        print(f"Resuming {recovered} URL(s) left in progress by a previous run")
+
+    stats = frontier_stats()
+    print(f"Frontier: {stats.get('pending', 0)} pending, {stats.get('done', 0)} done, "
+          f"{stats.get('failed', 0)} permanently failed")
+    if not stats.get('pending'):
         print("All URLs have already been processed. Nothing to do.")
         return
 
-    print(f"\nProcessing {len(urls_to_process)} new URL(s)...")
     print("-" * 50)
 
     successful = 0
     failed = 0
-
-    for i, url in enumerate(urls_to_process, 1):
-        print(f"\n[{i}/{len(urls_to_process)}] Processing: {url}")
-
-        try:
-            success = scrape_and_store_job_with_rag(url)
-            if success:
+    retrying = 0
+    counts_lock = threading.Lock()
+
+    # Called from the crawler's worker threads
+    def report(url: str, success: bool, error: Exception = None):
+        nonlocal successful, failed, retrying
+        if success:
+            mark_done(url)
+            with counts_lock:
                 successful += 1
-                print(f"✓ Successfully processed job {i}")
+            print(f"✓ Successfully processed {url}")
+            return
+        reason = str(error) if error else "No job information extracted"
+        retry = mark_failed(url, reason, permanent=error is not None and _is_permanent_error(error))
+        with counts_lock:
+            if retry:
+                retrying += 1
             else:
                 failed += 1
-                print(f"✗ Failed to process job {i}")
+        print(f"✗ Failed to process {url} ({'will retry' if retry else 'giving up'}): {reason}")
 
-        except Exception as e:
-            print(f"✗ Failed to process job {i}: {e}")
-            failed += 1
+    # Hosts are crawled concurrently; each host is limited to one request per `delay` seconds
+    limits = {}
+    if concurrency:
+        limits['max_concurrency'] = concurrency
+    limits['per_host_rate'] = 1.0 / delay if delay > 0 else 0
 
-        # Add delay between requests to be respectful
-        if i < len(urls_to_process) and delay > 0:
-            print(f"Waiting {delay} second(s) before next request...")
-            time.sleep(delay)
+    def when_idle() -> Optional[float]:
+        next_time = next_eligible_time()
+        if next_time is None:
+            return None
+        wait = next_time - time.time()
+        if wait > CRAWL_MAX_IDLE_WAIT:
+            print(f"Remaining URLs are backing off; next retry in {wait:.0f}s. Run the collector again later.")
+            return None
+        return max(wait, 0)
 
+    crawl_feed(lease_urls, process_job_url, on_result=report, when_idle=when_idle, **limits)
+
+    close_sessions()
+
+    stats = frontier_stats()
     print(f"\n{'='*50}")
     print("COLLECTION COMPLETE")
-    print(f"Total URLs processed: {len(urls_to_process)}")
     print(f"Successful: {successful}")
-    print(f"Failed: {failed}")
-    if skipped_urls:
-        print(f"Skipped (already processed): {len(skipped_urls)}")
+    print(f"Failed (gave up): {failed}")
+    print(f"Failed attempts scheduled for retry: {retrying}")
+    print(f"Frontier: {stats.get('done', 0)} done, {stats.get('pending', 0)} pending, "
+          f"{stats.get('failed', 0)} permanently failed")
+    if response_cache:
+        cache_stats = response_cache.stats()
+        print(f"Unchanged pages (304): {cache_stats['revalidated']}, "
+              f"{cache_stats['bytes_saved'] / 1024:.0f} KB not re-downloaded")
     print(f"{'='*50}")
 
 
@@ -204,6 +259,7 @@ def main():
     """Main function to run the job collector."""
     print("Job Collector Script")
     print("====================")
+    init_frontier()
 
     # Check for command line arguments
     if len(sys.argv) > 1:
@@ -212,10 +268,68 @@ def main():
             print("Viewing stored jobs...")
             print_all_jobs()
             return
+        elif command in ['--discover', '-d', 'discover']:
+            listing_urls = read_job_urls(LISTING_URLS_FILE)
+            if not listing_urls:
+                sys.exit(1)
+            print(f"Discovering new postings from {len(listing_urls)} listing page(s)...")
+            results = discover_all(listing_urls)
+            print(f"Discovered {sum(n for n in results.values() if n > 0)} new posting(s)")
+            collect_jobs([])
+            return
+        elif command in ['--recrawl', 'recrawl']:
+            days = float(sys.argv[2]) if len(sys.argv) > 2 else 7.0
+            requeued = requeue_done(days * 86400)
+            print(f"Re-queued {requeued} job(s) last crawled more than {days:g} day(s) ago")
+            collect_jobs([])
+            return
+        elif command in ['--resume', '-r', 'resume']:
+            print("Resuming crawl from the frontier...")
+            collect_jobs([])
+            return
+        elif command in ['--status', '-s', 'status']:
+            stats = frontier_stats()
+            for state in ('pending', 'in_progress', 'done', 'failed'):
+                print(f"  {state:<12} {stats.get(state, 0)}")
+            return
+        elif command in ['--geocode', 'geocode']:
+            create_job_database()
+            locations = get_locations_without_coordinates()
+            print(f"Geocoding {len(locations)} location(s)...")
+            updated = 0
+            for location in locations:
+                coords = geocode_location(location)
+                if coords:
+                    updated += set_location_coordinates(location, coords['lat'], coords['lon'])
+            print(f"Stored coordinates for {updated} job(s)")
+            return
+        elif command in ['--export', 'export', '--import', 'import']:
+            if len(sys.argv) < 3:
+                print(f"Usage: python job_collector.py {command} PATH [ndjson|csv|parquet]")
+                sys.exit(1)
+            path = sys.argv[2]
+            file_format = sys.argv[3] if len(sys.argv) > 3 else None
+            if command.lstrip('-') == 'export':
+                stats = export_jobs(path, file_format)
+                print(f"Exported {stats['rows']} job(s) to {path}")
+            else:
+                stats = import_jobs(path, file_format)
+                print(f"Imported {stats['rows']} job(s) from {path}: {stats['written']} written, "
+                      f"{stats['unchanged']} unchanged, {stats['skipped']} skipped")
+            print(f"{stats['seconds']:.2f}s, {stats['rows_per_second']:,.0f} rows/s, "
+                  f"{stats['bytes'] / 1024 / 1024:.1f} MB file")
+            return
         elif command in ['--help', '-h', 'help']:
             print("Usage:")
             print("  python job_collector.py              # Collect jobs from job_urls.txt")
+            print(f"  python job_collector.py --discover   # Find new postings from {LISTING_URLS_FILE}, then collect them")
+            print("  python job_collector.py --recrawl [DAYS]  # Re-check jobs crawled more than DAYS (default 7) ago")
+            print("  python job_collector.py --resume     # Continue pending URLs in the crawl frontier")
+            print("  python job_collector.py --status     # Show crawl frontier progress")
             print("  python job_collector.py --view       # View stored jobs")
+            print("  python job_collector.py --geocode    # Store map coordinates for jobs that have none")
+            print("  python job_collector.py --export PATH [FORMAT]  # Stream all jobs to .ndjson, .csv or .parquet")
+            print("  python job_collector.py --import PATH [FORMAT]  # Upsert jobs from an export file")
             print("  python job_collector.py --help       # Show this help")
             return
         else:
@@ -0,0 +1,104 @@
+"""
+In-process Job Snapshot
+
+Jobs only change when the collector stores them, but every listing and detail
+page used to query the table. Each worker process instead keeps an in-memory
+snapshot of all job rows, tagged with the `jobs` data version that
+`database.bump_data_version` increments on every write.
+
+The version is checked at most every JOB_SNAPSHOT_CHECK_SECONDS (a one-row
+primary key lookup); in between, requests are served from memory without
+touching SQLite. The snapshot is rebuilt once the version has moved and then
+held still for one check interval, so a crawl that saves a job every few
+seconds doesn't cause a full reload per save; while writes keep coming it is
+rebuilt at most every JOB_SNAPSHOT_REBUILD_SECONDS.
+
+The case-folded search text for substring filtering is computed once per
+rebuild rather than per request. Pages filtered by date (?days=) are read
+from SQLite, where the posted-date index serves them as a range scan, and
+ranked full-text search stays there too (search_jobs).
+"""
+
+import threading
+import time
+from bisect import bisect_right
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import JOB_SNAPSHOT_CHECK_SECONDS, JOB_SNAPSHOT_REBUILD_SECONDS
+from database import get_all_jobs, get_data_version, get_job, get_jobs_page
+
+
+class JobSnapshot:
+    """Immutable view of the jobs table at one data version, newest job first."""
+
+    def __init__(self, version: int, jobs: List[Dict[str, Any]]):
+        self.version = version
+        self.jobs = sorted(jobs, key=lambda job: job['id'], reverse=True)
+        self.by_id = {job['id']: job for job in self.jobs}
+        # Negated so the descending ids are ascending for bisect
+        self.sort_keys = [-job['id'] for job in self.jobs]
+        self.search_texts = [
+            "\n".join(job.get(field) or "" for field in ('title', 'organization', 'location', 'description')).casefold()
+            for job in self.jobs
+        ]
+        self.built_at = self.checked_at = time.monotonic()
+        # Newer version seen at the last check but not loaded yet
+        self.pending_version: Optional[int] = None
+
+    def page(self, limit: int, after_id: Optional[int] = None,
+             query: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """Same contract as database.get_jobs_page (without the date filter), answered from memory."""
+        start = bisect_right(self.sort_keys, -after_id) if after_id is not None else 0
+        needle = query.casefold() if query else None
+        jobs = []
+        for i in range(start, len(self.jobs)):
+            if needle and needle not in self.search_texts[i]:
+                continue
+            if len(jobs) == limit:
+                return jobs, jobs[-1]['id']
+            # Copies, so callers can annotate jobs without changing the snapshot
+            jobs.append(dict(self.jobs[i]))
+        return jobs, None
+
+
+_snapshots: Dict[str, JobSnapshot] = {}
+_snapshot_lock = threading.Lock()
+
+
+def get_snapshot(db_path: str = "jobs.db") -> JobSnapshot:
+    """Returns the current snapshot, rebuilding it if the jobs data version has changed and settled."""
+    snapshot = _snapshots.get(db_path)
+    if snapshot is not None and time.monotonic() - snapshot.checked_at < JOB_SNAPSHOT_CHECK_SECONDS:
+        return snapshot
+    with _snapshot_lock:
+        snapshot = _snapshots.get(db_path)
+        if snapshot is not None and time.monotonic() - snapshot.checked_at < JOB_SNAPSHOT_CHECK_SECONDS:
+            return snapshot
+        version = get_data_version("jobs", db_path)
+        now = time.monotonic()
+        if snapshot is not None:
+            current = snapshot.version == version
+            # A version not seen at the last check means writes are still coming in
+            settling = version != snapshot.pending_version and now - snapshot.built_at < JOB_SNAPSHOT_REBUILD_SECONDS
+            if current or settling:
+                snapshot.pending_version = None if current else version
+                snapshot.checked_at = now
+                return snapshot
+        # Read the version before the rows: a write in between only causes one extra rebuild later
+        snapshot = _snapshots[db_path] = JobSnapshot(version, get_all_jobs(db_path))
+        return snapshot
+
+
+def snapshot_job(job_id: int, db_path: str = "jobs.db") -> Optional[Dict[str, Any]]:
+    """Returns a copy of one job from the snapshot, or None if it doesn't exist."""
+    job = get_snapshot(db_path).by_id.get(job_id)
+    # Jobs stored since the last rebuild are looked up directly
+    return dict(job) if job else get_job(job_id, db_path)
+
+
+def snapshot_jobs_page(limit: int = 50, after_id: Optional[int] = None, query: Optional[str] = None,
+                       since: Optional[str] = None, db_path: str = "jobs.db") -> Tuple[List[Dict[str, Any]], Optional[int]]:
+    """Returns (jobs, next_cursor) for one page of the snapshot, newest first; date-filtered pages come from SQLite."""
+    if since:
+        return get_jobs_page(limit, after_id, query, since, db_path=db_path)
+    return get_snapshot(db_path).page(limit, after_id, query)
@@ -0,0 +1,141 @@
+"""
+Bulk Job Export and Import
+
+Streams the jobs table to and from NDJSON, CSV or Parquet files. Export reads
+rows with `database.iter_jobs` (fetchmany chunks) and writes them as they
+arrive; import reads the file chunk by chunk and stores each chunk with one
+`upsert_jobs` transaction, so memory use stays flat however large the table is.
+
+Imported rows go through the same normalization as crawled jobs (ISO dates,
+annualized salaries) and are matched on URL, so re-importing an export leaves
+the table unchanged and keeps existing ids.
+
+Parquet needs pyarrow; NDJSON and CSV only use the standard library.
+"""
+
+import csv
+import json
+import os
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+from config import TRANSFER_CHUNK_SIZE
+from database import JOB_COLUMNS, create_job_database, iter_jobs, upsert_jobs
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+FORMATS = {'.ndjson': 'ndjson', '.jsonl': 'ndjson', '.csv': 'csv', '.parquet': 'parquet'}
+_NUMERIC_COLUMNS = {'id', 'salary_min', 'salary_max', 'salary_annual_min', 'salary_annual_max', 'lat', 'lon'}
+
+
+def detect_format(path: str, file_format: Optional[str] = None) -> str:
+    """Returns the file format given explicitly or implied by the file extension."""
+    file_format = file_format or FORMATS.get(os.path.splitext(path)[1].lower())
+    if file_format not in ('ndjson', 'csv', 'parquet'):
+        raise ValueError(f"Unknown format for {path}; use .ndjson, .csv or .parquet")
+    if file_format == 'parquet' and pq is None:
+        raise RuntimeError("Parquet support needs pyarrow (pip install pyarrow)")
+    return file_format
+
+
+def _chunks(rows: Iterator[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _parquet_schema():
+    types = {'id': pa.int64()}
+    types.update((column, pa.float64()) for column in _NUMERIC_COLUMNS - {'id'})
+    return pa.schema([(column, types.get(column, pa.string())) for column in JOB_COLUMNS])
+
+
+def export_jobs(path: str, file_format: Optional[str] = None, db_path: str = "jobs.db",
+                chunk_size: int = TRANSFER_CHUNK_SIZE) -> Dict[str, float]:
+    """
+    Writes every job to `path`, streaming `chunk_size` rows at a time.
+
+    Returns:
+        {'rows', 'seconds', 'rows_per_second', 'bytes'}
+    """
+    file_format = detect_format(path, file_format)
+    start = time.perf_counter()
+    rows = 0
+    jobs = iter_jobs(db_path, chunk_size)
+
+    if file_format == 'parquet':
+        schema = _parquet_schema()
+        with pq.ParquetWriter(path, schema, compression='zstd') as writer:
+            for chunk in _chunks(jobs, chunk_size):
+                writer.write_table(pa.Table.from_pylist(chunk, schema=schema))
+                rows += len(chunk)
+    else:
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            if file_format == 'csv':
+                writer = csv.DictWriter(f, fieldnames=JOB_COLUMNS)
+                writer.writeheader()
+                for job in jobs:
+                    writer.writerow(job)
+                    rows += 1
+            else:
+                for job in jobs:
+                    f.write(json.dumps(job, ensure_ascii=False))
+                    f.write('\n')
+                    rows += 1
+
+    return _stats(rows, start, os.path.getsize(path))
+
+
+def _read_rows(path: str, file_format: str, chunk_size: int) -> Iterator[Dict[str, Any]]:
+    if file_format == 'parquet':
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield from batch.to_pylist()
+    elif file_format == 'csv':
+        with open(path, encoding='utf-8', newline='') as f:
+            for row in csv.DictReader(f):
+                # CSV has no nulls; empty cells were None on export
+                yield {column: (value if value != '' else None) for column, value in row.items()}
+    else:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def import_jobs(path: str, file_format: Optional[str] = None, db_path: str = "jobs.db",
+                chunk_size: int = TRANSFER_CHUNK_SIZE) -> Dict[str, float]:
+    """
+    Upserts the jobs in `path`, one transaction per `chunk_size` rows. Rows without a URL are skipped.
+
+    Returns:
+        {'rows', 'written', 'unchanged', 'skipped', 'seconds', 'rows_per_second', 'bytes'}
+    """
+    file_format = detect_format(path, file_format)
+    create_job_database(db_path)
+    start = time.perf_counter()
+    rows = written = unchanged = skipped = 0
+    for chunk in _chunks(_read_rows(path, file_format, chunk_size), chunk_size):
+        jobs = [(row['url'], row, None) for row in chunk if row.get('url')]
+        skipped += len(chunk) - len(jobs)
+        result = upsert_jobs(jobs, db_path)
+        written += result['written']
+        unchanged += result['unchanged']
+        rows += len(chunk)
+
+    stats = _stats(rows, start, os.path.getsize(path))
+    stats.update(written=written, unchanged=unchanged, skipped=skipped)
+    return stats
+
+
+def _stats(rows: int, start: float, size: int) -> Dict[str, float]:
+    seconds = time.perf_counter() - start
+    return {'rows': rows, 'seconds': seconds, 'rows_per_second': rows / seconds if seconds else 0.0, 'bytes': size}
@@ -47,19 +47,20 @@ def scrape_and_store_job(url: str):
 
 def print_all_jobs(db_path: str = "jobs.db"):
     """Prints all jobs stored in the database in a formatted way."""
-    from database import get_all_jobs
+    from database import count_jobs, iter_jobs
 
-    jobs = get_all_jobs(db_path)
+    total = count_jobs(db_path)
 
-    if not jobs:
+    if not total:
         print("No jobs found in the database.")
         return
 
     print(f"\n{'='*80}")
-    print(f"JOBS DATABASE - {len(jobs)} job(s) found")
+    print(f"JOBS DATABASE - {total} job(s) found")
     print(f"{'='*80}")
 
-    for i, job in enumerate(jobs, 1):
+    # Streamed in chunks rather than loaded into one list
+    for i, job in enumerate(iter_jobs(db_path), 1):
         print(f"\n{'─'*60}")
         print(f"Job #{i} (ID: {job['id']})")
         print(f"{'─'*60}")
@@ -1,8 +1,15 @@
 import chromadb
+import json
+import os
+import numpy as np
 from typing import List
 from sentence_transformers import SentenceTransformer, CrossEncoder
 from google import genai
 from config import EMBEDDING_MODEL_NAME, CROSS_ENCODER_MODEL_NAME, CHROMADB_COLLECTION_NAME, GEMINI_MODEL, GEMINI_API_KEY
+from config import VECTOR_INDEX, IVF_NLIST, IVF_NPROBE, IVF_PQ_M, IVF_INDEX_PATH, IVF_TRAIN_SIZE, IVF_RERANK_FACTOR
+from config import QUERY_CACHE_SIZE, QUERY_CACHE_PATH, QUERY_CACHE_FLUSH_SECONDS
+from ann_index import PersistentIVFIndex
+from embedding_cache import QueryEmbeddingCache
 
 # Initialize models and clients
 embedding_model = SentenceTransformer(EMBEDDING_MODEL_NAME)
@@ -10,14 +17,37 @@ cross_encoder = CrossEncoder(CROSS_ENCODER_MODEL_NAME)
 chromadb_client = chromadb.EphemeralClient()
 chromadb_collection = chromadb_client.get_or_create_collection(name=CHROMADB_COLLECTION_NAME)
 google_client = genai.Client()
+query_embedding_cache = QueryEmbeddingCache(maxsize=QUERY_CACHE_SIZE, persist_path=QUERY_CACHE_PATH,
+                                            flush_interval=QUERY_CACHE_FLUSH_SECONDS)
+
+# Approximate index used instead of ChromaDB when VECTOR_INDEX == "ivf"; chunk texts are
+# appended one JSON string per line to IVF_DOCS_PATH, so line number == vector id
+IVF_DOCS_PATH = IVF_INDEX_PATH + ".docs.jsonl"
+ivf_index = None
+ivf_documents: List[str] = []
+if VECTOR_INDEX == "ivf":
+    ivf_index = PersistentIVFIndex(IVF_INDEX_PATH, max_nlist=IVF_NLIST, pq_m=IVF_PQ_M, nprobe=IVF_NPROBE,
+                                   train_size=IVF_TRAIN_SIZE, rerank_factor=IVF_RERANK_FACTOR)
+    if os.path.exists(IVF_DOCS_PATH):
+        with open(IVF_DOCS_PATH, 'r', encoding='utf-8') as file:
+            ivf_documents = [json.loads(line) for line in file if line.strip()]
+    if len(ivf_documents) != ivf_index.ntotal:
+        print(f"Warning: IVF index has {ivf_index.ntotal} vectors but {len(ivf_documents)} chunk texts")
 
 def embed_chunk(chunk: str) -> List[float]:
     """Generates a normalized embedding for a given text chunk."""
     embedding = embedding_model.encode(chunk, normalize_embeddings=True)
     return embedding.tolist()
 
+def embed_query(query: str) -> np.ndarray:
+    """Embeds a search query, serving repeated queries from the LRU cache (read-only float32 array)."""
+    return query_embedding_cache.get_or_compute(query, EMBEDDING_MODEL_NAME, embed_chunk)
+
 def save_embeddings(chunks: List[str], embeddings: List[List[float]]) -> None:
-    """Stores chunks and their corresponding embeddings into ChromaDB."""
+    """Stores chunks and their corresponding embeddings into ChromaDB (or the IVF index)."""
+    if VECTOR_INDEX == "ivf":
+        save_embeddings_ivf(chunks, embeddings)
+        return
     for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
         chromadb_collection.add(
             documents=[chunk],
@@ -25,9 +55,28 @@ def save_embeddings(chunks: List[str], embeddings: List[List[float]]) -> None:
             ids=[str(i)]
         )
 
+def save_embeddings_ivf(chunks: List[str], embeddings: List[List[float]]) -> None:
+    """
+    Appends chunks to the IVF index and to IVF_DOCS_PATH.
+
+    Both are append-only, so saving a batch doesn't rewrite the existing
+    collection; the index retrains itself when the collection has grown
+    enough (see ann_index.PersistentIVFIndex).
+    """
+    if not chunks:
+        return
+    ivf_index.add(np.asarray(embeddings, dtype=np.float32))
+    with open(IVF_DOCS_PATH, 'a', encoding='utf-8') as file:
+        for chunk in chunks:
+            file.write(json.dumps(chunk, ensure_ascii=False) + "\n")
+    ivf_documents.extend(chunks)
+
 def retrieve(query: str, top_k: int) -> List[str]:
     """Retrieves the most similar chunks from the vector database."""
-    query_embedding = embed_chunk(query)
+    query_embedding = embed_query(query)
+    if VECTOR_INDEX == "ivf":
+        _, ids = ivf_index.search(np.asarray([query_embedding], dtype=np.float32), top_k)
+        return [ivf_documents[i] for i in ids[0] if 0 <= i < len(ivf_documents)]
     results = chromadb_collection.query(
         query_embeddings=[query_embedding],
         n_results=top_k
@@ -89,6 +138,7 @@ Please extract the following information and format your response as a JSON-like
 - location: Where the job is located
 - salary_min: Minimum salary (just the number, no currency symbols)
 - salary_max: Maximum salary (just the number, no currency symbols)
+- salary_text: The salary exactly as written, including currency and period (e.g. "£35,000 to £45,000 per annum")
 - hours: Full time, part time, etc.
 - contract_type: Permanent, contract, temporary, etc.
 - placed_on: When the job was posted
@@ -106,6 +156,7 @@ Example format:
     "location": "Cambridge",
     "salary_min": 35000,
     "salary_max": 45000,
+    "salary_text": "£35,000 to £45,000 per annum",
     "hours": "Full Time",
     "contract_type": "Fixed Term",
     "placed_on": "1st January 2024",
@@ -0,0 +1,149 @@
+"""
+On-disk HTTP Response Cache for Re-crawls
+
+Stores the body, `ETag` and `Last-Modified` of each fetched page in a SQLite
+file so that later crawls can send conditional requests. When the server
+answers `304 Not Modified` the cached body is used and only headers cross the
+network. Bodies are zlib-compressed; the cache is bounded by total stored
+bytes (least recently validated entries are evicted first) and by entry age.
+
+Crawler workers share the pooled per-thread connections of the db module
+(WAL, so lookups don't wait for writes) instead of opening a connection per
+call under one lock. The stored byte total is kept in memory, so a put only
+starts eviction once the cache is over its limit, and then trims it to 90%
+of the limit so the next eviction is many puts away; expired entries are
+swept through the stored_at index every EXPIRE_EVERY puts.
+"""
+
+import threading
+import time
+import zlib
+from typing import Dict, NamedTuple, Optional
+
+from db import get_connection, transaction
+
+RESPONSE_CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS http_responses (
+    url TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    encoding TEXT,
+    body BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    stored_at REAL NOT NULL,
+    validated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_http_responses_validated_at ON http_responses (validated_at);
+CREATE INDEX IF NOT EXISTS idx_http_responses_stored_at ON http_responses (stored_at);
+"""
+
+# Puts between sweeps of expired entries
+EXPIRE_EVERY = 256
+# Eviction trims the cache to this fraction of max_bytes
+EVICT_TO = 0.9
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    encoding: Optional[str]
+    etag: Optional[str]
+    last_modified: Optional[str]
+
+    @property
+    def text(self) -> str:
+        return self.body.decode(self.encoding or 'utf-8', errors='replace')
+
+
+class ResponseCache:
+    """SQLite-backed store of validators and bodies keyed by URL."""
+
+    def __init__(self, path: str, max_bytes: int, max_age_seconds: float):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.revalidated = 0  # 304 responses served from the cache
+        self.bytes_saved = 0  # uncompressed bytes not re-downloaded
+        self._lock = threading.Lock()
+        self._puts = 0
+        conn = get_connection(path)
+        conn.executescript(RESPONSE_CACHE_SCHEMA)
+        self._total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM http_responses").fetchone()[0]
+
+    def get(self, url: str) -> Optional[CachedResponse]:
+        """Returns the cached response for a URL unless it is missing or older than the age limit."""
+        row = get_connection(self.path).execute(
+            "SELECT body, encoding, etag, last_modified, stored_at, size FROM http_responses WHERE url = ?",
+            (url,)
+        ).fetchone()
+        if row and time.time() - row[4] > self.max_age_seconds:
+            with transaction(self.path) as conn:
+                deleted = conn.execute("DELETE FROM http_responses WHERE url = ? AND stored_at = ?",
+                                       (url, row[4])).rowcount
+            if deleted:
+                with self._lock:
+                    self._total -= row[5]
+            row = None
+        if not row:
+            return None
+        return CachedResponse(zlib.decompress(row[0]), row[1], row[2], row[3])
+
+    def put(self, url: str, body: bytes, encoding: Optional[str], etag: Optional[str], last_modified: Optional[str]):
+        """Stores a full response and evicts old entries if the size limit is exceeded."""
+        compressed = zlib.compress(body)
+        if len(compressed) > self.max_bytes:
+            return
+        now = time.time()
+        with transaction(self.path) as conn:
+            old = conn.execute("SELECT size FROM http_responses WHERE url = ?", (url,)).fetchone()
+            conn.execute("""
+                INSERT OR REPLACE INTO http_responses
+                (url, etag, last_modified, encoding, body, size, stored_at, validated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (url, etag, last_modified, encoding, compressed, len(compressed), now, now))
+        with self._lock:
+            self._total += len(compressed) - (old[0] if old else 0)
+            self._puts += 1
+            over = self._total > self.max_bytes
+            sweep = self._puts % EXPIRE_EVERY == 0
+        if over or sweep:
+            self._evict(over)
+
+    def mark_not_modified(self, url: str, cached: CachedResponse):
+        """Records a 304 for a URL: refreshes its timestamps and counts the bytes saved."""
+        now = time.time()
+        with transaction(self.path) as conn:
+            conn.execute("UPDATE http_responses SET stored_at = ?, validated_at = ? WHERE url = ?", (now, now, url))
+        with self._lock:
+            self.revalidated += 1
+            self.bytes_saved += len(cached.body)
+
+    def _evict(self, over_limit: bool):
+        """Drops expired entries, then (if over max_bytes) the least recently validated ones down to EVICT_TO."""
+        with transaction(self.path) as conn:
+            cutoff = time.time() - self.max_age_seconds
+            # Both the sum and the delete are range scans of the stored_at index
+            expired = conn.execute("SELECT COALESCE(SUM(size), 0) FROM http_responses WHERE stored_at < ?",
+                                   (cutoff,)).fetchone()[0]
+            conn.execute("DELETE FROM http_responses WHERE stored_at < ?", (cutoff,))
+            if over_limit:
+                # Other processes may share the file, so resynchronize before deciding how much to drop
+                total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM http_responses").fetchone()[0]
+                excess = total - int(self.max_bytes * EVICT_TO)
+                freed = 0
+                victims = []
+                if excess > 0:
+                    for url, size in conn.execute("SELECT url, size FROM http_responses ORDER BY validated_at"):
+                        victims.append((url,))
+                        freed += size
+                        if freed >= excess:
+                            break
+                conn.executemany("DELETE FROM http_responses WHERE url = ?", victims)
+        with self._lock:
+            if over_limit:
+                self._total = total - freed
+            else:
+                self._total -= expired
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'revalidated': self.revalidated, 'bytes_saved': self.bytes_saved}
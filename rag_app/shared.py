@@ -0,0 +1,31 @@
+"""
+Modules Shared with the Root Web App
+
+db.py, visitor_log.py and visitor_retention.py live at the repository root
+and serve both apps. rag_app keeps a stub of the same name for each, which
+calls `load_root_module(__name__)`: the root file is executed and registered
+under that name, so rag_app's bare imports (`from db import transaction`)
+get the one implementation, reading their settings from rag_app's config.py.
+"""
+
+import importlib.util
+import os
+import runpy
+import sys
+from types import ModuleType
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_root_module(name: str) -> ModuleType:
+    """Executes ROOT_DIR/<name>.py and installs it as sys.modules[name], replacing the importing stub."""
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT_DIR, f"{name}.py"))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def run_root_script(name: str):
+    """Runs ROOT_DIR/<name>.py as __main__, for stubs started from the command line."""
+    runpy.run_path(os.path.join(ROOT_DIR, f"{name}.py"), run_name="__main__")
@@ -0,0 +1,10 @@
+"""
+Write-behind Visitor Logging
+
+The implementation is visitor_log.py at the repository root, shared with the
+root web app (see shared.py).
+"""
+
+from shared import load_root_module
+
+load_root_module("visitor_log")
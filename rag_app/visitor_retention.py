@@ -0,0 +1,14 @@
+"""
+Visitor Log Retention and Rollups
+
+The implementation is visitor_retention.py at the repository root, shared
+with the root web app (see shared.py). `python visitor_retention.py [db_path]`
+works from here as well.
+"""
+
+from shared import load_root_module, run_root_script
+
+if __name__ == "__main__":
+    run_root_script("visitor_retention")
+else:
+    load_root_module("visitor_retention")
@@ -0,0 +1,38 @@
+import os
+import sys
+from contextlib import contextmanager
+
+import pytest
+
+RAG_APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'rag_app')
+# Modules that exist both at the repository root and in rag_app/ (rag_app's db.py loads the root one)
+SHADOWED_MODULES = ('app', 'auth', 'config')
+# rag_app's http_client opens the crawler's response cache at import; keep it out of the working tree
+os.environ.setdefault('HTTP_CACHE_PATH', '')
+
+
+@contextmanager
+def rag_app_imports():
+    """
+    Imports rag_app modules, which import each other by bare name, without
+    replacing the root app's modules of the same name for the other tests.
+    """
+    saved = {name: sys.modules.pop(name) for name in SHADOWED_MODULES if name in sys.modules}
+    sys.path.insert(0, RAG_APP_DIR)
+    try:
+        yield
+    finally:
+        sys.path.remove(RAG_APP_DIR)
+        for name in SHADOWED_MODULES:
+            sys.modules.pop(name, None)
+        sys.modules.update(saved)
+
+
+@pytest.fixture
+def jobs_db(tmp_path):
+    """Path to a new jobs database with the full rag_app schema."""
+    with rag_app_imports():
+        from database import create_job_database
+    path = str(tmp_path / 'jobs.db')
+    create_job_database(path)
+    return path
@@ -0,0 +1,65 @@
+import numpy as np
+
+from conftest import rag_app_imports
+
+with rag_app_imports():
+    from ann_index import IVFIndex, PersistentIVFIndex
+
+
+def make_vectors(n, dim=32, clusters=64, seed=0):
+    """Normalized vectors drawn around random cluster centres."""
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = centres[rng.integers(0, clusters, n)] + 0.5 * rng.standard_normal((n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def exact_top_k(vectors, queries, k):
+    return np.argsort(-(queries @ vectors.T), axis=1)[:, :k]
+
+
+def recall(found, truth):
+    return sum(len(set(f) & set(t)) for f, t in zip(found, truth)) / truth.size
+
+
+def test_ivf_recall_against_brute_force():
+    """Flat IVF and re-ranked IVF-PQ find nearly all exact neighbours when probing a quarter of the lists."""
+    vectors = make_vectors(5100)
+    vectors, queries = vectors[:5000], vectors[5000:]
+    truth = exact_top_k(vectors, queries, 10)
+
+    flat = IVFIndex(32, nlist=32)
+    flat.train(vectors)
+    flat.add(vectors)
+    assert recall(flat.search(queries, 10, nprobe=8)[1], truth) >= 0.9
+
+    pq = IVFIndex(32, nlist=32, pq_m=8)
+    pq.train(vectors)
+    pq.add(vectors)
+    approximate = recall(pq.search(queries, 10, nprobe=8)[1], truth)
+    reranked = recall(pq.search(queries, 10, nprobe=8, rerank_vectors=vectors)[1], truth)
+    assert reranked >= 0.9 and reranked > approximate
+
+
+def test_ivf_small_first_batch(tmp_path):
+    """A tiny first batch still trains (with fewer lists); the collection retrains as it grows and reloads."""
+    vectors = make_vectors(3000)
+    index = IVFIndex(32, nlist=1024, pq_m=8)
+    index.train(vectors[:5])
+    index.add(vectors[:5])
+    assert index.nlist == 5
+    assert set(index.search(vectors[:1], 3)[1][0]) <= set(range(5))
+
+    path = str(tmp_path / 'chunks.ivf.npz')
+    collection = PersistentIVFIndex(path, max_nlist=64, pq_m=8, nprobe=64)
+    collection.add(vectors[:5])
+    assert (collection.index.nlist, collection.index.pq_m) == (1, 0)
+    for start in range(5, 3000, 500):
+        collection.add(vectors[start:start + 500])
+    assert collection.ntotal == 3000
+    assert collection.index.pq_m == 8 and collection.index.nlist >= 32
+
+    reloaded = PersistentIVFIndex(path, max_nlist=64, pq_m=8, nprobe=64)
+    assert reloaded.ntotal == 3000 and reloaded.index.ntotal == 3000
+    truth = exact_top_k(vectors, vectors[:20], 5)
+    assert recall(reloaded.search(vectors[:20], 5)[1], truth) == 1.0
@@ -91,5 +91,77 @@ def test_database_functionality():
     assert user_agent == 'test-agent'
 
 
+def test_database_connection_reuse():
+    """Connections are reused per thread and run in WAL mode."""
+    from db import get_connection
+    init_db()
+    conn = get_connection('visitors.db')
+    assert get_connection('visitors.db') is conn
+    assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+
+
+@pytest.fixture
+def visitors_db(tmp_path):
+    """Path to a new database with an empty visitors table."""
+    from db import transaction
+    db_path = str(tmp_path / 'visitors.db')
+    with transaction(db_path) as conn:
+        conn.execute('CREATE TABLE visitors (id INTEGER PRIMARY KEY, ip_address TEXT, timestamp TEXT, user_agent TEXT, user_id INTEGER, path TEXT)')
+    return db_path
+
+
+def test_visitor_logging_is_write_behind(visitors_db):
+    """Visitor events are queued, written in batches, and shed when the queue is full."""
+    from db import get_connection
+    from visitor_log import VisitorLogWriter
+    db_path = visitors_db
+    writer = VisitorLogWriter(db_path, queue_size=1000, batch_size=100, retention_interval=0)
+    for i in range(250):
+        assert writer.log(f'10.0.0.{i % 256}', '2024-01-01T00:00:00', 'test-agent', None)
+    assert writer.flush()
+    count = get_connection(db_path).execute('SELECT COUNT(*) FROM visitors').fetchone()[0]
+    assert count == 250 and writer.written == 250
+
+    # Hold the write lock so the writer thread blocks on its first batch and the queue fills up
+    blocker = sqlite3.connect(db_path, isolation_level=None)
+    blocker.execute('BEGIN IMMEDIATE')
+    full = VisitorLogWriter(db_path, queue_size=1, retention_interval=0)
+    accepted = sum(full.log(f'10.0.1.{i}', '2024-01-01T00:00:00', None, None) for i in range(5))
+    blocker.execute('ROLLBACK')
+    blocker.close()
+    assert full.flush()
+    assert accepted <= 2 and full.dropped == 5 - accepted and full.written == accepted
+    full.stop()
+    writer.stop()
+
+
+def test_visitor_retention_rolls_up_old_visits(visitors_db):
+    """Visits past the retention window become hourly/daily counts and the raw rows are pruned."""
+    from db import get_connection, transaction
+    from visitor_retention import init_visitor_retention, apply_retention
+    db_path = visitors_db
+    with transaction(db_path) as conn:
+        conn.executemany('INSERT INTO visitors (ip_address, timestamp, path) VALUES (?, ?, ?)', [
+            ('10.0.0.1', '2000-01-01T10:15:00', '/'),
+            ('10.0.0.1', '2000-01-01T10:45:00', '/health'),
+            ('10.0.0.2', '2000-01-01T11:00:00', '/'),
+            ('10.0.0.3', '2999-01-01T00:00:00', '/'),
+        ])
+    init_visitor_retention(db_path)
+    # Startup never runs the full VACUUM; only an explicit conversion does
+    assert get_connection(db_path).execute('PRAGMA auto_vacuum').fetchone()[0] == 0
+    init_visitor_retention(db_path, convert=True)
+
+    result = apply_retention(db_path, raw_days=30, hourly_days=365 * 100)
+    conn = get_connection(db_path)
+    assert result['rolled_up'] == 3
+    assert conn.execute('SELECT COUNT(*) FROM visitors').fetchone()[0] == 1
+    rollups = {row[:4]: row[4] for row in conn.execute('SELECT period, bucket, dimension, value, visits FROM visitor_rollups')}
+    assert rollups[('day', '2000-01-01', 'path', '/')] == 2
+    assert rollups[('hour', '2000-01-01T10', 'ip', '10.0.0.1')] == 2
+    assert rollups[('day', '2000-01-01', 'user', 'guest')] == 3
+    assert conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2
+
+
 if __name__ == '__main__':
     pytest.main()
@@ -0,0 +1,72 @@
+import threading
+import time
+from collections import Counter
+
+from conftest import rag_app_imports
+
+with rag_app_imports():
+    from crawler import crawl, crawl_feed
+
+
+class FakeHandler:
+    """Sleeps like a fetch and records how many URLs of each host run at once."""
+
+    def __init__(self, seconds=0.05):
+        self.seconds = seconds
+        self.lock = threading.Lock()
+        self.running = Counter()
+        self.peak = Counter()
+        self.peak_total = 0
+        self.started = {}
+
+    def __call__(self, url):
+        host = url.split('/')[2]
+        with self.lock:
+            self.started[url] = time.monotonic()
+            self.running[host] += 1
+            self.peak[host] = max(self.peak[host], self.running[host])
+            self.peak_total = max(self.peak_total, sum(self.running.values()))
+        time.sleep(self.seconds)
+        with self.lock:
+            self.running[host] -= 1
+        return not url.endswith('/fail')
+
+
+def test_per_host_and_global_concurrency():
+    """No host has more than per_host_concurrency URLs in flight, and no more than max_concurrency overall."""
+    handler = FakeHandler()
+    urls = [f'https://{host}.example/job/{i}' for host in 'abcd' for i in range(6)]
+    results = crawl(urls, handler, max_concurrency=6, per_host_concurrency=2, per_host_rate=0)
+    assert all(results.values()) and len(results) == 24
+    assert max(handler.peak.values()) == 2
+    assert handler.peak_total <= 6
+
+
+def test_per_host_rate_limit_does_not_hold_back_other_hosts():
+    """Requests to one host are spaced by its token bucket while other hosts start at once."""
+    handler = FakeHandler(seconds=0)
+    same_host = [f'https://a.example/job/{i}' for i in range(5)]
+    other_hosts = [f'https://{host}.example/job/0' for host in 'bcdef']
+    start = time.monotonic()
+    crawl(same_host + other_hosts, handler, per_host_rate=20, per_host_burst=1)
+
+    assert max(handler.started[url] for url in same_host) - start >= 4 / 20 * 0.9
+    assert max(handler.started[url] for url in other_hosts) - start < 0.1
+
+
+def test_feed_reports_results_off_the_event_loop():
+    """run_feed drains the source, and on_result runs on worker threads rather than the loop's thread."""
+    batches = [[f'https://a.example/job/{i}' for i in range(3)], ['https://b.example/fail']]
+    reported = {}
+    threads = set()
+
+    def source(limit):
+        return batches.pop(0) if batches else []
+
+    def on_result(url, success, error):
+        threads.add(threading.current_thread().name)
+        reported[url] = success
+
+    assert crawl_feed(source, FakeHandler(0.01), on_result=on_result, per_host_rate=0) == 4
+    assert reported == {**{f'https://a.example/job/{i}': True for i in range(3)}, 'https://b.example/fail': False}
+    assert threading.main_thread().name not in threads
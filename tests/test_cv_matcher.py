@@ -0,0 +1,38 @@
+import threading
+import time
+
+from conftest import rag_app_imports
+
+with rag_app_imports():
+    import cv_matcher
+
+
+def test_refreshes_share_a_bounded_pool_and_dedupe_per_user(monkeypatch):
+    """Many users refresh on at most CV_MATCH_WORKERS threads; repeat requests for a running user coalesce into one rerun."""
+    monkeypatch.setattr(cv_matcher, '_refresh_pool', None)
+    monkeypatch.setattr(cv_matcher, 'CV_MATCH_WORKERS', 2)
+    release = threading.Event()
+    lock = threading.Lock()
+    calls, threads = [], set()
+
+    def fake_refresh(user_id, db_path):
+        with lock:
+            calls.append(user_id)
+            threads.add(threading.current_thread().name)
+        release.wait(5)
+
+    monkeypatch.setattr(cv_matcher, 'refresh_user_matches', fake_refresh)
+    db_path = 'unused.db'
+    for user_id in range(6):
+        assert cv_matcher.schedule_refresh(user_id, db_path)
+    assert not cv_matcher.schedule_refresh(0, db_path)  # already queued or running: marked for one rerun
+    assert not cv_matcher.schedule_refresh(0, db_path)
+    time.sleep(0.1)
+    assert len(calls) == 2
+    release.set()
+
+    deadline = time.time() + 5
+    while any(key[0] == db_path for key in cv_matcher._refreshing) and time.time() < deadline:
+        time.sleep(0.01)
+    assert sorted(calls) == [0, 0, 1, 2, 3, 4, 5]
+    assert len(threads) == 2 and all(name.startswith('cv-match') for name in threads)
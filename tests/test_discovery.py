@@ -0,0 +1,47 @@
+from conftest import rag_app_imports
+
+with rag_app_imports():
+    import discovery
+
+LISTING = 'https://example.com/jobs'
+
+
+def serve_listing(monkeypatch, postings, per_page=2):
+    """Serves `postings` (newest first) as a paged listing and returns the list of fetched page URLs."""
+    fetched = []
+
+    def fetch_text(url):
+        fetched.append(url)
+        page = int(url.partition('?page=')[2] or 1)
+        links = ''.join(f'<a href="/job/{posting}">{posting}</a>'
+                        for posting in postings[(page - 1) * per_page:page * per_page])
+        if page * per_page < len(postings):
+            links += f'<a rel="next" href="{LISTING}?page={page + 1}">Next</a>'
+        return f'<html><body>{links}</body></html>'
+
+    monkeypatch.setattr(discovery, 'fetch_text', fetch_text)
+    monkeypatch.setattr(discovery, 'DISCOVERY_PAGE_DELAY', 0)
+    return fetched
+
+
+def test_capped_walk_resumes_and_later_runs_stop_at_the_marker(monkeypatch, jobs_db):
+    postings = ['p5', 'p4', 'p3', 'p2', 'p1']
+    fetched = serve_listing(monkeypatch, postings)
+    found = discovery.discover_listing(LISTING, max_pages=2, db_path=jobs_db)
+    assert [url.rsplit('/', 1)[1] for url in found] == ['p5', 'p4', 'p3', 'p2']
+
+    # Nothing new at the top: one page to see that, then continue where the cap stopped
+    fetched.clear()
+    found = discovery.discover_listing(LISTING, max_pages=3, db_path=jobs_db)
+    assert [url.rsplit('/', 1)[1] for url in found] == ['p1']
+    assert fetched == [LISTING, f'{LISTING}?page=3']
+
+    # A new posting pushes the marker down the first page; the walk ends there
+    postings.insert(0, 'p6')
+    fetched.clear()
+    found = discovery.discover_listing(LISTING, max_pages=3, db_path=jobs_db)
+    assert [url.rsplit('/', 1)[1] for url in found] == ['p6']
+    assert fetched == [LISTING]
+    newest, resume_url = discovery.get_connection(jobs_db).execute(
+        "SELECT newest_url, resume_url FROM listing_state WHERE listing_url = ?", (LISTING,)).fetchone()
+    assert newest.endswith('/job/p6') and resume_url is None
@@ -0,0 +1,40 @@
+import sqlite3
+
+import numpy as np
+import pytest
+
+from conftest import rag_app_imports
+
+with rag_app_imports():
+    from embedding_cache import QueryEmbeddingCache
+
+
+def test_query_cache_persists_recency_of_hits(tmp_path):
+    """Hits update the stored last-used time on flush, so reloads and eviction follow real LRU order."""
+    path = str(tmp_path / 'query_cache.db')
+    cache = QueryEmbeddingCache(maxsize=2, persist_path=path, flush_interval=3600)
+    compute = lambda text: [float(len(text))]
+    cache.get_or_compute('first', 'model', compute)
+    cache.get_or_compute('second', 'model', compute)
+    cache.flush()
+    cache.get_or_compute('first', 'model', compute)  # hit: 'second' is now least recently used
+    cache.get_or_compute('third', 'model', compute)
+    assert sqlite3.connect(path).execute('SELECT COUNT(*) FROM query_embeddings').fetchone()[0] == 2  # nothing written yet
+    cache.flush()
+
+    stored = {row[0] for row in sqlite3.connect(path).execute('SELECT query FROM query_embeddings')}
+    assert stored == {'first', 'third'}
+    reloaded = QueryEmbeddingCache(maxsize=2, persist_path=path)
+    assert reloaded.get_or_compute('first', 'model', lambda text: []).tolist() == [5.0]
+    assert reloaded.stats()['hits'] == 1
+
+
+def test_cached_vectors_are_read_only_float32():
+    """Every caller gets the same compact vector, and none of them can change it for the others."""
+    cache = QueryEmbeddingCache(maxsize=2)
+    first = cache.get_or_compute('query', 'model', lambda text: [0.5, 0.25])
+    again = cache.get_or_compute(' query ', 'model', lambda text: [])
+    assert first.dtype == np.float32 and again is first
+    with pytest.raises(ValueError):
+        first[0] = 1.0
+    assert cache.get_or_compute('query', 'model', lambda text: []).tolist() == [0.5, 0.25]
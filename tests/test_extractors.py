@@ -0,0 +1,48 @@
+from conftest import rag_app_imports
+
+with rag_app_imports():
+    import extractors
+    from extractors import DEFAULT_EXTRACTOR, SiteExtractor, get_extractor, register_extractor
+
+PAGE = """<html><head><title>Backend Engineer</title></head><body>
+<nav>Home | Jobs | Sign in</nav>
+<div class="job-detail wide"><h1>Backend Engineer</h1>
+<p>Build the search API.</p>
+<div class="cookie-banner">We use cookies</div>
+<p>Accept the challenge</p></div>
+<footer>Privacy</footer></body></html>"""
+
+
+def test_only_the_content_subtree_is_extracted():
+    """The first matching selector wins and noise elements and lines are removed from its text."""
+    extractor = SiteExtractor(hosts=[], selectors=[('article', {}), ('div', {'class': 'job-detail'})],
+                              noise_classes=['cookie'])
+    text = extractor.extract_text(PAGE)
+    assert 'Build the search API.' in text
+    assert 'Sign in' not in text and 'We use cookies' not in text
+    assert extractor.clean_lines(text) == ['Backend Engineer', 'Build the search API.']
+
+
+def test_selectors_absent_from_the_page_are_never_parsed(monkeypatch):
+    """Pages without a selector's tag or attribute value skip that parse and fall back to the whole page."""
+    parsed = []
+    real = extractors.BeautifulSoup
+    monkeypatch.setattr(extractors, 'BeautifulSoup', lambda *args, **kwargs: parsed.append(kwargs) or real(*args, **kwargs))
+    extractor = SiteExtractor(hosts=[], selectors=[('article', {}), ('div', {'class': 'vacancy'})])
+    text = extractor.extract_text(PAGE)
+    assert 'Sign in' in text
+    assert parsed == [{}]  # just the whole-page fallback
+
+
+def test_registry_dispatches_on_the_closest_registered_domain(monkeypatch):
+    monkeypatch.setattr(extractors, '_registry', dict(extractors._registry))
+    site = SiteExtractor(hosts=['Example.com'], selectors=[('main', {})])
+    jobs = SiteExtractor(hosts=['jobs.example.com'], selectors=[('main', {})])
+    register_extractor(site)
+    register_extractor(jobs)
+
+    assert get_extractor('https://jobs.example.com/vacancy/1') is jobs
+    assert get_extractor('https://www.JOBS.example.com:8443/vacancy/1') is jobs
+    assert get_extractor('https://careers.example.com/') is site
+    assert get_extractor('https://example.org/') is DEFAULT_EXTRACTOR
+    assert get_extractor('not a url') is DEFAULT_EXTRACTOR
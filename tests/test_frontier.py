@@ -0,0 +1,79 @@
+import time
+
+import pytest
+
+from conftest import rag_app_imports
+
+with rag_app_imports():
+    from database import create_job_database, save_job_to_db
+    from db import get_connection, transaction
+    from frontier import (enqueue_urls, init_frontier, lease_urls, mark_done, mark_failed, next_eligible_time,
+                          requeue_done)
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / 'jobs.db')
+    create_job_database(path)
+    init_frontier(path)
+    return path
+
+
+def state(url, db_path):
+    return get_connection(db_path).execute("SELECT state FROM crawl_frontier WHERE url = ?", (url,)).fetchone()[0]
+
+
+def test_enqueue_marks_only_new_stored_urls_done(db_path):
+    """URLs already stored start out done, but a re-queued URL stays pending when it is enqueued again."""
+    url = 'https://a.example/job/1'
+    save_job_to_db(url, {'title': 'Stored'}, db_path)
+    assert enqueue_urls([url, 'https://a.example/job/2'], db_path=db_path) == 2
+    assert state(url, db_path) == 'done'
+
+    assert requeue_done(0, db_path=db_path) == 1
+    assert enqueue_urls([url], db_path=db_path) == 0
+    assert state(url, db_path) == 'pending'
+
+
+def test_lease_round_robin_with_per_host_cap(db_path):
+    """Leases alternate between hosts and stop at the per-host cap until leases complete."""
+    enqueue_urls([f'https://a.example/job/{i}' for i in range(5)], db_path=db_path)
+    enqueue_urls([f'https://b.example/job/{i}' for i in range(5)], db_path=db_path)
+
+    first = lease_urls(4, per_host=3, db_path=db_path)
+    assert sorted(url.split('/')[2] for url in first) == ['a.example', 'a.example', 'b.example', 'b.example']
+    second = lease_urls(10, per_host=3, db_path=db_path)
+    assert len(second) == 2 and not set(first) & set(second)
+    assert lease_urls(10, per_host=3, db_path=db_path) == []
+
+    mark_done(second[0], db_path=db_path)
+    assert [url.split('/')[2] for url in lease_urls(10, per_host=3, db_path=db_path)] == [second[0].split('/')[2]]
+
+
+def test_failed_urls_back_off_before_retry(db_path):
+    """A failed URL is pending again but not leased until its backoff time has passed."""
+    url = 'https://a.example/job/1'
+    enqueue_urls([url], db_path=db_path)
+    assert lease_urls(1, db_path=db_path) == [url]
+    assert mark_failed(url, 'timeout', db_path=db_path)
+    assert state(url, db_path) == 'pending'
+    assert lease_urls(1, db_path=db_path) == []
+    assert next_eligible_time(db_path) > time.time()
+
+    with transaction(db_path) as conn:
+        conn.execute("UPDATE crawl_frontier SET next_eligible_at = 0")
+    assert lease_urls(1, db_path=db_path) == [url]
+    assert not mark_failed(url, 'gone', permanent=True, db_path=db_path)
+    assert state(url, db_path) == 'failed'
+
+
+def test_expired_lease_is_leased_again(db_path):
+    """A URL whose worker never finished becomes eligible when its lease runs out."""
+    url = 'https://a.example/job/1'
+    enqueue_urls([url], db_path=db_path)
+    assert lease_urls(1, lease_seconds=3600, db_path=db_path) == [url]
+    assert lease_urls(1, db_path=db_path) == []
+
+    with transaction(db_path) as conn:
+        conn.execute("UPDATE crawl_frontier SET leased_until = ?", (time.time() - 1,))
+    assert lease_urls(1, db_path=db_path) == [url]
@@ -0,0 +1,63 @@
+import io
+
+import pytest
+import requests
+
+from conftest import rag_app_imports
+
+with rag_app_imports():
+    import http_client
+    from http_client import ResponseTooLarge, UnsupportedContentType, read_bounded_text
+    from config import HTTP_MAX_RETRIES, HTTP_POOL_MAXSIZE
+
+
+def test_sessions_are_pooled_per_host():
+    """Fetches from one host share a session and its keep-alive pool; other hosts get their own."""
+    http_client.close_sessions()
+    try:
+        first = http_client.get_session('https://jobs.example.com/a')
+        assert http_client.get_session('https://JOBS.example.com/b?page=2') is first
+        assert http_client.get_session('https://careers.example.org/') is not first
+
+        adapter = first.get_adapter('https://jobs.example.com/')
+        assert adapter._pool_maxsize == HTTP_POOL_MAXSIZE
+        assert adapter.max_retries.total == HTTP_MAX_RETRIES
+        assert 429 in adapter.max_retries.status_forcelist
+        assert 'gzip' in first.headers['Accept-Encoding']
+    finally:
+        http_client.close_sessions()
+    assert http_client.get_session('https://jobs.example.com/a') is not first
+    http_client.close_sessions()
+
+
+def make_response(body: bytes, **headers) -> requests.Response:
+    response = requests.Response()
+    response.status_code = 200
+    response.headers.update({name.replace('_', '-'): value for name, value in headers.items()})
+    response.raw = io.BytesIO(body)
+    return response
+
+
+def test_bodies_are_decoded_incrementally_with_the_page_charset():
+    body = '<meta charset="iso-8859-1"><p>Café</p>'.encode('iso-8859-1')
+    assert read_bounded_text(make_response(body, Content_Type='text/html'), 'u') == '<meta charset="iso-8859-1"><p>Café</p>'
+
+
+def test_disallowed_content_types_are_rejected_before_reading():
+    response = make_response(b'%PDF-1.7', Content_Type='application/pdf')
+    with pytest.raises(UnsupportedContentType):
+        read_bounded_text(response, 'u')
+    assert response.raw.tell() == 0
+
+
+def test_oversized_bodies_are_rejected():
+    """Both a declared Content-Length and a body that streams past the cap abort the read."""
+    declared = make_response(b'x' * 10, Content_Type='text/html', Content_Length='2000')
+    with pytest.raises(ResponseTooLarge):
+        read_bounded_text(declared, 'u', max_bytes=1000)
+    assert declared.raw.tell() == 0
+
+    streamed = make_response(b'x' * 5000, Content_Type='text/html')
+    with pytest.raises(ResponseTooLarge):
+        read_bounded_text(streamed, 'u', max_bytes=1000)
+    assert read_bounded_text(make_response(b'x' * 1000, Content_Type='text/html'), 'u', max_bytes=1000) == 'x' * 1000
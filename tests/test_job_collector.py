@@ -0,0 +1,56 @@
+import pytest
+
+from conftest import rag_app_imports
+
+with rag_app_imports():
+    # Pulls in rag.py and with it the embedding model, ChromaDB and the Gemini client
+    job_collector = pytest.importorskip('job_collector')
+
+
+@pytest.fixture
+def stubbed_pipeline(monkeypatch):
+    """Replaces the network, LLM and database steps of process_job_url with recorders."""
+    calls = {'extract': 0, 'seen': [], 'saved': []}
+    page = {'chunks': ['Backend Engineer', 'Berlin']}
+
+    def extract(chunks):
+        calls['extract'] += 1
+        return {'title': chunks[0], 'location': chunks[1]}
+
+    stored = {}
+    monkeypatch.setattr(job_collector, 'split_into_chunks_from_url', lambda url: list(page['chunks']))
+    monkeypatch.setattr(job_collector, 'get_page_fingerprint', lambda url: stored.get(url))
+    monkeypatch.setattr(job_collector, 'mark_page_seen', lambda url: calls['seen'].append(url))
+    monkeypatch.setattr(job_collector, 'extract_job_info', extract)
+    monkeypatch.setattr(job_collector, 'geocode_location', lambda location: None)
+
+    def save(url, job_data, fingerprint=None):
+        stored[url] = fingerprint
+        calls['saved'].append(job_data)
+
+    monkeypatch.setattr(job_collector, 'save_job_to_db', save)
+    return page, calls
+
+
+def test_unchanged_page_skips_extraction(stubbed_pipeline):
+    """A page whose text matches the stored fingerprint only has its last-seen time updated."""
+    page, calls = stubbed_pipeline
+    url = 'https://jobs.example.com/1'
+    assert job_collector.process_job_url(url)
+    assert calls['extract'] == 1 and calls['seen'] == []
+
+    assert job_collector.process_job_url(url)
+    assert calls['extract'] == 1
+    assert calls['seen'] == [url]
+    assert len(calls['saved']) == 1
+
+
+def test_changed_page_is_extracted_again(stubbed_pipeline):
+    page, calls = stubbed_pipeline
+    url = 'https://jobs.example.com/1'
+    job_collector.process_job_url(url)
+    page['chunks'] = ['Backend Engineer', 'Munich']
+
+    assert job_collector.process_job_url(url)
+    assert calls['extract'] == 2 and calls['seen'] == []
+    assert calls['saved'][-1]['location'] == 'Munich'
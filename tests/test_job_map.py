@@ -0,0 +1,16 @@
+from conftest import rag_app_imports
+
+with rag_app_imports():
+    from database import get_jobs_in_bbox, save_job_to_db
+
+
+def test_bbox_across_antimeridian(jobs_db):
+    """A viewport with west > east covers both sides of the 180th meridian, newest jobs first."""
+    for i, lon in enumerate([179.5, -179.5, 0.0, 170.5]):
+        save_job_to_db(f'https://example.com/job/{i}', {'title': f'Job {i}', 'lat': -17.0, 'lon': lon}, jobs_db)
+
+    jobs, truncated = get_jobs_in_bbox(-20, 170, -10, -170, db_path=jobs_db)
+    assert [job['lon'] for job in jobs] == [170.5, -179.5, 179.5] and not truncated
+
+    jobs, truncated = get_jobs_in_bbox(-20, 175, -10, -175, limit=1, db_path=jobs_db)
+    assert [job['lon'] for job in jobs] == [-179.5] and truncated
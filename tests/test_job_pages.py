@@ -0,0 +1,60 @@
+from conftest import rag_app_imports
+
+with rag_app_imports():
+    from database import get_job, get_jobs_page, normalize_date, upsert_jobs
+    from db import get_connection
+
+
+def add_jobs(db_path, jobs):
+    """Stores jobs in order (so ids ascend) and returns their ids, oldest first."""
+    upsert_jobs([(f'https://example.com/job/{i}', job, None) for i, job in enumerate(jobs)], db_path)
+    return [job['id'] for job in reversed(get_jobs_page(limit=len(jobs), db_path=db_path)[0])]
+
+
+def test_pages_follow_the_keyset_cursor(jobs_db):
+    """Pages are newest first, each continuing after the previous page's last id, with no cursor after the last."""
+    ids = add_jobs(jobs_db, [{'title': f'Engineer {i}', 'location': 'Leeds' if i % 2 else 'York'} for i in range(5)])
+    seen, cursor = [], None
+    for expected_size in (2, 2, 1):
+        jobs, cursor = get_jobs_page(limit=2, after_id=cursor, db_path=jobs_db)
+        assert len(jobs) == expected_size
+        seen += [job['id'] for job in jobs]
+    assert cursor is None
+    assert seen == ids[::-1]
+
+    jobs, cursor = get_jobs_page(limit=1, query='leeds', db_path=jobs_db)
+    assert [job['id'] for job in jobs] == [ids[3]]
+    jobs, cursor = get_jobs_page(limit=1, after_id=cursor, query='leeds', db_path=jobs_db)
+    assert [job['id'] for job in jobs] == [ids[1]] and cursor is None
+
+
+def test_job_detail_is_a_primary_key_lookup(jobs_db):
+    ids = add_jobs(jobs_db, [{'title': 'Analyst'}, {'title': 'Engineer'}])
+    assert get_job(ids[1], jobs_db)['title'] == 'Engineer'
+    assert get_job(ids[1] + 100, jobs_db) is None
+
+    conn = get_connection(jobs_db)
+    statements = []
+    conn.set_trace_callback(statements.append)
+    try:
+        get_job(ids[0], jobs_db)
+    finally:
+        conn.set_trace_callback(None)
+    plan = conn.execute('EXPLAIN QUERY PLAN ' + statements[-1]).fetchall()
+    assert [row[-1] for row in plan] == ['SEARCH job_postings USING INTEGER PRIMARY KEY (rowid=?)']
+
+
+def test_dates_are_normalized_and_filtered_in_sql(jobs_db):
+    assert normalize_date('Placed On: 22nd December 2025') == '2025-12-22'
+    assert normalize_date('Closes: 3 Jan 2026') == '2026-01-03'
+    assert normalize_date('03/01/2026') == '2026-01-03'
+    assert normalize_date('None') is None and normalize_date('soon') is None
+
+    ids = add_jobs(jobs_db, [
+        {'title': 'Old', 'placed_on': 'Placed On: 1st December 2025'},
+        {'title': 'New', 'placed_on': 'Placed On: 2nd January 2026'},
+        {'title': 'Closing', 'closes': 'Closes: 5th January 2026'},  # no placed date: the closing date counts
+        {'title': 'Undated'},
+    ])
+    jobs, _ = get_jobs_page(since='2026-01-01', db_path=jobs_db)
+    assert [job['id'] for job in jobs] == [ids[2], ids[1]]
@@ -0,0 +1,36 @@
+from conftest import rag_app_imports
+
+with rag_app_imports():
+    from database import get_jobs_by_salary, normalize_salary, save_job_to_db
+
+
+def annual(salary):
+    return salary['salary_currency'], salary['salary_period'], salary['salary_annual_min'], salary['salary_annual_max']
+
+
+def test_normalize_salary_heuristics():
+    """Stated periods are annualized, unstated ones are guessed from the size, grades are not pay."""
+    assert annual(normalize_salary("£35,000 to £45,000 per annum")) == ('GBP', 'year', 35000, 45000)
+    assert annual(normalize_salary("£15.50 per hour")) == ('GBP', 'hour', 30225, 30225)
+    assert annual(normalize_salary("30k-40k EUR")) == ('EUR', 'year', 30000, 40000)
+    assert annual(normalize_salary("Grade 7, spine point 30")) == (None, None, None, None)
+    # Numeric fields are used when the text has no amounts; small amounts without a period are hourly
+    assert annual(normalize_salary("Competitive", 12, 14)) == (None, 'hour', 23400, 27300)
+    # In-between amounts without a period are kept unannualized
+    assert annual(normalize_salary("$1,200")) == ('USD', None, None, None)
+
+
+def test_salary_cursor_pages_through_ties(jobs_db):
+    """The (salary, id) keyset cursor visits every job once, in order, even when salaries tie."""
+    for i, salary in enumerate([30000, 50000, 40000, 50000, 40000, 40000, None]):
+        save_job_to_db(f'https://example.com/job/{i}', {'title': f'Job {i}', 'salary_min': salary}, jobs_db)
+
+    for descending in (True, False):
+        seen, cursor = [], None
+        while True:
+            jobs, cursor = get_jobs_by_salary(limit=2, after=cursor, descending=descending, db_path=jobs_db)
+            seen += [(job['salary_annual_max'], job['id']) for job in jobs]
+            if cursor is None:
+                break
+        assert len(seen) == 6
+        assert seen == sorted(seen, reverse=descending)
@@ -0,0 +1,37 @@
+from conftest import rag_app_imports
+
+with rag_app_imports():
+    from database import (create_job_database, get_data_version, get_page_fingerprint, save_job_to_db, search_jobs,
+                          SNIPPET_START)
+    from db import get_connection
+
+
+def test_search_uses_fts_and_falls_back_for_short_terms(jobs_db):
+    """Terms of three or more characters use the trigram index; shorter ones use a substring scan."""
+    save_job_to_db('https://example.com/job/1', {'title': 'Python Developer', 'description': 'Django and QA'}, jobs_db)
+    save_job_to_db('https://example.com/job/2', {'title': 'QA Engineer', 'description': 'Manual testing'}, jobs_db)
+
+    jobs, _ = search_jobs('python', db_path=jobs_db)
+    assert [job['title'] for job in jobs] == ['Python Developer']
+    assert SNIPPET_START in jobs[0]['snippet']
+
+    jobs, cursor = search_jobs('QA', limit=1, db_path=jobs_db)
+    assert [job['title'] for job in jobs] == ['QA Engineer']
+    assert cursor == str(jobs[0]['id'])
+    jobs, cursor = search_jobs('QA', limit=1, after=cursor, db_path=jobs_db)
+    assert [job['title'] for job in jobs] == ['Python Developer'] and cursor is None
+
+
+def test_repeated_calls_do_no_schema_work(jobs_db):
+    """After the first create_job_database, reads, writes and further calls run no DDL."""
+    statements = []
+    conn = get_connection(jobs_db)
+    conn.set_trace_callback(statements.append)
+    try:
+        create_job_database(jobs_db)
+        save_job_to_db('https://example.com/job/1', {'title': 'Python Developer'}, jobs_db, fingerprint='abc')
+        assert get_page_fingerprint('https://example.com/job/1', jobs_db) == 'abc'
+        assert get_data_version('jobs', jobs_db) == 1
+    finally:
+        conn.set_trace_callback(None)
+    assert statements and not [sql for sql in statements if 'CREATE ' in sql.upper()]
@@ -0,0 +1,56 @@
+from conftest import rag_app_imports
+
+with rag_app_imports():
+    import job_snapshot
+    from database import upsert_jobs
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+def add_job(db_path, n):
+    upsert_jobs([(f'https://example.com/job/{n}', {'title': f'Job {n}'}, None)], db_path)
+
+
+def test_snapshot_rebuilds_once_the_version_settles(monkeypatch, jobs_db):
+    clock = FakeClock()
+    monkeypatch.setattr(job_snapshot, 'time', clock)
+    monkeypatch.setattr(job_snapshot, 'JOB_SNAPSHOT_CHECK_SECONDS', 1.0)
+    monkeypatch.setattr(job_snapshot, 'JOB_SNAPSHOT_REBUILD_SECONDS', 60.0)
+    add_job(jobs_db, 1)
+    first = job_snapshot.get_snapshot(jobs_db)
+    assert [job['title'] for job in first.jobs] == ['Job 1']
+
+    add_job(jobs_db, 2)
+    clock.now += 0.5
+    assert job_snapshot.get_snapshot(jobs_db) is first  # not checked yet
+    clock.now += 1
+    assert job_snapshot.get_snapshot(jobs_db) is first  # new version seen, still settling
+    new_id = max(job['id'] for job in job_snapshot.get_jobs_page(db_path=jobs_db)[0])
+    assert job_snapshot.snapshot_job(new_id, jobs_db)['title'] == 'Job 2'  # read through to SQLite
+
+    clock.now += 1.5
+    rebuilt = job_snapshot.get_snapshot(jobs_db)
+    assert rebuilt is not first
+    assert [job['title'] for job in rebuilt.jobs] == ['Job 2', 'Job 1']
+
+
+def test_continuous_writes_rebuild_at_most_every_rebuild_interval(monkeypatch, jobs_db):
+    clock = FakeClock()
+    monkeypatch.setattr(job_snapshot, 'time', clock)
+    monkeypatch.setattr(job_snapshot, 'JOB_SNAPSHOT_CHECK_SECONDS', 1.0)
+    monkeypatch.setattr(job_snapshot, 'JOB_SNAPSHOT_REBUILD_SECONDS', 10.0)
+    add_job(jobs_db, 0)
+    first = job_snapshot.get_snapshot(jobs_db)
+    for n in range(1, 10):
+        add_job(jobs_db, n)
+        clock.now += 1.1
+        assert job_snapshot.get_snapshot(jobs_db) is first
+    add_job(jobs_db, 10)
+    clock.now += 1.1
+    assert len(job_snapshot.get_snapshot(jobs_db).jobs) == 11
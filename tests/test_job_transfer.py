@@ -0,0 +1,31 @@
+import pytest
+
+from conftest import rag_app_imports
+
+with rag_app_imports():
+    from database import get_jobs_by_salary, get_jobs_in_bbox, save_job_to_db
+    from job_transfer import export_jobs, import_jobs
+
+
+@pytest.mark.parametrize('extension', ['.ndjson', '.csv', '.parquet'])
+def test_export_import_round_trip(jobs_db, tmp_path, extension):
+    """An export imports into an empty database unchanged, and re-importing it writes nothing."""
+    if extension == '.parquet':
+        pytest.importorskip('pyarrow')
+    save_job_to_db('https://example.com/job/1', {
+        'title': 'Data Scientist', 'organization': '数据公司', 'location': 'Shanghai', 'salary_text': '¥30,000 per month',
+        'placed_on': '1st May 2024', 'description': 'Line one\nline "two", with commas', 'lat': 31.23, 'lon': 121.47,
+    }, jobs_db)
+    save_job_to_db('https://example.com/job/2', {'title': 'Intern'}, jobs_db)
+    path = str(tmp_path / f'jobs{extension}')
+    assert export_jobs(path, db_path=jobs_db)['rows'] == 2
+
+    copy_path = str(tmp_path / 'copy.db')
+    assert import_jobs(path, db_path=copy_path)['written'] == 2
+    assert import_jobs(path, db_path=copy_path)['unchanged'] == 2
+
+    jobs, _ = get_jobs_in_bbox(30, 120, 32, 122, db_path=copy_path)
+    assert [(job['title'], job['lat'], job['lon']) for job in jobs] == [('Data Scientist', 31.23, 121.47)]
+    copied, _ = get_jobs_by_salary(db_path=copy_path)
+    assert copied[0]['salary_annual_max'] == 360000 and copied[0]['placed_on_date'] == '2024-05-01'
+    assert copied[0]['organization'] == '数据公司' and copied[0]['description'] == 'Line one\nline "two", with commas'
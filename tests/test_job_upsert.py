@@ -0,0 +1,17 @@
+from conftest import rag_app_imports
+
+with rag_app_imports():
+    from database import get_data_version, upsert_jobs
+
+
+def test_upsert_skips_unchanged_rows(jobs_db):
+    """Re-saving identical content writes nothing and leaves the data version alone."""
+    job = {'title': 'Analyst', 'location': 'Leeds', 'salary_text': '£30,000 per annum'}
+    assert upsert_jobs([('https://example.com/job/1', job, None)], jobs_db) == {'written': 1, 'unchanged': 0}
+    version = get_data_version('jobs', jobs_db)
+
+    assert upsert_jobs([('https://example.com/job/1', dict(job), None)], jobs_db) == {'written': 0, 'unchanged': 1}
+    assert get_data_version('jobs', jobs_db) == version
+
+    assert upsert_jobs([('https://example.com/job/1', dict(job, title='Senior Analyst'), None)], jobs_db)['written'] == 1
+    assert get_data_version('jobs', jobs_db) == version + 1
@@ -0,0 +1,56 @@
+import os
+
+from conftest import rag_app_imports
+
+with rag_app_imports():
+    from db import get_connection, transaction
+    from response_cache import ResponseCache
+
+
+def stored_bytes(path):
+    return get_connection(path).execute("SELECT COALESCE(SUM(size), 0) FROM http_responses").fetchone()[0]
+
+
+def test_round_trip_and_not_modified(tmp_path):
+    """Bodies come back intact with their validators; a 304 counts the bytes it saved."""
+    cache = ResponseCache(str(tmp_path / 'http_cache.db'), max_bytes=1 << 20, max_age_seconds=3600)
+    body = '<html>职位 Job posting</html>'.encode('utf-8') * 100
+    cache.put('https://a.example/job/1', body, 'utf-8', '"v1"', 'Mon, 01 Jan 2024 00:00:00 GMT')
+
+    cached = cache.get('https://a.example/job/1')
+    assert cached.body == body and cached.etag == '"v1"' and '职位' in cached.text
+    assert cache.get('https://a.example/job/2') is None
+    cache.mark_not_modified('https://a.example/job/1', cached)
+    assert cache.stats() == {'revalidated': 1, 'bytes_saved': len(body)}
+
+
+def test_expired_entries_are_dropped(tmp_path):
+    """Entries past the age limit are not served and are deleted."""
+    path = str(tmp_path / 'http_cache.db')
+    cache = ResponseCache(path, max_bytes=1 << 20, max_age_seconds=3600)
+    cache.put('https://a.example/job/1', b'old page', None, '"v1"', None)
+    with transaction(path) as conn:
+        conn.execute("UPDATE http_responses SET stored_at = stored_at - 7200")
+    assert cache.get('https://a.example/job/1') is None
+    assert stored_bytes(path) == 0
+
+
+def test_size_limit_evicts_least_recently_validated(tmp_path):
+    """The stored total stays under max_bytes; the oldest entries go first, revalidated ones are kept."""
+    path = str(tmp_path / 'http_cache.db')
+    cache = ResponseCache(path, max_bytes=50_000, max_age_seconds=3600)
+    for i in range(20):
+        cache.put(f'https://a.example/job/{i}', os.urandom(4000), None, f'"{i}"', None)
+        if i == 10:
+            cache.mark_not_modified('https://a.example/job/0', cache.get('https://a.example/job/0'))
+        assert stored_bytes(path) <= 50_000
+
+    assert cache.get('https://a.example/job/0') is not None
+    assert cache.get('https://a.example/job/1') is None
+    assert cache.get('https://a.example/job/19') is not None
+
+    # A restarted process starts from the stored total, so it still evicts in time
+    restarted = ResponseCache(path, max_bytes=50_000, max_age_seconds=3600)
+    for i in range(20, 30):
+        restarted.put(f'https://a.example/job/{i}', os.urandom(4000), None, f'"{i}"', None)
+        assert stored_bytes(path) <= 50_000
@@ -0,0 +1,149 @@
+"""
+Write-behind Visitor Logging
+
+Request handlers hand visitor events to `VisitorLogWriter.log()`, which only
+appends to a bounded in-memory queue. A background thread drains the queue and
+writes whatever has accumulated in one transaction, so request latency no
+longer includes an INSERT and a commit, and a burst of requests costs one
+commit per batch instead of one per request.
+
+When the queue is full (the disk can't keep up) new events are dropped and
+counted rather than blocking the request. `flush()` waits until everything
+queued so far is written; `stop()` flushes and ends the thread at shutdown.
+
+Being the only writer of the visitors table, the thread also runs the
+retention job (visitor_retention.apply_retention) every
+VISITOR_RETENTION_INTERVAL seconds.
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+from typing import List, Optional, Tuple
+
+from config import VISITOR_LOG_QUEUE_SIZE, VISITOR_LOG_BATCH_SIZE, VISITOR_RETENTION_INTERVAL
+from db import transaction
+from visitor_retention import apply_retention
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class VisitorLogWriter:
+    """Bounded queue of visitor rows written to the `visitors` table by a background thread."""
+
+    def __init__(self, db_path: str = "visitors.db", queue_size: int = VISITOR_LOG_QUEUE_SIZE,
+                 batch_size: int = VISITOR_LOG_BATCH_SIZE, retention_interval: float = VISITOR_RETENTION_INTERVAL):
+        self.db_path = db_path
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.retention_interval = retention_interval
+        self._next_retention = 0.0
+        self.written = 0
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._pid = None
+        self._queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+
+    def _ensure_started(self):
+        # A forked worker inherits the queue but not the thread, so it starts its own
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue(maxsize=self.queue_size)
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name="visitor-log-writer", daemon=True)
+                self._thread.start()
+
+    def log(self, ip_address: str, timestamp: str, user_agent: Optional[str], user_id: Optional[int],
+            path: Optional[str] = None) -> bool:
+        """
+        Queues one visitor row without waiting for it to be written.
+
+        Returns:
+            False if the queue was full and the event was dropped
+        """
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((ip_address, timestamp, user_agent, user_id, path))
+            return True
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+                dropped = self.dropped
+            if dropped == 1 or dropped % 1000 == 0:
+                logger.warning(f"Visitor log queue full, {dropped} event(s) dropped so far")
+            return False
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Waits until every event queued before this call is written. Returns False on timeout."""
+        if self._thread is None or self._pid != os.getpid():
+            return True
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def stop(self, timeout: float = 5.0):
+        """Writes the remaining events and stops the background thread."""
+        if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            logger.warning("Visitor log queue still full at shutdown, remaining events are lost")
+            return
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            # Block for the first item, then take whatever piled up while the last batch was written
+            items = [self._queue.get()]
+            while len(items) < self.batch_size:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            rows = [item for item in items if isinstance(item, tuple)]
+            if rows:
+                self._write(rows)
+                self._maybe_apply_retention()
+            for item in items:
+                if isinstance(item, threading.Event):
+                    item.set()
+            if _STOP in items:
+                return
+
+    def _write(self, rows: List[Tuple]):
+        try:
+            with transaction(self.db_path) as conn:
+                conn.executemany('''
+                    INSERT INTO visitors (ip_address, timestamp, user_agent, user_id, path)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', rows)
+            self.written += len(rows)
+        except Exception as e:
+            with self._lock:
+                self.dropped += len(rows)
+            logger.error(f"Failed to write {len(rows)} visitor event(s): {e}")
+
+    def _maybe_apply_retention(self):
+        if not self.retention_interval or time.monotonic() < self._next_retention:
+            return
+        self._next_retention = time.monotonic() + self.retention_interval
+        try:
+            result = apply_retention(self.db_path)
+            if result['rolled_up'] or result['pruned_hours']:
+                logger.info(f"Visitor retention: rolled up {result['rolled_up']} visit(s), "
+                            f"pruned {result['pruned_hours']} hourly rollup row(s)")
+        except Exception as e:
+            logger.error(f"Visitor retention failed: {e}")
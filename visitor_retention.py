@@ -0,0 +1,111 @@
+"""
+Visitor Log Retention and Rollups
+
+Raw visits are only kept for VISITOR_RAW_RETENTION_DAYS. Older visits are
+folded into `visitor_rollups`, which holds visit counts per hour and per day
+for each IP address, route and user, and the raw rows are deleted. Hourly
+rollups are kept for VISITOR_HOURLY_RETENTION_DAYS; daily rollups are kept.
+Buckets are prefixes of the ISO timestamp ('2024-05-01T13' for an hour,
+'2024-05-01' for a day), so each time range lives in its own rows and is
+pruned with an index range delete.
+
+With incremental auto-vacuum, pages freed by pruning are returned to the
+filesystem a little at a time after each retention run instead of needing a
+full VACUUM. Switching an existing database to that mode takes one full
+VACUUM, so the apps never do it at startup; the command line run
+`python visitor_retention.py [db_path]` converts the database (once) and
+applies retention. Until then freed pages are reused but not returned.
+
+The web apps run retention periodically from the visitor log writer thread,
+for visitors.db (root app) and for the visitors table in jobs.db (rag_app).
+"""
+
+import sys
+from datetime import datetime, timedelta
+from typing import Dict
+
+from config import VISITOR_RAW_RETENTION_DAYS, VISITOR_HOURLY_RETENTION_DAYS, VISITOR_VACUUM_PAGES
+from db import get_connection, transaction
+
+VISITOR_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_visitors_timestamp ON visitors (timestamp);
+CREATE INDEX IF NOT EXISTS idx_visitors_user ON visitors (user_id, timestamp);
+"""
+
+VISITOR_ROLLUPS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS visitor_rollups (
+    period TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    dimension TEXT NOT NULL,
+    value TEXT NOT NULL,
+    visits INTEGER NOT NULL,
+    PRIMARY KEY (period, bucket, dimension, value)
+) WITHOUT ROWID;
+"""
+
+# period -> length of the timestamp prefix that names its bucket
+_PERIODS = {'hour': 13, 'day': 10}
+# dimension -> expression giving the rolled-up value
+_DIMENSIONS = {
+    'ip': "ip_address",
+    'path': "COALESCE(path, '')",
+    'user': "COALESCE(CAST(user_id AS TEXT), 'guest')",
+}
+
+
+def init_visitor_retention(db_path: str = "visitors.db", convert: bool = False):
+    """
+    Creates the visitor indexes and rollup table.
+
+    With `convert`, also switches the database to incremental auto-vacuum,
+    running the full VACUUM that needs only if it isn't in that mode yet.
+    """
+    conn = get_connection(db_path)
+    conn.executescript(VISITOR_INDEXES + VISITOR_ROLLUPS_SCHEMA)
+    if convert and conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        # The mode only takes effect after a full VACUUM; this happens once per database file
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+
+
+def apply_retention(db_path: str = "visitors.db", raw_days: int = VISITOR_RAW_RETENTION_DAYS,
+                    hourly_days: int = VISITOR_HOURLY_RETENTION_DAYS) -> Dict[str, int]:
+    """
+    Rolls raw visits older than `raw_days` into hourly and daily counts, deletes them,
+    prunes hourly rollups older than `hourly_days` and frees some unused pages.
+
+    Returns:
+        {'rolled_up': raw visits folded into rollups, 'pruned_hours': hourly rollup rows deleted}
+    """
+    now = datetime.now()
+    raw_cutoff = (now - timedelta(days=raw_days)).isoformat()
+    hourly_cutoff = (now - timedelta(days=hourly_days)).isoformat()[:_PERIODS['hour']]
+
+    conn = get_connection(db_path)
+    conn.executescript(VISITOR_ROLLUPS_SCHEMA)
+    with transaction(db_path) as conn:
+        # Raw rows are deleted in the same transaction, so each visit is counted exactly once
+        for period, length in _PERIODS.items():
+            for dimension, value in _DIMENSIONS.items():
+                conn.execute(f"""
+                    INSERT INTO visitor_rollups (period, bucket, dimension, value, visits)
+                    SELECT ?, substr(timestamp, 1, {length}), ?, {value}, COUNT(*)
+                    FROM visitors WHERE timestamp < ?
+                    GROUP BY 2, 4
+                    ON CONFLICT (period, bucket, dimension, value) DO UPDATE SET visits = visits + excluded.visits
+                """, (period, dimension, raw_cutoff))
+        rolled_up = conn.execute("DELETE FROM visitors WHERE timestamp < ?", (raw_cutoff,)).rowcount
+        pruned_hours = conn.execute(
+            "DELETE FROM visitor_rollups WHERE period = 'hour' AND bucket < ?", (hourly_cutoff,)
+        ).rowcount
+
+    # No-op unless the database was switched to incremental auto-vacuum
+    conn.execute(f"PRAGMA incremental_vacuum({VISITOR_VACUUM_PAGES})").fetchall()
+    return {'rolled_up': rolled_up, 'pruned_hours': pruned_hours}
+
+
+if __name__ == '__main__':
+    path = sys.argv[1] if len(sys.argv) > 1 else "visitors.db"
+    init_visitor_retention(path, convert=True)
+    result = apply_retention(path)
+    print(f"Rolled up {result['rolled_up']} visit(s), pruned {result['pruned_hours']} hourly rollup row(s)")